@@ -0,0 +1,170 @@
+"""
+Clientes IPC directos con el compositor, sin lanzar hyprctl/swaymsg/xdotool.
+
+- ``HyprlandIPC``: socket de peticiones de Hyprland. Hyprland atiende una
+  petición por conexión y la cierra, así que cada consulta es un ``connect``
+  a un socket Unix (decenas de µs) en lugar de un fork+exec de ``hyprctl``.
+- ``SwayIPC``: protocolo i3-ipc sobre ``SWAYSOCK`` con una conexión
+  persistente que se reabre si se cae.
+- ``X11IPC``: conexión persistente con python-xlib (EWMH
+  ``_NET_ACTIVE_WINDOW`` y ``query_pointer``).
+
+Todos son seguros entre hilos: la conexión compartida se protege con un lock.
+"""
+import json
+import logging
+import os
+import socket
+import struct
+import threading
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class HyprlandIPC:
+    """Peticiones al socket ``.socket.sock`` de Hyprland."""
+
+    def __init__(self, signature: Optional[str] = None, path: Optional[str] = None,
+                 timeout: float = 1.0):
+        self.path = path or self.socket_path(signature or os.environ["HYPRLAND_INSTANCE_SIGNATURE"])
+        self.timeout = timeout
+
+    @staticmethod
+    def socket_path(signature: str) -> str:
+        # Hyprland >= 0.40 usa $XDG_RUNTIME_DIR/hypr; las versiones anteriores /tmp/hypr
+        runtime_dir = os.getenv("XDG_RUNTIME_DIR", "")
+        path = os.path.join(runtime_dir, "hypr", signature, ".socket.sock")
+        if runtime_dir and os.path.exists(path):
+            return path
+        return os.path.join("/tmp", "hypr", signature, ".socket.sock")
+
+    def request(self, command: str) -> bytes:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+            s.settimeout(self.timeout)
+            s.connect(self.path)
+            s.sendall(command.encode())
+            chunks = []
+            while True:
+                chunk = s.recv(65536)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+        return b"".join(chunks)
+
+    def active_window(self) -> Optional[str]:
+        """Dirección de la ventana con el foco"""
+        window = json.loads(self.request("j/activewindow") or b"{}")
+        return window.get("address") or None
+
+    def cursor_position(self) -> Tuple[int, int]:
+        position = json.loads(self.request("j/cursorpos"))
+        return int(position["x"]), int(position["y"])
+
+    def focus_window(self, address: str) -> None:
+        reply = self.request(f"dispatch focuswindow address:{address}").strip()
+        if reply != b"ok":
+            raise ValueError(f"Hyprland respondió {reply.decode(errors='replace')!r}")
+
+
+class SwayIPC:
+    """Cliente i3-ipc con conexión persistente a ``SWAYSOCK``."""
+
+    MAGIC = b"i3-ipc"
+    HEADER = struct.Struct("=6sII")
+    RUN_COMMAND = 0
+    GET_TREE = 4
+
+    def __init__(self, path: Optional[str] = None, timeout: float = 1.0):
+        self.path = path or os.environ["SWAYSOCK"]
+        self.timeout = timeout
+        self._socket = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> socket.socket:
+        s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        s.settimeout(self.timeout)
+        s.connect(self.path)
+        return s
+
+    def _recv_exactly(self, size: int) -> bytes:
+        data = bytearray()
+        while len(data) < size:
+            chunk = self._socket.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError("sway cerró la conexión")
+            data += chunk
+        return bytes(data)
+
+    def _roundtrip(self, message_type: int, payload: bytes):
+        self._socket.sendall(self.HEADER.pack(self.MAGIC, len(payload), message_type) + payload)
+        magic, length, reply_type = self.HEADER.unpack(self._recv_exactly(self.HEADER.size))
+        if magic != self.MAGIC or reply_type != message_type:
+            raise ConnectionError(f"respuesta i3-ipc inesperada ({magic!r}, {reply_type})")
+        return json.loads(self._recv_exactly(length))
+
+    def request(self, message_type: int, payload: str = ""):
+        with self._lock:
+            # Un reintento con conexión nueva si sway se reinició o la cerró
+            for attempt in (1, 2):
+                try:
+                    if self._socket is None:
+                        self._socket = self._connect()
+                    return self._roundtrip(message_type, payload.encode())
+                except (OSError, ConnectionError):
+                    self._close()
+                    if attempt == 2:
+                        raise
+
+    def _close(self) -> None:
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+    def active_window(self) -> Optional[int]:
+        """con_id de la ventana con el foco, siguiendo la pila ``focus`` del árbol"""
+        node = self.request(self.GET_TREE)
+        while node is not None and not node.get("focused"):
+            children = {child["id"]: child for child in node.get("nodes", []) + node.get("floating_nodes", [])}
+            node = next((children[i] for i in node.get("focus", []) if i in children), None)
+        return node["id"] if node is not None else None
+
+    def focus_window(self, con_id: int) -> None:
+        for result in self.request(self.RUN_COMMAND, f"[con_id={con_id}] focus"):
+            if not result.get("success"):
+                raise ValueError(f"sway respondió {result.get('error', result)!r}")
+
+
+class X11IPC:
+    """Conexión persistente al servidor X con python-xlib."""
+
+    def __init__(self, display: Optional[str] = None):
+        from Xlib import X, display as xdisplay, protocol
+        self._X = X
+        self._protocol = protocol
+        self.display = xdisplay.Display(display)
+        self.root = self.display.screen().root
+        self._active_atom = self.display.intern_atom("_NET_ACTIVE_WINDOW")
+        self._lock = threading.Lock()
+
+    def active_window(self) -> Optional[int]:
+        with self._lock:
+            prop = self.root.get_full_property(self._active_atom, self._X.AnyPropertyType)
+        return int(prop.value[0]) if prop and len(prop.value) and prop.value[0] else None
+
+    def cursor_position(self) -> Tuple[int, int]:
+        with self._lock:
+            pointer = self.root.query_pointer()
+        return pointer.root_x, pointer.root_y
+
+    def focus_window(self, window_id: int) -> None:
+        """Activa la ventana como ``xdotool windowactivate`` (petición EWMH al WM)"""
+        with self._lock:
+            window = self.display.create_resource_object("window", window_id)
+            # source=2: petición de un pager/herramienta, que los WM respetan
+            event = self._protocol.event.ClientMessage(
+                window=window, client_type=self._active_atom,
+                data=(32, [2, self._X.CurrentTime, 0, 0, 0]))
+            mask = self._X.SubstructureRedirectMask | self._X.SubstructureNotifyMask
+            self.root.send_event(event, event_mask=mask)
+            self.display.flush()
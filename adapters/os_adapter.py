@@ -1,11 +1,52 @@
+import logging
 import os
 import time
 import platform
 import subprocess
-import pyautogui
-import pyperclip
 import json
 from abc import ABC, abstractmethod
+from .compositor_ipc import HyprlandIPC, SwayIPC, X11IPC
+
+logger = logging.getLogger(__name__)
+
+# pyautogui y pyperclip tardan en importarse: se cargan al primer pegado
+_pyautogui_module = None
+
+def _pyautogui():
+    """Importa y configura pyautogui la primera vez"""
+    global _pyautogui_module
+    if _pyautogui_module is None:
+        import pyautogui
+        pyautogui.PAUSE = 0.1
+        pyautogui.FAILSAFE = True
+        _pyautogui_module = pyautogui
+    return _pyautogui_module
+
+def _open_ipc(factory):
+    """Abre el cliente IPC del compositor; None si no hay o COMPOSITOR_IPC=0"""
+    if os.getenv("COMPOSITOR_IPC", "1").lower() not in ("1", "true", "yes"):
+        return None
+    try:
+        return factory()
+    except Exception as e:
+        logger.debug(f"IPC con el compositor no disponible, se usarán comandos: {e}")
+        return None
+
+_IPC_FAILED = object()
+
+def _try_ipc(ipc, method, *args):
+    """Llama a ``ipc.<method>``; _IPC_FAILED si no hay IPC o falla"""
+    if ipc is None:
+        return _IPC_FAILED
+    try:
+        return getattr(ipc, method)(*args)
+    except Exception as e:
+        logger.debug(f"IPC con el compositor falló ({method}): {e}; se usa el comando")
+        return _IPC_FAILED
+
+def _copy_to_clipboard(text):
+    import pyperclip
+    pyperclip.copy(text)
 
 class OSAdapter(ABC):
     """Interfaz base para los adaptadores de sistema operativo"""
@@ -33,34 +74,34 @@ class WindowsAdapter(OSAdapter):
         
     def save_active_window(self):
         try:
-            self._saved_window = pyautogui.getActiveWindow()
-            print(f"Ventana activa guardada: {self._saved_window}")
+            self._saved_window = _pyautogui().getActiveWindow()
+            logger.debug(f"Ventana activa guardada: {self._saved_window}")
         except Exception as e:
-            print(f"Error al guardar la ventana activa: {e}")
+            logger.error(f"Error al guardar la ventana activa: {e}")
             self._saved_window = None
             
     def restore_active_window(self):
         if not self._saved_window:
-            print("No hay ventana guardada para restaurar.")
+            logger.debug("No hay ventana guardada para restaurar.")
             return
             
         try:
             self._saved_window.activate()
-            print("Ventana activada (Windows).")
+            logger.debug("Ventana activada (Windows).")
             time.sleep(0.2)
         except Exception as e:
-            print(f"Error al activar la ventana (Windows): {e}")
+            logger.error(f"Error al activar la ventana (Windows): {e}")
             
     def write_text(self, text):
         if not text:
-            print("No hay texto para escribir.")
+            logger.warning("No hay texto para escribir.")
             return
             
-        print("Escribiendo texto…")
-        pyperclip.copy(text.strip())
-        print("Texto copiado al portapapeles.")
-        pyautogui.hotkey("ctrl", "v")
-        print("Texto escrito.")
+        logger.debug("Escribiendo texto…")
+        _copy_to_clipboard(text.strip())
+        logger.debug("Texto copiado al portapapeles.")
+        _pyautogui().hotkey("ctrl", "v")
+        logger.debug("Texto escrito.")
 
 class MacOSAdapter(OSAdapter):
     """Adaptador para macOS"""
@@ -70,86 +111,116 @@ class MacOSAdapter(OSAdapter):
         
     def save_active_window(self):
         try:
-            self._saved_window = pyautogui.getActiveWindow()
-            print(f"Ventana activa guardada: {self._saved_window}")
+            self._saved_window = _pyautogui().getActiveWindow()
+            logger.debug(f"Ventana activa guardada: {self._saved_window}")
         except Exception as e:
-            print(f"Error al guardar la ventana activa: {e}")
+            logger.error(f"Error al guardar la ventana activa: {e}")
             self._saved_window = None
             
     def restore_active_window(self):
         if not self._saved_window:
-            print("No hay ventana guardada para restaurar.")
+            logger.debug("No hay ventana guardada para restaurar.")
             return
             
         try:
             self._saved_window.activate()
-            print("Ventana activada (macOS).")
+            logger.debug("Ventana activada (macOS).")
             time.sleep(0.2)
         except Exception as e:
-            print(f"Error al activar la ventana (macOS): {e}")
+            logger.error(f"Error al activar la ventana (macOS): {e}")
             
     def write_text(self, text):
         if not text:
-            print("No hay texto para escribir.")
+            logger.warning("No hay texto para escribir.")
             return
             
-        print("Escribiendo texto…")
-        pyperclip.copy(text.strip())
-        print("Texto copiado al portapapeles.")
+        logger.debug("Escribiendo texto…")
+        _copy_to_clipboard(text.strip())
+        logger.debug("Texto copiado al portapapeles.")
         # En macOS el atajo es command+v en lugar de ctrl+v
-        pyautogui.hotkey("command", "v")
-        print("Texto escrito.")
+        _pyautogui().hotkey("command", "v")
+        logger.debug("Texto escrito.")
 
 class LinuxX11Adapter(OSAdapter):
     """Adaptador para Linux con X11"""
     
     def __init__(self):
         self._saved_window = None
+        self._ipc = _open_ipc(X11IPC)
         
     def save_active_window(self):
+        window = _try_ipc(self._ipc, "active_window")
+        if window is not _IPC_FAILED:
+            self._saved_window = window
+            logger.debug(f"Ventana activa guardada (X11): {self._saved_window}")
+            return
         try:
             win_id = subprocess.check_output(
                 ["xdotool", "getactivewindow"], stderr=subprocess.DEVNULL
             )
             self._saved_window = win_id.strip().decode()
-            print(f"Ventana activa guardada (X11): {self._saved_window}")
+            logger.debug(f"Ventana activa guardada (X11): {self._saved_window}")
         except Exception as e:
-            print(f"Error al guardar la ventana activa (X11): {e}")
+            logger.error(f"Error al guardar la ventana activa (X11): {e}")
             self._saved_window = None
             
     def restore_active_window(self):
         if not self._saved_window:
-            print("No hay ventana guardada para restaurar.")
+            logger.debug("No hay ventana guardada para restaurar.")
             return
             
+        if _try_ipc(self._ipc, "focus_window", int(self._saved_window)) is not _IPC_FAILED:
+            logger.debug(f"Ventana activada (X11) con window id: {self._saved_window}")
+            time.sleep(0.2)
+            return
         try:
             subprocess.call(
-                ["xdotool", "windowactivate", "--sync", self._saved_window],
+                ["xdotool", "windowactivate", "--sync", str(self._saved_window)],
                 stderr=subprocess.DEVNULL,
             )
-            print(f"Ventana activada (X11) con window id: {self._saved_window}")
+            logger.debug(f"Ventana activada (X11) con window id: {self._saved_window}")
             time.sleep(0.2)
         except Exception as e:
-            print(f"Error al activar la ventana (X11): {e}")
+            logger.error(f"Error al activar la ventana (X11): {e}")
             
     def write_text(self, text):
         if not text:
-            print("No hay texto para escribir.")
+            logger.warning("No hay texto para escribir.")
             return
             
-        print("Escribiendo texto…")
-        pyperclip.copy(text.strip())
-        print("Texto copiado al portapapeles.")
-        pyautogui.hotkey("ctrl", "v")
-        print("Texto escrito.")
+        logger.debug("Escribiendo texto…")
+        _copy_to_clipboard(text.strip())
+        logger.debug("Texto copiado al portapapeles.")
+        _pyautogui().hotkey("ctrl", "v")
+        logger.debug("Texto escrito.")
+
+    def get_cursor_position(self) -> tuple[int, int]:
+        """Obtiene la posición actual del cursor en X11"""
+        position = _try_ipc(self._ipc, "cursor_position")
+        if position is not _IPC_FAILED:
+            return position
+        try:
+            out = subprocess.check_output(["xdotool", "getmouselocation", "--shell"],
+                                          stderr=subprocess.DEVNULL)
+            values = dict(line.split("=", 1) for line in out.decode().split())
+            return (int(values["X"]), int(values["Y"]))
+        except Exception as e:
+            logger.error(f"Error al obtener la posición del cursor (X11): {e}")
+            return (0, 0)
 
 class LinuxWaylandHyprlandAdapter(OSAdapter):
     """Adaptador para Linux con Wayland (Hyprland)"""
     
     def __init__(self):
         self._saved_window = None
+        self._ipc = _open_ipc(HyprlandIPC)
         
     def save_active_window(self):
+        window = _try_ipc(self._ipc, "active_window")
+        if window is not _IPC_FAILED:
+            self._saved_window = window
+            logger.debug(f"Ventana activa guardada (Hyprland): {self._saved_window}")
+            return
         try:
             out = subprocess.check_output(
                 ["hyprctl", "clients", "-j"], stderr=subprocess.DEVNULL
@@ -159,44 +230,48 @@ class LinuxWaylandHyprlandAdapter(OSAdapter):
                 if c.get("focusHistoryID") == 0:
                     # guardamos la dirección única
                     self._saved_window = c.get("address")
-                    print(f"Ventana activa guardada (Hyprland): {self._saved_window}")
+                    logger.debug(f"Ventana activa guardada (Hyprland): {self._saved_window}")
                     return
         except Exception as e:
-            print(f"Error al guardar la ventana activa (Hyprland): {e}")
+            logger.error(f"Error al guardar la ventana activa (Hyprland): {e}")
             self._saved_window = None
             
     def restore_active_window(self):
         if not self._saved_window:
-            print("No hay ventana guardada para restaurar.")
+            logger.debug("No hay ventana guardada para restaurar.")
             return
             
+        if _try_ipc(self._ipc, "focus_window", self._saved_window) is not _IPC_FAILED:
+            logger.debug(f"Ventana activada (Hyprland) con address: {self._saved_window}")
+            time.sleep(0.2)
+            return
         try:
             subprocess.call(
                 ["hyprctl", "dispatch", "focuswindow", f"address:{self._saved_window}"],
                 stderr=subprocess.DEVNULL,
             )
-            print(f"Ventana activada (Hyprland) con address: {self._saved_window}")
+            logger.debug(f"Ventana activada (Hyprland) con address: {self._saved_window}")
             time.sleep(0.2)
         except Exception as e:
-            print(f"Error al activar la ventana (Hyprland): {e}")
+            logger.error(f"Error al activar la ventana (Hyprland): {e}")
             
     def write_text(self, text):
         if not text:
-            print("No hay texto para escribir.")
+            logger.warning("No hay texto para escribir.")
             return
             
-        print("Escribiendo texto…")
-        pyperclip.copy(text.strip())
-        print("Texto copiado al portapapeles.")
+        logger.debug("Escribiendo texto…")
+        _copy_to_clipboard(text.strip())
+        logger.debug("Texto copiado al portapapeles.")
         
         try:
             # Usar wtype para Hyprland
             subprocess.run(["wtype", "-M", "ctrl", "-P", "v", "-M", "ctrl", "-p", "v"], check=True)
-            print("Texto escrito con wtype.")
+            logger.debug("Texto escrito con wtype.")
         except Exception as e:
-            print(f"Error al usar wtype: {e}, intentando con pyautogui...")
-            pyautogui.hotkey("ctrl", "v")
-            print("Texto escrito con pyautogui.")
+            logger.warning(f"Error al usar wtype: {e}, intentando con pyautogui...")
+            _pyautogui().hotkey("ctrl", "v")
+            logger.debug("Texto escrito con pyautogui.")
 
     def get_cursor_position(self) -> tuple[int, int]:
         """Obtiene la posición actual del cursor en Hyprland
@@ -204,15 +279,19 @@ class LinuxWaylandHyprlandAdapter(OSAdapter):
         Returns:
             tuple[int, int]: Coordenadas (x, y) de la posición del cursor
         """
+        position = _try_ipc(self._ipc, "cursor_position")
+        if position is not _IPC_FAILED:
+            logger.debug(f"Posición del cursor (Hyprland): {position}")
+            return position
         try:
             out = subprocess.check_output(["hyprctl", "cursorpos"], stderr=subprocess.DEVNULL)
             pos_str = out.decode().strip()
             # El formato esperado es: "X, Y"
             x, y = map(int, pos_str.split(','))
-            print(f"Posición del cursor (Hyprland): ({x}, {y})")
+            logger.debug(f"Posición del cursor (Hyprland): ({x}, {y})")
             return (x, y)
         except Exception as e:
-            print(f"Error al obtener la posición del cursor (Hyprland): {e}")
+            logger.error(f"Error al obtener la posición del cursor (Hyprland): {e}")
             return (0, 0)
         
 class LinuxWaylandSwayAdapter(OSAdapter):
@@ -220,8 +299,14 @@ class LinuxWaylandSwayAdapter(OSAdapter):
     
     def __init__(self):
         self._saved_window = None
+        self._ipc = _open_ipc(SwayIPC)
         
     def save_active_window(self):
+        window = _try_ipc(self._ipc, "active_window")
+        if window is not _IPC_FAILED:
+            self._saved_window = window
+            logger.debug(f"Ventana activa guardada (Sway): {self._saved_window}")
+            return
         try:
             out = subprocess.check_output(
                 ["swaymsg", "-t", "get_tree"], stderr=subprocess.DEVNULL
@@ -241,43 +326,47 @@ class LinuxWaylandSwayAdapter(OSAdapter):
             focused = find_focused(tree)
             if focused and "id" in focused:
                 self._saved_window = focused["id"]
-                print(f"Ventana activa guardada (Sway): {self._saved_window}")
+                logger.debug(f"Ventana activa guardada (Sway): {self._saved_window}")
         except Exception as e:
-            print(f"Error al guardar la ventana activa (Sway): {e}")
+            logger.error(f"Error al guardar la ventana activa (Sway): {e}")
             self._saved_window = None
             
     def restore_active_window(self):
         if not self._saved_window:
-            print("No hay ventana guardada para restaurar.")
+            logger.debug("No hay ventana guardada para restaurar.")
             return
             
+        if _try_ipc(self._ipc, "focus_window", self._saved_window) is not _IPC_FAILED:
+            logger.debug(f"Ventana activada (Sway) con con_id: {self._saved_window}")
+            time.sleep(0.2)
+            return
         try:
             subprocess.call(
                 ["swaymsg", f"[con_id={self._saved_window}]", "focus"],
                 stderr=subprocess.DEVNULL,
             )
-            print(f"Ventana activada (Sway) con con_id: {self._saved_window}")
+            logger.debug(f"Ventana activada (Sway) con con_id: {self._saved_window}")
             time.sleep(0.2)
         except Exception as e:
-            print(f"Error al activar la ventana (Sway): {e}")
+            logger.error(f"Error al activar la ventana (Sway): {e}")
             
     def write_text(self, text):
         if not text:
-            print("No hay texto para escribir.")
+            logger.warning("No hay texto para escribir.")
             return
             
-        print("Escribiendo texto…")
-        pyperclip.copy(text.strip())
-        print("Texto copiado al portapapeles.")
+        logger.debug("Escribiendo texto…")
+        _copy_to_clipboard(text.strip())
+        logger.debug("Texto copiado al portapapeles.")
         
         try:
             # Usar wtype para Sway
             subprocess.run(["wtype", "-M", "ctrl", "-P", "v", "-M", "ctrl", "-p", "v"], check=True)
-            print("Texto escrito con wtype.")
+            logger.debug("Texto escrito con wtype.")
         except Exception as e:
-            print(f"Error al usar wtype: {e}, intentando con pyautogui...")
-            pyautogui.hotkey("ctrl", "v")
-            print("Texto escrito con pyautogui.")
+            logger.warning(f"Error al usar wtype: {e}, intentando con pyautogui...")
+            _pyautogui().hotkey("ctrl", "v")
+            logger.debug("Texto escrito con pyautogui.")
 
 class OSAdapterFactory:
     """Fábrica para crear el adaptador adecuado para el sistema operativo"""
@@ -285,16 +374,16 @@ class OSAdapterFactory:
     @staticmethod
     def create_adapter():
         system = platform.system()
-        print(f"Sistema operativo detectado: {system}")
+        logger.debug(f"Sistema operativo detectado: {system}")
         
         # Windows
         if system == "Windows":
-            print("Usando adaptador para Windows.")
+            logger.debug("Usando adaptador para Windows.")
             return WindowsAdapter()
             
         # macOS
         elif system == "Darwin":
-            print("Usando adaptador para macOS.")
+            logger.debug("Usando adaptador para macOS.")
             return MacOSAdapter()
             
         # Linux
@@ -303,19 +392,19 @@ class OSAdapterFactory:
             if "WAYLAND_DISPLAY" in os.environ:
                 # Hyprland
                 if "HYPRLAND_INSTANCE_SIGNATURE" in os.environ:
-                    print("Usando adaptador para Linux Wayland (Hyprland).")
+                    logger.debug("Usando adaptador para Linux Wayland (Hyprland).")
                     return LinuxWaylandHyprlandAdapter()
                 # Sway
                 elif "SWAYSOCK" in os.environ:
-                    print("Usando adaptador para Linux Wayland (Sway).")
+                    logger.debug("Usando adaptador para Linux Wayland (Sway).")
                     return LinuxWaylandSwayAdapter()
                 # Otros Wayland
                 else:
-                    print("Compositor Wayland no soportado específicamente, usando adaptador Wayland genérico.")
+                    logger.warning("Compositor Wayland no soportado específicamente, usando adaptador Wayland genérico.")
                     return LinuxWaylandHyprlandAdapter()  # Usamos Hyprland como fallback
             # X11
             else:
-                print("Usando adaptador para Linux X11.")
+                logger.debug("Usando adaptador para Linux X11.")
                 return LinuxX11Adapter()
                 
         # Sistema no soportado
@@ -0,0 +1,121 @@
+"""
+Buffers de captura de audio preasignados
+"""
+import threading
+import numpy as np
+
+INT16_SCALE = 32767
+
+
+def to_int16(block: np.ndarray) -> np.ndarray:
+    """Convierte un bloque a int16 mono sin copiar si ya viene en int16"""
+    if block.ndim > 1:
+        block = block[:, 0]
+    if block.dtype == np.int16:
+        return block
+    return (np.clip(block, -1.0, 1.0) * INT16_SCALE).astype(np.int16)
+
+
+class AudioBuffer:
+    """Buffer de audio int16 contiguo que crece por bloques preasignados.
+
+    Evita la lista de copias + ``np.concatenate`` al final de la grabación:
+    las muestras se escriben directamente en un array reservado y
+    ``get_audio()`` devuelve una vista sin copia de la parte ocupada.
+    """
+
+    def __init__(self, sample_rate: int, initial_seconds: float = 30.0):
+        self.sample_rate = sample_rate
+        self._data = np.empty(max(int(sample_rate * initial_seconds), 1), dtype=np.int16)
+        self._length = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._length
+
+    @property
+    def capacity(self) -> int:
+        return len(self._data)
+
+    @property
+    def duration(self) -> float:
+        """Duración en segundos del audio almacenado"""
+        return self._length / self.sample_rate
+
+    def _grow(self, required: int) -> None:
+        # Duplicamos la capacidad para que el coste de crecer sea amortizado
+        new_capacity = max(required, 2 * len(self._data))
+        new_data = np.empty(new_capacity, dtype=np.int16)
+        new_data[:self._length] = self._data[:self._length]
+        self._data = new_data
+
+    def append(self, block: np.ndarray) -> None:
+        """Añade un bloque de audio (int16 o float32 en [-1, 1])"""
+        samples = to_int16(block)
+        n = len(samples)
+        if n == 0:
+            return
+        with self._lock:
+            end = self._length + n
+            if end > len(self._data):
+                self._grow(end)
+            self._data[self._length:end] = samples
+            self._length = end
+
+    def clear(self) -> None:
+        """Vacía el buffer conservando la memoria reservada"""
+        with self._lock:
+            self._length = 0
+
+    def get_audio(self) -> np.ndarray:
+        """Devuelve una vista (sin copia) del audio grabado"""
+        with self._lock:
+            return self._data[:self._length]
+
+
+class PreRollBuffer:
+    """Buffer circular int16 de tamaño fijo con los últimos N ms de audio.
+
+    Se escribe desde el callback de PortAudio mientras no se graba, por lo
+    que ``write()`` no reserva memoria: solo copia en el array existente.
+    """
+
+    def __init__(self, size: int):
+        self._data = np.zeros(max(size, 0), dtype=np.int16)
+        self._pos = 0
+        self._filled = 0
+
+    def __len__(self) -> int:
+        return self._filled
+
+    def write(self, block: np.ndarray) -> None:
+        """Escribe un bloque sobrescribiendo el audio más antiguo"""
+        size = len(self._data)
+        if size == 0:
+            return
+        samples = to_int16(block)
+        n = len(samples)
+        if n >= size:
+            self._data[:] = samples[n - size:]
+            self._pos = 0
+            self._filled = size
+            return
+        first = min(n, size - self._pos)
+        self._data[self._pos:self._pos + first] = samples[:first]
+        if first < n:
+            self._data[:n - first] = samples[first:]
+        self._pos = (self._pos + n) % size
+        self._filled = min(self._filled + n, size)
+
+    def snapshot(self) -> np.ndarray:
+        """Devuelve una copia ordenada (más antiguo primero) y vacía el buffer"""
+        if self._filled < len(self._data):
+            start = self._pos - self._filled
+            if start >= 0:
+                result = self._data[start:self._pos].copy()
+            else:
+                result = np.concatenate((self._data[start:], self._data[:self._pos]))
+        else:
+            result = np.concatenate((self._data[self._pos:], self._data[:self._pos]))
+        self._filled = 0
+        return result
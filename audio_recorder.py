@@ -1,81 +1,271 @@
 """
 Módulo para grabación de audio
 """
+import logging
 import threading
-import tkinter as tk
-import pyautogui
-import sounddevice as sd
+import time
 import numpy as np
-from transcription import BubbleManager, bubble_manager
-
-from PyQt5.QtWidgets import QApplication, QLabel, QWidget, QVBoxLayout
-from PyQt5.QtCore import Qt, QPoint
-from PyQt5.QtGui import QMouseEvent
-from PyQt5.QtCore import QTimer
 import os
+from audio_buffer import AudioBuffer, PreRollBuffer, to_int16
+from vad import VoiceActivityDetector, SilenceTrimmer
+import telemetry
+
+logger = logging.getLogger(__name__)
+
 
+def _bubble_manager():
+    # La burbuja arrastra PyQt5: se importa al grabar, no al importar el módulo
+    from transcription import bubble_manager
+    return bubble_manager
 
 
 # Variables globales del módulo
-recording = False
+current_session = None
 recording_bubble = None
-audio_frames = []
 sample_rate = 16000  # valor por defecto
+capture_dtype = "int16"  # int16 nativo evita la conversión float→int al final
+blocksize = 0  # 0 = lo decide PortAudio
+persistent_stream = None  # stream siempre abierto (modo AUDIO_ALWAYS_ON)
+preroll = None
+vad_settings = None  # None = sin recorte de silencio
+
+
+class RecordingSession:
+    """Sesión de grabación con un evento de parada explícito.
+
+    ``stop()`` puede llamarse desde cualquier hilo (Esc, clic en la burbuja,
+    trigger del socket) y despierta inmediatamente al hilo que graba.
+    """
+
+    def __init__(self, sample_rate: int, trimmer=None, on_audio=None):
+        self.buffer = AudioBuffer(sample_rate)
+        self.trimmer = trimmer
+        self.on_audio = on_audio  # recibe cada bloque int16 conservado
+        self._write_lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.started_at = time.perf_counter()
+        self.stop_requested_at = None
+        self.stopped_at = None
+        # En modo siempre abierto, el callback antepone el pre-roll al primer bloque
+        self.needs_preroll = True
+        self.received_audio = False
+        # El callback de audio y quien pide la parada corren en otros hilos:
+        # los eventos van a la traza del dictado que creó la sesión
+        self.trace = telemetry.current_trace()
+
+    @property
+    def active(self) -> bool:
+        return not self.stop_event.is_set()
+
+    def write(self, block) -> None:
+        """Añade un bloque del callback pasando por el VAD si está activo"""
+        with self._write_lock:
+            if not self.received_audio:
+                self.received_audio = True
+                telemetry.mark("first_audio", self.trace)
+            samples = to_int16(block)
+            if self.trimmer is not None:
+                samples = self.trimmer.process(samples)
+            self.buffer.append(samples)
+            if self.on_audio is not None:
+                self.on_audio(samples)
+
+    def finish(self) -> None:
+        """Vuelca el audio pendiente del VAD al buffer"""
+        with self._write_lock:
+            if self.trimmer is not None:
+                samples = self.trimmer.flush()
+                self.buffer.append(samples)
+                if self.on_audio is not None:
+                    self.on_audio(samples)
+
+    def stop(self) -> None:
+        """Solicita la parada de la grabación"""
+        if not self.stop_event.is_set():
+            self.stop_requested_at = time.perf_counter()
+            telemetry.mark("stop", self.trace)
+            self.stop_event.set()
+
+    def wait(self, timeout=None) -> bool:
+        """Bloquea hasta que se solicite la parada"""
+        return self.stop_event.wait(timeout)
+
+    def mark_stopped(self) -> None:
+        """Registra el cierre efectivo del stream"""
+        self.stopped_at = time.perf_counter()
+        telemetry.mark("recording_stopped", self.trace)
+
+    @property
+    def stop_latency(self):
+        """Segundos entre la solicitud de parada y el cierre del stream"""
+        if self.stop_requested_at is None or self.stopped_at is None:
+            return None
+        return self.stopped_at - self.stop_requested_at
+
+
+def connect_bubble():
+    """Crea la burbuja y hace que cerrarla detenga la grabación.
+
+    Debe llamarse desde el hilo principal: el ``BubbleManager`` y el proxy
+    del slot pertenecen al hilo que los crea, y solo el principal tiene
+    bucle de eventos Qt.
+    """
+    _bubble_manager().bubble_closed.connect(stop_recording)
 
-def setup_recorder(config):
-    """Configura el grabador de audio con los parámetros dados"""
-    global sample_rate
+def setup_recorder(config, connect_bubble_signal=True):
+    """Configura el grabador de audio con los parámetros dados.
+
+    Con ``connect_bubble_signal=False`` no toca Qt y puede ejecutarse en
+    otro hilo; entonces el llamador debe usar ``connect_bubble()`` en el
+    hilo principal.
+    """
+    global sample_rate, capture_dtype, vad_settings
     sample_rate = int(os.getenv("SAMPLE_RATE", "16000"))
+    capture_dtype = os.getenv("AUDIO_DTYPE", "int16").lower()
+    if capture_dtype not in ("int16", "float32"):
+        logger.warning(f"AUDIO_DTYPE no soportado: {capture_dtype}, usando int16")
+        capture_dtype = "int16"
+    # Cerrar la burbuja detiene la grabación (se conecta una sola vez)
+    if connect_bubble_signal:
+        connect_bubble()
+
+    if os.getenv("VAD_ENABLED", "0").lower() in ("1", "true", "yes"):
+        vad_settings = {
+            "frame_ms": int(os.getenv("VAD_FRAME_MS", "30")),
+            "energy_threshold_db": float(os.getenv("VAD_ENERGY_DB", "-45")),
+            "zcr_threshold": float(os.getenv("VAD_ZCR", "0.25")),
+            "hangover_ms": int(os.getenv("VAD_HANGOVER_MS", "400")),
+            "padding_ms": int(os.getenv("VAD_PADDING_MS", "200")),
+        }
+
+    if os.getenv("AUDIO_ALWAYS_ON", "0").lower() in ("1", "true", "yes"):
+        start_persistent_stream(int(os.getenv("PREROLL_MS", "500")))
+
+def create_trimmer():
+    """Crea un recortador de silencio con la configuración VAD_*, o None"""
+    if vad_settings is None:
+        return None
+    detector = VoiceActivityDetector(
+        sample_rate,
+        frame_ms=vad_settings["frame_ms"],
+        energy_threshold_db=vad_settings["energy_threshold_db"],
+        zcr_threshold=vad_settings["zcr_threshold"],
+    )
+    return SilenceTrimmer(detector, hangover_ms=vad_settings["hangover_ms"],
+                          padding_ms=vad_settings["padding_ms"])
+
+def start_persistent_stream(preroll_ms=500):
+    """Abre un stream de entrada permanente con un buffer de pre-roll.
+
+    Iniciar una grabación deja de abrir el dispositivo (decenas o cientos de
+    ms en PipeWire/ALSA) y los últimos ``preroll_ms`` se anteponen al audio,
+    de modo que no se recorta la primera sílaba.
+    """
+    global persistent_stream, preroll, blocksize
+    if persistent_stream is not None:
+        return
+    # Bloques grandes (100 ms por defecto) mantienen acotado el uso de CPU en reposo
+    blocksize = int(os.getenv("AUDIO_BLOCKSIZE", str(sample_rate // 10)))
+    preroll = PreRollBuffer(int(sample_rate * preroll_ms / 1000))
+    try:
+        import sounddevice as sd
+        stream = sd.InputStream(samplerate=sample_rate, channels=1, dtype=capture_dtype,
+                                blocksize=blocksize, callback=audio_callback)
+        stream.start()
+        persistent_stream = stream
+        logger.info(f"Stream de audio siempre abierto (pre-roll de {preroll_ms} ms, bloques de {blocksize})")
+    except Exception as e:
+        logger.warning(f"No se pudo abrir el stream permanente, se abrirá en cada grabación: {e}")
+        preroll = None
+
+def stop_persistent_stream():
+    """Cierra el stream permanente si está abierto"""
+    global persistent_stream, preroll
+    stream = persistent_stream
+    persistent_stream = None
+    preroll = None
+    if stream is not None:
+        stream.close()
 
 def audio_callback(indata, frames_count, time, status):
     """Callback para el InputStream de sounddevice"""
-    global audio_frames
-    if recording:
-        audio_frames.append(indata.copy())
+    session = current_session
+    if session is not None and session.active:
+        if session.needs_preroll:
+            session.needs_preroll = False
+            if preroll is not None:
+                session.write(preroll.snapshot())
+        session.write(indata)
+    elif preroll is not None:
+        preroll.write(indata)
 
-def record_audio_continuous():
+def record_audio_continuous(on_audio=None, on_start=None):
     """Graba audio continuamente hasta que se detiene manualmente.
-    
+
     Args:
-        bubble_manager: Instancia de BubbleManager para mostrar/ocultar la burbuja.
-    """
-    global audio_frames
-    global recording
-    recording = True
-    audio_frames = [] 
-    # Conectar la señal de cierre de la burbuja para detener la grabación
+        on_audio: Callback opcional que recibe cada bloque int16 según se
+            graba (tras el VAD), p. ej. para subirlo en streaming.
+        on_start: Callback opcional que recibe la sesión recién creada, antes
+            de abrir el stream (p. ej. para aplicar una parada ya pedida).
 
+    Returns:
+        np.ndarray | None: Vista int16 del audio grabado, o None si no hay audio.
+    """
+    global current_session
+    session = RecordingSession(sample_rate, trimmer=create_trimmer(), on_audio=on_audio)
+    current_session = session
+    if on_start is not None:
+        on_start(session)
 
-    bubble_manager.bubble_closed.connect(stop_recording)
-    bubble_manager.show_bubble.emit()  # Mostrar la burbuja
+    _bubble_manager().show_bubble.emit()  # Mostrar la burbuja
     
-    print("Grabando audio continuamente... (haz clic en la burbuja o presiona ESC para detener)")
+    logger.info("Grabando audio continuamente... (haz clic en la burbuja o presiona ESC para detener)")
 
     try:
-        with sd.InputStream(samplerate=sample_rate, channels=1, callback=audio_callback):
-            while recording:
-                # Pequeña pausa para evitar alto uso de CPU
-                if bubble_manager.recording_bubble == None:
-                    stop_recording()
-                threading.Event().wait(0.5)
-
+        if persistent_stream is not None or not session.active:
+            # El stream ya está abierto (o la parada llegó antes de abrirlo):
+            # grabar solo es empezar a guardar bloques
+            session.wait()
+        else:
+            with telemetry.span("stream_open"):
+                import sounddevice as sd
+                stream = sd.InputStream(samplerate=sample_rate, channels=1, dtype=capture_dtype,
+                                        blocksize=blocksize, callback=audio_callback)
+                stream.start()
+            try:
+                # Sin sondeo: el hilo duerme hasta que alguien llama a stop()
+                session.wait()
+            finally:
+                stream.stop()
+                stream.close()
     except Exception as e:
-        print(f"Error durante la grabación: {e}")
+        logger.error(f"Error durante la grabación: {e}")
     finally:
-        if recording:
-            recording = False
-            bubble_manager._hide_bubble()  # Asegurarse de cerrar la burbuja
-
-    # Procesar todo el audio recogido si la grabación se detuvo correctamente
-    if audio_frames:
-        audio_data = np.concatenate(audio_frames)
-        return audio_data
+        session.stop()
+        session.mark_stopped()
+        _bubble_manager().hide_bubble.emit()  # Asegurarse de cerrar la burbuja
+
+    if session.stop_latency is not None:
+        logger.debug(f"Grabación detenida en {session.stop_latency * 1000:.1f} ms")
+
+    session.finish()
+    if session.trimmer is not None:
+        stats = session.trimmer.stats()
+        logger.debug(f"VAD: descartados {stats['dropped_seconds']:.2f} s de "
+                     f"{stats['input_seconds']:.2f} s ({stats['dropped_ratio']:.0%})")
+
+    # Devolver una vista int16 del audio recogido (sin concatenar ni copiar)
+    if len(session.buffer):
+        return session.buffer.get_audio()
     return None
 
 def is_recording():
     """Devuelve si actualmente se está grabando"""
-    return recording
+    session = current_session
+    return session is not None and session.active
 
 def stop_recording():
-    global recording
-    recording = False
\ No newline at end of file
+    """Detiene la grabación en curso, si la hay"""
+    session = current_session
+    if session is not None:
+        session.stop()
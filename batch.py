@@ -0,0 +1,272 @@
+"""
+Transcripción por lotes de ficheros de audio, sin interfaz gráfica.
+
+Cada fichero pasa por decodificar → remuestrear → recortar silencio en un
+pool de procesos y después por la transcripción en un pool de hilos, que
+usa el mismo proveedor (y por tanto el mismo planificador de cuota) que la
+aplicación interactiva. Los resultados se añaden a un JSONL según terminan;
+al relanzar con la misma salida se saltan los ficheros ya completados.
+
+Uso:
+    python main.py transcribe <ficheros|directorios> [-o salida.jsonl]
+        [--workers 2] [--jobs 4] [--trim | --no-trim]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import (FIRST_COMPLETED, ProcessPoolExecutor,
+                                ThreadPoolExecutor, wait)
+from math import gcd
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from audio_buffer import to_int16
+
+AUDIO_EXTENSIONS = (".wav", ".flac", ".ogg", ".opus", ".mp3")
+
+
+def find_audio_files(paths: List[str]) -> Iterator[str]:
+    """Expande directorios (recursivamente) a sus ficheros de audio, en orden"""
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    if name.lower().endswith(AUDIO_EXTENSIONS):
+                        yield os.path.join(root, name)
+        elif os.path.isfile(path):
+            yield path
+        else:
+            print(f"No existe: {path}", file=sys.stderr)
+
+
+def file_signature(path: str) -> Dict:
+    """Identifica una versión concreta de un fichero para poder reanudar"""
+    st = os.stat(path)
+    return {"file": os.path.abspath(path), "size": st.st_size, "mtime": int(st.st_mtime)}
+
+
+def decode_audio(path: str) -> Tuple[np.ndarray, int]:
+    """Lee un fichero de audio y lo devuelve en int16 mono"""
+    try:
+        import soundfile as sf
+    except ImportError:
+        sf = None
+    if sf is not None:
+        data, sr = sf.read(path, dtype="int16", always_2d=True)
+    else:
+        from scipy.io import wavfile
+        sr, data = wavfile.read(path, mmap=True)
+        if data.ndim == 1:
+            data = data[:, None]
+        if data.dtype == np.int32:
+            data = (data >> 16).astype(np.int16)
+        elif data.dtype == np.uint8:
+            data = ((data.astype(np.int16) - 128) << 8).astype(np.int16)
+    if data.shape[1] == 1:
+        return to_int16(np.asarray(data[:, 0])), sr
+    # Mezcla a mono en int32 para no desbordar
+    return (data.astype(np.int32).sum(axis=1) // data.shape[1]).astype(np.int16), sr
+
+
+def resample(samples: np.ndarray, sample_rate: int, target_rate: int) -> np.ndarray:
+    """Remuestreo polifásico a ``target_rate``"""
+    if sample_rate == target_rate or not len(samples):
+        return samples
+    from scipy.signal import resample_poly
+    g = gcd(sample_rate, target_rate)
+    audio = resample_poly(samples.astype(np.float32), target_rate // g, sample_rate // g)
+    return np.clip(audio, -32768, 32767).astype(np.int16)
+
+
+def trim_silence(samples: np.ndarray, sample_rate: int, vad: Dict) -> np.ndarray:
+    """Aplica el mismo recorte de silencio que la grabación en vivo"""
+    from vad import SilenceTrimmer, VoiceActivityDetector
+    detector = VoiceActivityDetector(
+        sample_rate,
+        frame_ms=vad["frame_ms"],
+        energy_threshold_db=vad["energy_threshold_db"],
+        zcr_threshold=vad["zcr_threshold"],
+    )
+    trimmer = SilenceTrimmer(detector, hangover_ms=vad["hangover_ms"],
+                             padding_ms=vad["padding_ms"])
+    kept = trimmer.process(samples)
+    rest = trimmer.flush()
+    return np.concatenate((kept, rest)) if len(rest) else kept
+
+
+def prepare_file(path: str, target_rate: int, vad: Optional[Dict]) -> Dict:
+    """Etapas de CPU: decodificar, remuestrear y recortar (en un proceso del pool)"""
+    samples, sr = decode_audio(path)
+    duration = len(samples) / sr if sr else 0.0
+    samples = resample(samples, sr, target_rate)
+    if vad is not None:
+        samples = trim_silence(samples, target_rate, vad)
+    return {"audio": samples, "duration": duration,
+            "trimmed_duration": len(samples) / target_rate}
+
+
+def vad_settings_from_env() -> Dict:
+    """Parámetros VAD_* del entorno (los mismos que usa la grabación)"""
+    return {
+        "frame_ms": int(os.getenv("VAD_FRAME_MS", "30")),
+        "energy_threshold_db": float(os.getenv("VAD_ENERGY_DB", "-45")),
+        "zcr_threshold": float(os.getenv("VAD_ZCR", "0.25")),
+        "hangover_ms": int(os.getenv("VAD_HANGOVER_MS", "400")),
+        "padding_ms": int(os.getenv("VAD_PADDING_MS", "200")),
+    }
+
+
+def load_completed(output: str) -> set:
+    """Firmas de los ficheros ya transcritos con éxito en una salida anterior"""
+    done = set()
+    if not os.path.exists(output):
+        return done
+    with open(output, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # línea cortada por una interrupción
+            if record.get("status") == "ok":
+                done.add((record.get("file"), record.get("size"), record.get("mtime")))
+    return done
+
+
+class BatchTranscriber:
+    """Pipeline por lotes con preparación en procesos y transcripción en hilos."""
+
+    def __init__(self, transcriber, output: str, sample_rate: int = 16000,
+                 vad: Optional[Dict] = None, workers: int = 2, jobs: int = 4):
+        self.transcriber = transcriber
+        self.output = output
+        self.sample_rate = sample_rate
+        self.vad = vad
+        self.workers = max(workers, 1)
+        self.jobs = max(jobs, 1)
+        self.stats = {"ok": 0, "error": 0, "skipped": 0, "audio_seconds": 0.0}
+
+    def _transcribe(self, signature: Dict, prepared: Dict) -> Dict:
+        record = dict(signature, duration=round(prepared["duration"], 3),
+                      trimmed_duration=round(prepared["trimmed_duration"], 3))
+        audio = prepared["audio"]
+        if not len(audio):
+            # Solo silencio: no hace falta llamar al proveedor
+            record.update(status="ok", text="")
+            return record
+        from transcription.interfaces import transcription_failed
+        started = time.perf_counter()
+        text = self.transcriber.transcribe(audio, self.sample_rate)
+        record["latency"] = round(time.perf_counter() - started, 3)
+        # Un resultado vacío (sin voz) es válido; solo "" plano o None es un fallo
+        if not transcription_failed(text):
+            record.update(status="ok", text=str(text),
+                          model=getattr(text, "model", ""),
+                          provider=getattr(text, "provider", ""))
+        else:
+            # Los servicios devuelven "" al fallar; se reintentará al reanudar
+            record.update(status="error", error="transcripción fallida")
+        return record
+
+    def _write(self, out, record: Dict) -> None:
+        out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        out.flush()
+        self.stats[record["status"]] += 1
+        self.stats["audio_seconds"] += record.get("duration", 0.0)
+        label = record.get("text") if record["status"] == "ok" else record.get("error")
+        print(f"[{record['status']}] {record['file']}: {label}")
+
+    def run(self, paths: List[str]) -> Dict:
+        completed = load_completed(self.output)
+        # Como mucho este número de audios preparados en memoria a la vez
+        window = self.workers + self.jobs
+        pending_files = iter(find_audio_files(paths))
+        started = time.perf_counter()
+
+        with open(self.output, "a", encoding="utf-8") as out, \
+                ProcessPoolExecutor(max_workers=self.workers) as prepare_pool, \
+                ThreadPoolExecutor(max_workers=self.jobs) as transcribe_pool:
+            in_flight = {}
+
+            def refill():
+                while len(in_flight) < window:
+                    path = next(pending_files, None)
+                    if path is None:
+                        return
+                    try:
+                        signature = file_signature(path)
+                    except OSError as e:
+                        print(f"No se puede leer {path}: {e}", file=sys.stderr)
+                        continue
+                    key = (signature["file"], signature["size"], signature["mtime"])
+                    if key in completed:
+                        self.stats["skipped"] += 1
+                        continue
+                    future = prepare_pool.submit(prepare_file, path, self.sample_rate, self.vad)
+                    in_flight[future] = ("prepare", signature)
+
+            refill()
+            while in_flight:
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    stage, signature = in_flight.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        self._write(out, dict(signature, status="error",
+                                              error=f"{stage}: {type(e).__name__}: {e}"))
+                        continue
+                    if stage == "prepare":
+                        next_future = transcribe_pool.submit(self._transcribe, signature, result)
+                        in_flight[next_future] = ("transcribe", signature)
+                    else:
+                        self._write(out, result)
+                refill()
+
+        self.stats["elapsed"] = time.perf_counter() - started
+        return self.stats
+
+
+def run_batch_command(args: List[str]) -> int:
+    """Punto de entrada de ``main.py transcribe``"""
+    parser = argparse.ArgumentParser(prog="main.py transcribe",
+                                     description="Transcribe ficheros de audio por lotes")
+    parser.add_argument("paths", nargs="+", help="Ficheros o directorios de audio")
+    parser.add_argument("-o", "--output", default="transcriptions.jsonl",
+                        help="Fichero JSONL de resultados (se reanuda si existe)")
+    parser.add_argument("--workers", type=int, default=max((os.cpu_count() or 2) // 2, 1),
+                        help="Procesos para decodificar, remuestrear y recortar")
+    parser.add_argument("--jobs", type=int, default=None,
+                        help="Transcripciones simultáneas (por defecto RATE_LIMIT_MAX_CONCURRENCY)")
+    parser.add_argument("--sample-rate", type=int, default=None,
+                        help="Frecuencia enviada al proveedor (por defecto SAMPLE_RATE)")
+    trim = parser.add_mutually_exclusive_group()
+    trim.add_argument("--trim", dest="trim", action="store_true", default=None,
+                      help="Recortar silencios con el VAD")
+    trim.add_argument("--no-trim", dest="trim", action="store_false")
+    options = parser.parse_args(args)
+
+    from config import load_config
+    from transcription.factory import setup_transcription, get_transcriber
+    load_config()
+    setup_transcription({})
+
+    trim_enabled = options.trim
+    if trim_enabled is None:
+        trim_enabled = os.getenv("VAD_ENABLED", "0").lower() in ("1", "true", "yes")
+    batch = BatchTranscriber(
+        get_transcriber(),
+        options.output,
+        sample_rate=options.sample_rate or int(os.getenv("SAMPLE_RATE", "16000")),
+        vad=vad_settings_from_env() if trim_enabled else None,
+        workers=options.workers,
+        jobs=options.jobs or int(os.getenv("RATE_LIMIT_MAX_CONCURRENCY", "4")),
+    )
+    stats = batch.run(options.paths)
+    print(f"Completados: {stats['ok']}, errores: {stats['error']}, "
+          f"ya transcritos: {stats['skipped']}, audio: {stats['audio_seconds']:.1f} s "
+          f"en {stats['elapsed']:.1f} s")
+    return 1 if stats["error"] else 0
@@ -0,0 +1,4 @@
+"""
+Benchmarks de rendimiento. Se ejecutan desde la raíz del repositorio con
+``python -m benchmarks.<nombre>``.
+"""
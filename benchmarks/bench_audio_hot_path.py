@@ -0,0 +1,289 @@
+"""
+Microbenchmarks del camino crítico del audio.
+
+- ``callback``: coste por bloque de ``audio_callback`` (grabando en int16 y
+  float32, con y sin VAD, y en reposo escribiendo el pre-roll) y bytes
+  reservados por bloque según ``tracemalloc``.
+- ``buffer``: crecimiento de ``AudioBuffer`` (peor ``append``, número de
+  reservas) y coste de finalizar la grabación.
+- ``convert``/``encode``: conversión float→int16 y codificación WAV como en
+  ``GroqTranscriptionService.transcribe``, en MB/s.
+- ``rss``: pico de memoria residente grabando 10 s, 5 min y 60 min (cada
+  duración en un proceso aparte para que los picos no se mezclen).
+
+Los resultados se guardan como JSON plano ``{métrica: {value, unit}}`` con
+el commit actual, y ``--compare`` muestra la variación frente a otro JSON.
+
+Uso:
+    python -m benchmarks.bench_audio_hot_path [--json hot_path.json]
+        [--compare anterior.json] [--quick]
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from benchmarks.audio_fixtures import synthetic_speech
+from benchmarks.fakes import FakeSoundDevice
+
+SAMPLE_RATE = 16000
+BLOCK = SAMPLE_RATE // 10
+RSS_SECONDS = (10, 300, 3600)
+
+
+def _import_recorder():
+    """Importa ``audio_recorder`` con un ``sounddevice`` simulado"""
+    if "sounddevice" not in sys.modules:
+        FakeSoundDevice().install()
+    import audio_recorder
+    return audio_recorder
+
+
+def _blocks(seconds: float, dtype: str):
+    audio = synthetic_speech(seconds, SAMPLE_RATE)
+    if dtype == "float32":
+        audio = audio.astype(np.float32) / 32768.0
+    n = len(audio) // BLOCK
+    return audio[:n * BLOCK].reshape(n, BLOCK, 1)
+
+
+def bench_callback(recorder, dtype: str, vad: bool, recording: bool, seconds: float) -> dict:
+    """Tiempo por llamada de ``audio_callback`` y memoria reservada por bloque"""
+    recorder.sample_rate = SAMPLE_RATE
+    recorder.vad_settings = {"frame_ms": 30, "energy_threshold_db": -45.0, "zcr_threshold": 0.25,
+                             "hangover_ms": 400, "padding_ms": 200} if vad else None
+    recorder.preroll = recorder.PreRollBuffer(SAMPLE_RATE // 2)
+    blocks = _blocks(seconds, dtype)
+    # PortAudio reutiliza el mismo buffer de entrada en cada llamada
+    indata = np.empty_like(blocks[0])
+
+    def run(measure):
+        session = recorder.RecordingSession(SAMPLE_RATE, trimmer=recorder.create_trimmer())
+        recorder.current_session = session if recording else None
+        samples = []
+        for block in blocks:
+            indata[:] = block
+            if measure:
+                start = time.perf_counter()
+                recorder.audio_callback(indata, BLOCK, None, None)
+                samples.append(time.perf_counter() - start)
+            else:
+                # Memoria reservada (aunque sea temporal) durante la llamada
+                tracemalloc.reset_peak()
+                before = tracemalloc.get_traced_memory()[0]
+                recorder.audio_callback(indata, BLOCK, None, None)
+                samples.append(tracemalloc.get_traced_memory()[1] - before)
+        recorder.current_session = None
+        return np.array(samples)
+
+    times = run(measure=True) * 1e6
+    tracemalloc.start()
+    allocs = run(measure=False)
+    tracemalloc.stop()
+    return {"p50": float(np.percentile(times, 50)), "p99": float(np.percentile(times, 99)),
+            "max": float(times.max()), "alloc_p50": float(np.percentile(allocs, 50)),
+            "alloc_max": float(allocs.max())}
+
+
+def bench_buffer(recorder, seconds: float) -> dict:
+    """Crecimiento geométrico del buffer y coste de finalizar"""
+    blocks = _blocks(seconds, "int16")
+    buffer = recorder.AudioBuffer(SAMPLE_RATE)
+    grows, worst, last_capacity = 0, 0.0, buffer.capacity
+    start = time.perf_counter()
+    for block in blocks:
+        t = time.perf_counter()
+        buffer.append(block)
+        worst = max(worst, time.perf_counter() - t)
+        if buffer.capacity != last_capacity:
+            grows, last_capacity = grows + 1, buffer.capacity
+    total = time.perf_counter() - start
+    t = time.perf_counter()
+    audio = buffer.get_audio()
+    finalize = time.perf_counter() - t
+    assert len(audio) == blocks.size
+    return {"append_total_ms": total * 1000, "append_worst_us": worst * 1e6,
+            "grows": grows, "finalize_us": finalize * 1e6}
+
+
+def _throughput(fn, nbytes: int, repeat: int) -> float:
+    best = min(_timed(fn) for _ in range(repeat))
+    return nbytes / best / 1e6
+
+
+def _timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def bench_convert_encode(seconds: float, repeat: int) -> dict:
+    from audio_buffer import to_int16
+    from transcription.encoders import WavEncoder
+    audio_int16 = synthetic_speech(seconds, SAMPLE_RATE)
+    audio_float = audio_int16.astype(np.float32) / 32768.0
+    encoder = WavEncoder()
+    return {
+        # Misma conversión que GroqTranscriptionService.transcribe con audio float
+        "convert_service_mb_s": _throughput(lambda: np.int16(audio_float * 32767),
+                                            audio_float.nbytes, repeat),
+        "convert_to_int16_mb_s": _throughput(lambda: to_int16(audio_float),
+                                             audio_float.nbytes, repeat),
+        "encode_wav_mb_s": _throughput(lambda: encoder.encode(audio_int16, SAMPLE_RATE),
+                                       audio_int16.nbytes, repeat),
+    }
+
+
+def _reset_peak_rss() -> bool:
+    """Reinicia el pico de RSS (VmHWM) en Linux para no contar el de los imports"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _max_rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss está en KiB en Linux y en bytes en macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def rss_child(seconds: float) -> None:
+    """Graba ``seconds`` de audio por el callback y lo codifica; imprime el pico"""
+    recorder = _import_recorder()
+    from transcription.encoders import WavEncoder
+    recorder.sample_rate = SAMPLE_RATE
+    recorder.vad_settings = None
+    recorder.preroll = None
+    block = (synthetic_speech(1, SAMPLE_RATE)[:BLOCK]).reshape(BLOCK, 1)
+    _reset_peak_rss()
+    baseline = _max_rss_mb()
+    session = recorder.RecordingSession(SAMPLE_RATE)
+    recorder.current_session = session
+    for _ in range(int(seconds * SAMPLE_RATE) // BLOCK):
+        recorder.audio_callback(block, BLOCK, None, None)
+    recorder.current_session = None
+    recorded = _max_rss_mb()
+    payload = WavEncoder().encode(session.buffer.get_audio(), SAMPLE_RATE)
+    encoded = _max_rss_mb()
+    print(json.dumps({"baseline_mb": baseline, "recorded_mb": recorded, "encoded_mb": encoded,
+                      "audio_mb": session.buffer.get_audio().nbytes / 1e6,
+                      "payload_mb": len(payload) / 1e6}))
+
+
+def bench_rss(seconds: float) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_audio_hot_path", "--rss-child", str(seconds)],
+        capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def run_all(quick: bool) -> dict:
+    recorder = _import_recorder()
+    metrics = {}
+
+    def add(name, value, unit):
+        metrics[name] = {"value": round(float(value), 3), "unit": unit}
+
+    seconds = 10 if quick else 60
+    for dtype in ("int16", "float32"):
+        for vad in (False, True):
+            r = bench_callback(recorder, dtype, vad, recording=True, seconds=seconds)
+            key = f"callback.{dtype}{'.vad' if vad else ''}"
+            add(f"{key}.p50", r["p50"], "us")
+            add(f"{key}.p99", r["p99"], "us")
+            add(f"{key}.alloc_p50", r["alloc_p50"], "bytes")
+            add(f"{key}.alloc_max", r["alloc_max"], "bytes")
+    r = bench_callback(recorder, "int16", False, recording=False, seconds=seconds)
+    add("callback.idle_preroll.p50", r["p50"], "us")
+    add("callback.idle_preroll.alloc_p50", r["alloc_p50"], "bytes")
+    add("callback.idle_preroll.alloc_max", r["alloc_max"], "bytes")
+
+    for buffer_seconds in ((60,) if quick else (60, 600)):
+        r = bench_buffer(recorder, buffer_seconds)
+        for name, value in r.items():
+            add(f"buffer.{buffer_seconds}s.{name}", value, name.rsplit("_", 1)[-1] if "_" in name else "count")
+
+    for name, value in bench_convert_encode(30, repeat=3 if quick else 10).items():
+        add(f"{name.rsplit('_mb_s', 1)[0]}.30s", value, "MB/s")
+
+    for rss_seconds in (RSS_SECONDS[:2] if quick else RSS_SECONDS):
+        r = bench_rss(rss_seconds)
+        add(f"rss.{rss_seconds}s.peak", r["encoded_mb"], "MB")
+        add(f"rss.{rss_seconds}s.over_baseline", r["encoded_mb"] - r["baseline_mb"], "MB")
+        add(f"rss.{rss_seconds}s.audio", r["audio_mb"], "MB")
+    return metrics
+
+
+def compare(current: dict, previous: dict) -> None:
+    print(f"\nComparación con {previous.get('commit') or 'anterior'}:")
+    for name, metric in current["metrics"].items():
+        old = previous.get("metrics", {}).get(name)
+        if old is None or not old["value"]:
+            continue
+        change = (metric["value"] - old["value"]) / old["value"]
+        print(f"  {name:<40} {old['value']:>12.3f} -> {metric['value']:>12.3f} "
+              f"{metric['unit']:<6} ({change:+.1%})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--json", help="Guardar los resultados en este fichero")
+    parser.add_argument("--compare", help="JSON de una ejecución anterior para comparar")
+    parser.add_argument("--quick", action="store_true",
+                        help="Duraciones cortas y sin la grabación de 60 min")
+    parser.add_argument("--rss-child", type=float, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.rss_child is not None:
+        rss_child(args.rss_child)
+        return
+
+    metrics = run_all(args.quick)
+    results = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "metrics": metrics,
+    }
+    for name, metric in metrics.items():
+        print(f"{name:<40} {metric['value']:>12.3f} {metric['unit']}")
+
+    if args.compare and os.path.exists(args.compare):
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare(results, json.load(f))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Resultados guardados en {args.json}")
+
+
+if __name__ == "__main__":
+    main()
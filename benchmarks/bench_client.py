@@ -0,0 +1,270 @@
+"""
+Latencia del cliente ligero (``client.py``) frente a la instancia principal.
+
+Levanta el servidor socket en este proceso, en un socket temporal y con
+órdenes simuladas (sin grabar ni transcribir), y mide:
+
+- ``roundtrip``: ida y vuelta de cada orden desde este mismo proceso.
+- ``event``: desde ``set_server_state`` hasta que un suscriptor recibe el evento.
+- ``process``: ``python client.py <orden>`` completo en un proceso nuevo,
+  junto a ``python -c pass`` como referencia del arranque del intérprete y,
+  con ``--compare-main``, a ``python main.py --transcript``.
+- ``imports``: módulos que importa el cliente según ``-X importtime``; falla
+  si aparece alguno pesado (Qt, numpy, requests, sounddevice...).
+
+Con ``--real-handlers`` las órdenes van a ``keyboard_listener`` (micrófono
+simulado, transcriptor lento simulado, sin pegar texto) en lugar de al
+controlador simulado, y se comprueban las carreras de arranque y parada:
+STOP justo después de START, TOGGLE doble y un dictado nuevo mientras el
+anterior aún se transcribe. Todas deben acabar en ``idle`` sin grabaciones
+huérfanas.
+
+Sale con código 1 si la mediana de algún proceso cliente supera
+``--target-ms``, si el cliente importa módulos pesados o si falla alguna
+comprobación de carreras.
+
+Uso:
+    python -m benchmarks.bench_client [--runs 20] [--target-ms 100]
+        [--compare-main] [--real-handlers] [--json cliente.json]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+import socket_server
+from startup_profile import parse_importtime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLIENT = os.path.join(ROOT, "client.py")
+HEAVY_MODULES = ("PyQt5", "numpy", "requests", "sounddevice", "pyautogui", "pynput",
+                 "scipy", "tkinter", "dotenv", "adapters", "transcription", "asyncio")
+
+
+class FakeController:
+    """Estado de grabación simulado detrás de las órdenes del socket."""
+
+    def start(self):
+        if socket_server.server_state == "recording":
+            return {"ok": False, "error": "ya se está grabando"}
+        socket_server.set_server_state("recording")
+        return {"ok": True, "action": "start"}
+
+    def stop(self):
+        if socket_server.server_state != "recording":
+            return {"ok": False, "error": "no se está grabando"}
+        socket_server.set_server_state("idle")
+        return {"ok": True, "action": "stop"}
+
+    def toggle(self):
+        return self.stop() if socket_server.server_state == "recording" else self.start()
+
+    def commands(self):
+        return {"START": self.start, "STOP": self.stop, "TOGGLE": self.toggle}
+
+
+class SlowTranscriber:
+    """Transcriptor simulado que tarda ``delay`` segundos."""
+
+    def __init__(self, delay=0.2):
+        self.delay = delay
+
+    def transcribe(self, audio, sample_rate):
+        time.sleep(self.delay)
+        return "texto"
+
+
+def real_commands():
+    """Órdenes de la aplicación (``keyboard_listener``) sobre dispositivos simulados"""
+    from benchmarks.fakes import FakeSoundDevice, RecordingAdapter
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    os.environ["SPOOL_ENABLED"] = "0"
+    FakeSoundDevice(speed=1.0).install()
+    from PyQt5.QtWidgets import QApplication
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    import audio_recorder
+    import transcription.factory
+    import transcription.utils
+    import keyboard_listener
+    transcription.utils._os_adapter = RecordingAdapter()
+    transcription.factory._transcription_instance = SlowTranscriber()
+    audio_recorder.setup_recorder({})
+    socket_server.set_server_state("idle")
+    return app, {name: (lambda name=name: keyboard_listener.handle_remote_command(name))
+                 for name in ("START", "STOP", "TOGGLE")}
+
+
+def wait_state(state, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if socket_server.server_state == state:
+            return True
+        time.sleep(0.005)
+    return False
+
+
+def race_checks(runs):
+    """Carreras de arranque y parada; devuelve la lista de fallos"""
+    import audio_recorder
+    failures = []
+    for i in range(runs):
+        # STOP antes de que el hilo del dictado haya creado la sesión
+        if not socket_server.send_command("START").get("ok"):
+            failures.append(f"{i}: START rechazado")
+        if not socket_server.send_command("STOP").get("ok"):
+            failures.append(f"{i}: STOP inmediato rechazado")
+        if not wait_state("idle"):
+            failures.append(f"{i}: START+STOP no vuelve a idle ({socket_server.server_state})")
+        # TOGGLE doble: el segundo para la grabación que abrió el primero
+        socket_server.send_command("TOGGLE")
+        socket_server.send_command("TOGGLE")
+        if not wait_state("idle"):
+            failures.append(f"{i}: TOGGLE doble no vuelve a idle ({socket_server.server_state})")
+        # Dictado nuevo mientras el anterior se transcribe
+        socket_server.send_command("START")
+        time.sleep(0.05)
+        socket_server.send_command("STOP")
+        wait_state("transcribing")
+        socket_server.send_command("START")
+        time.sleep(0.3)  # el primero termina de transcribir
+        if socket_server.server_state != "recording" or not audio_recorder.is_recording():
+            failures.append(f"{i}: el dictado anterior pisó el estado ({socket_server.server_state})")
+        socket_server.send_command("STOP")
+        if not wait_state("idle"):
+            failures.append(f"{i}: el segundo dictado no vuelve a idle ({socket_server.server_state})")
+    orphans = [t.name for t in threading.enumerate() if t.name == "fake-portaudio"]
+    if orphans:
+        failures.append(f"{len(orphans)} streams de audio sin cerrar")
+    return failures
+
+
+def percentiles(values_ms):
+    values = np.array(values_ms)
+    return {"p50": float(np.percentile(values, 50)), "p95": float(np.percentile(values, 95)),
+            "p99": float(np.percentile(values, 99))}
+
+
+def time_process(command, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=ROOT, capture_output=True)
+        samples.append((time.perf_counter() - start) * 1000)
+    return percentiles(samples)
+
+
+def client_imports():
+    process = subprocess.run([sys.executable, "-X", "importtime", CLIENT, "status"],
+                             cwd=ROOT, capture_output=True, text=True)
+    imports = parse_importtime(process.stderr)
+    heavy = sorted({item["module"] for item in imports
+                    if item["module"].split(".")[0] in HEAVY_MODULES})
+    total = sum(item["self_ms"] for item in imports)
+    return {"modules": len(imports), "import_ms": round(total, 3), "heavy": heavy}
+
+
+def event_latency(runs):
+    """Milisegundos desde el cambio de estado hasta que lo recibe un suscriptor"""
+    samples, received = [], threading.Event()
+    sent_at = {}
+
+    def listen():
+        for event in socket_server.subscribe():
+            if event.get("event") == "state":
+                samples.append((time.perf_counter() - sent_at["t"]) * 1000)
+                received.set()
+
+    threading.Thread(target=listen, daemon=True).start()
+    time.sleep(0.1)  # que la suscripción esté registrada
+    for i in range(runs):
+        received.clear()
+        sent_at["t"] = time.perf_counter()
+        socket_server.set_server_state("recording" if i % 2 == 0 else "idle")
+        received.wait(1)
+    socket_server.set_server_state("idle")
+    return percentiles(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--target-ms", type=float, default=100,
+                        help="Mediana máxima de una orden del cliente en un proceso nuevo")
+    parser.add_argument("--compare-main", action="store_true",
+                        help="Medir también python main.py --transcript")
+    parser.add_argument("--real-handlers", action="store_true",
+                        help="Órdenes sobre keyboard_listener con dispositivos simulados")
+    parser.add_argument("--json", default=None, help="Guardar los resultados en JSON")
+    args = parser.parse_args()
+
+    # Socket propio: no interfiere con una instancia real (los clientes lo heredan)
+    os.environ["AIR_TYPE_SOCKET"] = os.path.join(tempfile.mkdtemp(prefix="air-type-"), "bench.sock")
+    app = None
+    if args.real_handlers:
+        app, commands = real_commands()
+    else:
+        commands = FakeController().commands()
+    if not socket_server.start_server(commands, wait=True):
+        print("No se pudo abrir el servidor socket.")
+        return 1
+
+    results = {"roundtrip": {}, "process": {}, "races": []}
+    try:
+        if args.real_handlers:
+            results["races"] = race_checks(args.runs)
+        for command in ("TOGGLE", "START", "STOP", "STATUS"):
+            samples = []
+            for _ in range(args.runs * 10):
+                start = time.perf_counter()
+                socket_server.send_command(command)
+                samples.append((time.perf_counter() - start) * 1000)
+            results["roundtrip"][command.lower()] = percentiles(samples)
+        results["roundtrip"]["event"] = event_latency(args.runs * 10)
+
+        results["process"]["python -c pass"] = time_process([sys.executable, "-c", "pass"], args.runs)
+        for name in ("toggle", "start", "stop", "status"):
+            results["process"][f"client {name}"] = time_process([sys.executable, CLIENT, name], args.runs)
+        if args.compare_main:
+            results["process"]["main --transcript"] = time_process(
+                [sys.executable, os.path.join(ROOT, "main.py"), "--transcript"], args.runs)
+        results["imports"] = client_imports()
+        if args.real_handlers:
+            socket_server.send_command("STOP")
+    finally:
+        socket_server.stop_server()
+        if app is not None:
+            app.quit()
+
+    print("Ida y vuelta en el mismo proceso (ms):")
+    for name, row in results["roundtrip"].items():
+        print(f"  {name:<20} p50 {row['p50']:7.3f}  p99 {row['p99']:7.3f}")
+    print("Proceso completo (ms):")
+    for name, row in results["process"].items():
+        print(f"  {name:<20} p50 {row['p50']:7.1f}  p95 {row['p95']:7.1f}")
+    imports = results["imports"]
+    print(f"Imports del cliente: {imports['modules']} módulos, {imports['import_ms']:.1f} ms"
+          + (f", pesados: {', '.join(imports['heavy'])}" if imports["heavy"] else ""))
+
+    if args.real_handlers:
+        print(f"Carreras de arranque/parada: {len(results['races']) or 'OK'}"
+              + "".join(f"\n  {failure}" for failure in results["races"]))
+
+    passed = not imports["heavy"] and not results["races"] and all(
+        row["p50"] <= args.target_ms for name, row in results["process"].items()
+        if name.startswith("client"))
+    print(f"\nObjetivo {args.target_ms:g} ms: {'OK' if passed else 'SUPERADO'}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"target_ms": args.target_ms, "passed": passed, **results}, f, indent=2)
+        print(f"Resultados guardados en {args.json}")
+    return 0 if passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
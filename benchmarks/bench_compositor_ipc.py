@@ -0,0 +1,239 @@
+"""
+Latencia de las consultas al compositor: IPC directo frente a subprocesos.
+
+Por cada backend disponible (Hyprland, Sway, X11) mide por llamada:
+
+- ``ipc``: ventana activa y posición del cursor con ``adapters.compositor_ipc``.
+- ``subprocess``: lo mismo lanzando ``hyprctl``/``swaymsg``/``xdotool`` como
+  hacían los adaptadores (se omite si el binario no está).
+- ``adapter``: guardar la ventana y pedir el cursor como en un dictado,
+  en serie y con ``transcription.utils`` (ambas consultas a la vez).
+
+Con ``--fake`` no hace falta sesión gráfica: levanta servidores Hyprland y
+Sway simulados en sockets temporales, y la referencia de subproceso es
+``cat`` de una respuesta guardada (cota inferior: el binario real hace más).
+
+Uso:
+    python -m benchmarks.bench_compositor_ipc [--fake] [--iterations 200]
+        [--json compositor.json]
+"""
+import argparse
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from adapters import compositor_ipc
+
+PERCENTILES = (50, 99)
+
+
+def measure(fn, iterations):
+    """Microsegundos por llamada (p50/p99)"""
+    fn()  # calentamiento (conexión, imports)
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1e6)
+    return {f"p{p}": float(np.percentile(samples, p)) for p in PERCENTILES}
+
+
+def run_command(command):
+    return lambda: subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True)
+
+
+def fake_tree(windows=40):
+    """Árbol de sway con ``windows`` ventanas repartidas en 4 espacios de trabajo"""
+    next_id = iter(range(1, 10_000))
+    workspaces = []
+    for w in range(4):
+        nodes = [{"id": next(next_id), "type": "con", "name": f"ventana {i}", "focused": False,
+                  "nodes": [], "floating_nodes": [], "focus": [], "rect": {"x": 0, "y": 0}}
+                 for i in range(windows // 4)]
+        workspaces.append({"id": next(next_id), "type": "workspace", "name": str(w + 1),
+                           "nodes": nodes, "floating_nodes": [], "focus": [n["id"] for n in nodes]})
+    workspaces[1]["nodes"][2]["focused"] = True
+    workspaces[1]["focus"].insert(0, workspaces[1]["nodes"][2]["id"])
+    output = {"id": next(next_id), "type": "output", "nodes": workspaces, "floating_nodes": [],
+              "focus": [workspaces[1]["id"]] + [w["id"] for w in workspaces if w is not workspaces[1]]}
+    return {"id": 0, "type": "root", "focused": False, "nodes": [output], "floating_nodes": [],
+            "focus": [output["id"]]}
+
+
+class FakeHyprland:
+    """Socket de peticiones de Hyprland: una respuesta por conexión."""
+
+    REPLIES = {
+        "j/activewindow": json.dumps({"address": "0x5f3a2b10", "class": "kitty", "title": "zsh"}),
+        "j/cursorpos": json.dumps({"x": 812, "y": 455}),
+    }
+
+    def __init__(self, runtime_dir, signature="benchmark"):
+        self.signature = signature
+        directory = os.path.join(runtime_dir, "hypr", signature)
+        os.makedirs(directory)
+        self.path = os.path.join(directory, ".socket.sock")
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(self.path)
+        self.server.listen(16)
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def _serve(self):
+        while True:
+            try:
+                conn, _ = self.server.accept()
+            except OSError:
+                return
+            with conn:
+                command = conn.recv(4096).decode()
+                reply = self.REPLIES.get(command, "ok" if command.startswith("dispatch") else "unknown request")
+                conn.sendall(reply.encode())
+
+
+class FakeSway:
+    """Servidor i3-ipc con conexiones persistentes."""
+
+    def __init__(self, path, tree):
+        self.path = path
+        self.tree = json.dumps(tree).encode()
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(path)
+        self.server.listen(16)
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def _serve(self):
+        while True:
+            try:
+                conn, _ = self.server.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._client, args=(conn,), daemon=True).start()
+
+    def _client(self, conn):
+        header = compositor_ipc.SwayIPC.HEADER
+        with conn:
+            while True:
+                data = conn.recv(header.size)
+                if len(data) < header.size:
+                    return
+                _, length, message_type = header.unpack(data)
+                if length:
+                    conn.recv(length)
+                payload = self.tree if message_type == compositor_ipc.SwayIPC.GET_TREE else b'[{"success": true}]'
+                conn.sendall(header.pack(b"i3-ipc", len(payload), message_type) + payload)
+
+
+def setup_fake_session(directory):
+    """Sesión simulada: entorno de Hyprland y Sway apuntando a servidores falsos"""
+    hyprland = FakeHyprland(directory)
+    tree = fake_tree()
+    sway_path = os.path.join(directory, "sway-ipc.sock")
+    FakeSway(sway_path, tree)
+    os.environ.update(XDG_RUNTIME_DIR=directory, HYPRLAND_INSTANCE_SIGNATURE=hyprland.signature,
+                      SWAYSOCK=sway_path, WAYLAND_DISPLAY="wayland-benchmark")
+    fixtures = {}
+    for name, content in (("clients", json.dumps([json.loads(FakeHyprland.REPLIES["j/activewindow"])])),
+                          ("cursorpos", "812, 455"), ("tree", json.dumps(tree))):
+        fixtures[name] = os.path.join(directory, f"{name}.out")
+        with open(fixtures[name], "w", encoding="utf-8") as f:
+            f.write(content)
+    return fixtures
+
+
+def backends(fake, fixtures):
+    """[(nombre, cliente IPC, consultas IPC, consultas por subproceso, clase de adaptador)]"""
+    from adapters.os_adapter import LinuxWaylandHyprlandAdapter, LinuxWaylandSwayAdapter, LinuxX11Adapter
+    found = []
+    if os.getenv("HYPRLAND_INSTANCE_SIGNATURE"):
+        ipc = compositor_ipc.HyprlandIPC()
+        commands = ({"active_window": ["cat", fixtures["clients"]], "cursor_position": ["cat", fixtures["cursorpos"]]}
+                    if fake else {"active_window": ["hyprctl", "clients", "-j"],
+                                  "cursor_position": ["hyprctl", "cursorpos"]})
+        found.append(("hyprland", ipc, ("active_window", "cursor_position"), commands,
+                      LinuxWaylandHyprlandAdapter))
+    if os.getenv("SWAYSOCK"):
+        ipc = compositor_ipc.SwayIPC()
+        commands = ({"active_window": ["cat", fixtures["tree"]]} if fake
+                    else {"active_window": ["swaymsg", "-t", "get_tree"]})
+        found.append(("sway", ipc, ("active_window",), commands, LinuxWaylandSwayAdapter))
+    if os.getenv("DISPLAY") and not fake:
+        try:
+            ipc = compositor_ipc.X11IPC()
+        except Exception as e:
+            print(f"X11: sin conexión con python-xlib ({e})")
+        else:
+            commands = {"active_window": ["xdotool", "getactivewindow"],
+                        "cursor_position": ["xdotool", "getmouselocation", "--shell"]}
+            found.append(("x11", ipc, ("active_window", "cursor_position"), commands, LinuxX11Adapter))
+    return found
+
+
+def bench_adapter(adapter_class, iterations):
+    """Guardar ventana + pedir cursor: en serie y con la consulta adelantada"""
+    import transcription.utils as utils
+    adapter = adapter_class()
+    utils._os_adapter = adapter
+    results = {}
+    if hasattr(adapter, "get_cursor_position"):
+        results["sequential"] = measure(
+            lambda: (adapter.save_active_window(), adapter.get_cursor_position()), iterations)
+        results["concurrent"] = measure(
+            lambda: (utils.save_active_window(), utils.get_cursor_position()), iterations)
+    else:
+        results["save_active_window"] = measure(adapter.save_active_window, iterations)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--fake", action="store_true",
+                        help="Servidores Hyprland y Sway simulados (sin sesión gráfica)")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--json", default=None, help="Guardar los resultados en JSON")
+    args = parser.parse_args()
+
+    fixtures = setup_fake_session(tempfile.mkdtemp(prefix="air-type-ipc-")) if args.fake else {}
+    found = backends(args.fake, fixtures)
+    if not found:
+        print("No se detectó Hyprland, Sway ni X11; usa --fake para medir con servidores simulados.")
+        return 1
+
+    results = {}
+    for name, ipc, queries, commands, adapter_class in found:
+        row = results[name] = {"ipc": {}, "subprocess": {}}
+        for query in queries:
+            row["ipc"][query] = measure(getattr(ipc, query), args.iterations)
+            command = commands.get(query)
+            if command and shutil.which(command[0]):
+                row["subprocess"][query] = measure(run_command(command), max(args.iterations // 10, 10))
+        row["adapter"] = bench_adapter(adapter_class, args.iterations)
+
+    print(f"Latencia por llamada (µs){' con servidores simulados' if args.fake else ''}:")
+    print(f"{'backend':<9} {'medida':<36}" + "".join(f"{f'p{p}':>10}" for p in PERCENTILES))
+    for name, row in results.items():
+        for kind in ("ipc", "subprocess", "adapter"):
+            for query, values in row[kind].items():
+                label = f"{kind}.{query}"
+                print(f"{name:<9} {label:<36}" + "".join(f"{values[f'p{p}']:10.0f}" for p in PERCENTILES))
+        for query, ipc_values in row["ipc"].items():
+            if query in row["subprocess"]:
+                ratio = row["subprocess"][query]["p50"] / ipc_values["p50"]
+                print(f"{'':<9} {query}: IPC {ratio:.0f}x más rápido (p50)")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"fake": args.fake, "results": results}, f, indent=2)
+        print(f"Resultados guardados en {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,203 @@
+"""
+Latencia extremo a extremo "soltar la tecla → texto pegado" del pipeline real.
+
+Ejecuta ``keyboard_listener.process_audio_and_transcribe`` (el hilo que
+lanza la tecla: grabación, subida en vivo o completa y ``write_text``) sin
+hardware ni ventanas: ``sounddevice`` simulado que reproduce fixtures WAV,
+servidor de transcripción simulado con latencia y ancho de banda
+configurables y un ``OSAdapter`` que registra el texto. La configuración
+del pipeline sale del entorno como en la aplicación (AUDIO_ALWAYS_ON,
+VAD_ENABLED, STREAMING_UPLOAD, SEGMENTED_TRANSCRIPTION, AUDIO_ENCODING...);
+con TRACE_FILE cada iteración deja también su traza por etapas.
+
+Etapas medidas por iteración:
+    open        pulsación → primer bloque de audio recibido
+    stop        parada → stream de audio cerrado
+    transcribe  stream cerrado → texto (cierre de la subida en vivo o
+                codificar, subir y esperar al proveedor)
+    write       texto → ``write_text`` terminado
+    total       parada → texto escrito
+
+Uso:
+    python -m benchmarks.bench_e2e_latency [--clips 2,5,15] [--iterations 10]
+        [--latency-ms 300] [--bandwidth-kbps 2000] [--speed 4] [--fixtures DIR]
+        [--json resultados.json]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+
+import numpy as np
+
+import telemetry
+from benchmarks.audio_fixtures import synthetic_speech
+from benchmarks.fakes import FakeSoundDevice, RecordingAdapter, read_wav, write_wav_fixture
+from benchmarks.mock_transcription_server import MockTranscriptionServer
+
+STAGES = ("open", "stop", "transcribe", "write", "total")
+PERCENTILES = (50, 95, 99)
+
+
+def build_fixtures(directory, clip_seconds, sample_rate):
+    """Devuelve {duración: ruta WAV}, generando los que falten"""
+    fixtures = {}
+    for seconds in clip_seconds:
+        path = os.path.join(directory, f"speech_{seconds:g}s_{sample_rate}.wav")
+        if not os.path.exists(path):
+            write_wav_fixture(path, synthetic_speech(seconds, sample_rate), sample_rate)
+        fixtures[seconds] = path
+    return fixtures
+
+
+class PipelineDriver:
+    """Reproduce una pulsación completa sobre los módulos reales.
+
+    El hilo del dictado es ``keyboard_listener.process_audio_and_transcribe``,
+    el mismo que lanza la tecla, así que pasa por ``warm_up``,
+    ``open_live_transcription`` (STREAMING_UPLOAD, SEGMENTED_TRANSCRIPTION)
+    y la subida completa de respaldo. Los tiempos salen de los eventos de
+    su traza y del instante en que ``RecordingAdapter`` recibe el texto.
+    """
+
+    def __init__(self, device: FakeSoundDevice, adapter: RecordingAdapter, sample_rate: int):
+        import audio_recorder
+        import keyboard_listener
+        self.recorder = audio_recorder
+        self.listener = keyboard_listener
+        self.device = device
+        self.adapter = adapter
+        self.sample_rate = sample_rate
+
+    def run_once(self, samples: np.ndarray) -> dict:
+        """Graba ``samples`` hasta el final, para y transcribe. Devuelve tiempos en s"""
+        self.device.load(samples)
+        written_before = len(self.adapter.written)
+        # Traza propia aunque no haya TRACE_FILE: de ella salen los tiempos
+        trace = telemetry.Trace("benchmark")
+        trace.mark("hotkey")
+        thread = threading.Thread(target=self.listener.process_audio_and_transcribe,
+                                  args=(self.sample_rate, None, trace), daemon=True)
+        thread.start()
+        self.device.source_done.wait()
+        self.recorder.stop_recording()
+        thread.join()
+
+        def at(event):
+            return trace.start + trace.events[event]
+
+        ok = len(self.adapter.written) > written_before
+        recorded = at("recording_stopped")
+        transcribed = at("text_ready") if "text_ready" in trace.events else at("done")
+        written = self.adapter.last_written_at if ok else transcribed
+        return {
+            "open": (at("first_audio") if "first_audio" in trace.events else recorded) - trace.start,
+            "stop": recorded - at("stop"),
+            "transcribe": transcribed - recorded,
+            "write": written - transcribed,
+            "total": written - at("stop"),
+            "ok": ok,
+        }
+
+
+def summarize(samples):
+    values = np.array(samples) * 1000
+    return {f"p{p}": float(np.percentile(values, p)) for p in PERCENTILES}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--clips", default="2,5,15",
+                        help="Duraciones de los clips en segundos, separadas por comas")
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--sample-rate", type=int, default=16000)
+    parser.add_argument("--latency-ms", type=float, default=300)
+    parser.add_argument("--bandwidth-kbps", type=float, default=2000)
+    parser.add_argument("--speed", type=float, default=4.0,
+                        help="Factor de aceleración del audio simulado (1 = tiempo real)")
+    parser.add_argument("--open-latency-ms", type=float, default=0,
+                        help="Tiempo simulado de apertura del dispositivo")
+    parser.add_argument("--fixtures", default=None,
+                        help="Directorio de fixtures WAV (se generan si faltan)")
+    parser.add_argument("--json", default=None, help="Guardar los resultados en JSON")
+    args = parser.parse_args()
+    clips = [float(c) for c in args.clips.split(",") if c.strip()]
+
+    # Sin pantalla: Qt offscreen y dispositivo de audio simulado
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    device = FakeSoundDevice(speed=args.speed, open_latency=args.open_latency_ms / 1000)
+    device.install()
+
+    server = MockTranscriptionServer(latency_ms=args.latency_ms,
+                                     bandwidth_kbps=args.bandwidth_kbps).start()
+    os.environ["GROQ_API_URL"] = server.url
+    os.environ.setdefault("GROQ_API_KEY", "benchmark")
+    os.environ.setdefault("MODEL_NAME", "mock-model")
+    os.environ["SAMPLE_RATE"] = str(args.sample_rate)
+    os.environ["SPOOL_ENABLED"] = "0"
+
+    from PyQt5.QtWidgets import QApplication
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+
+    import audio_recorder
+    import transcription.utils
+    from transcription import setup_transcription
+    adapter = RecordingAdapter()
+    transcription.utils._os_adapter = adapter
+    audio_recorder.setup_recorder({})
+    setup_transcription({})
+    telemetry.setup_telemetry()
+    driver = PipelineDriver(device, adapter, args.sample_rate)
+
+    fixtures_dir = args.fixtures or tempfile.mkdtemp(prefix="air-type-fixtures-")
+    os.makedirs(fixtures_dir, exist_ok=True)
+    fixtures = build_fixtures(fixtures_dir, clips, args.sample_rate)
+
+    results = {"config": vars(args), "clips": {}}
+    try:
+        for seconds, path in fixtures.items():
+            samples, rate = read_wav(path)
+            if rate != args.sample_rate:
+                print(f"{path}: {rate} Hz, se esperaban {args.sample_rate} Hz; se omite")
+                continue
+            driver.run_once(samples[:args.sample_rate])  # calentamiento (conexión, imports)
+            timings = {stage: [] for stage in STAGES}
+            failures = 0
+            for _ in range(args.iterations):
+                run = driver.run_once(samples)
+                failures += not run["ok"]
+                for stage in STAGES:
+                    timings[stage].append(run[stage])
+            results["clips"][f"{seconds:g}"] = {
+                "failures": failures,
+                "stages": {stage: summarize(values) for stage, values in timings.items()},
+            }
+    finally:
+        audio_recorder.stop_persistent_stream()
+        server.stop()
+        app.quit()
+    if len(adapter.written) != args.iterations * len(results["clips"]) + len(results["clips"]):
+        print(f"Aviso: se escribieron {len(adapter.written)} textos")
+
+    print(f"\nLatencia por etapa (ms), {args.iterations} iteraciones, "
+          f"servidor {args.latency_ms:g} ms, {args.bandwidth_kbps:g} kbps")
+    print(f"{'clip':>6} {'etapa':<11}" + "".join(f"{f'p{p}':>10}" for p in PERCENTILES))
+    for clip, data in results["clips"].items():
+        for stage in STAGES:
+            row = data["stages"][stage]
+            print(f"{clip + ' s':>6} {stage:<11}" + "".join(f"{row[f'p{p}']:10.1f}" for p in PERCENTILES))
+        if data["failures"]:
+            print(f"{'':>6} {data['failures']} transcripciones fallidas")
+    if device.callback_times:
+        print(f"\nCallback de audio: p99 {np.percentile(device.callback_times, 99) * 1e6:.0f} µs")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Resultados guardados en {args.json}")
+
+
+if __name__ == "__main__":
+    main()
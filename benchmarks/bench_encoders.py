@@ -0,0 +1,66 @@
+"""
+Compara el tiempo de codificación frente a los bytes ahorrados de cada
+encoder de subida (WAV, FLAC, Opus) para clips de 5 s, 30 s y 5 min.
+
+Uso:
+    python -m benchmarks.bench_encoders [--repeat N] [--json salida.json]
+"""
+import argparse
+import json
+import time
+
+from transcription.encoders import ENCODERS
+from benchmarks.audio_fixtures import synthetic_speech
+
+CLIP_SECONDS = [5, 30, 300]
+
+
+def bench_encoder(encoder, audio, sample_rate, repeat):
+    times = []
+    size = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        size = len(encoder.encode(audio, sample_rate))
+        times.append(time.perf_counter() - start)
+    return min(times), size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--sample-rate", type=int, default=16000)
+    parser.add_argument("--json", help="Guardar los resultados en este fichero")
+    args = parser.parse_args()
+
+    results = []
+    for seconds in CLIP_SECONDS:
+        audio = synthetic_speech(seconds, args.sample_rate)
+        wav_size = None
+        for name, encoder_cls in ENCODERS.items():
+            try:
+                encoder = encoder_cls()
+            except (ImportError, OSError) as e:
+                print(f"{name:>5} | {seconds:>4} s | no disponible ({e})")
+                continue
+            encode_s, size = bench_encoder(encoder, audio, args.sample_rate, args.repeat)
+            if name == "wav":
+                wav_size = size
+            saved = (wav_size - size) if wav_size else 0
+            results.append({
+                "encoder": name,
+                "clip_seconds": seconds,
+                "encode_ms": encode_s * 1000,
+                "bytes": size,
+                "bytes_saved": saved,
+                "ratio": size / wav_size if wav_size else 1.0,
+            })
+            print(f"{name:>5} | {seconds:>4} s | {encode_s * 1000:8.1f} ms | "
+                  f"{size / 1024:9.0f} KiB | {saved / 1024:9.0f} KiB ahorrados")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
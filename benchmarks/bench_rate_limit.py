@@ -0,0 +1,52 @@
+"""
+Lanza una ráfaga de transcripciones concurrentes contra el servidor simulado
+con límite de peticiones y compara el resultado con y sin el planificador.
+
+Uso:
+    python -m benchmarks.bench_rate_limit [--requests 20] [--limit 5] [--window 1]
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from transcription.services import GroqTranscriptionService
+from transcription.scheduler import RequestScheduler
+from benchmarks.audio_fixtures import synthetic_speech
+from benchmarks.mock_transcription_server import MockTranscriptionServer
+
+
+def run_burst(server, scheduler, n_requests, audio):
+    service = GroqTranscriptionService("test", "mock-model", api_url=server.url,
+                                       scheduler=scheduler)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=n_requests) as pool:
+        results = list(pool.map(lambda _: service.transcribe(audio, 16000), range(n_requests)))
+    elapsed = time.perf_counter() - start
+    return sum(1 for r in results if r), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=5, help="Peticiones por ventana del servidor")
+    parser.add_argument("--window", type=float, default=1.0, help="Ventana del servidor en segundos")
+    args = parser.parse_args()
+    audio = synthetic_speech(1)
+
+    for label, scheduler in [
+        ("sin reintentos", RequestScheduler(max_retries=0)),
+        ("planificador", RequestScheduler(
+            requests_per_minute=args.limit * 60 / args.window, burst=args.limit,
+            max_concurrency=args.limit, max_retries=8, base_backoff=0.1)),
+    ]:
+        server = MockTranscriptionServer(rate_limit=args.limit, rate_window=args.window).start()
+        try:
+            ok, elapsed = run_burst(server, scheduler, args.requests, audio)
+        finally:
+            server.stop()
+        print(f"{label:>15}: {ok}/{args.requests} completadas en {elapsed:.2f} s, "
+              f"{server.rejected} respuestas 429, {scheduler.stats()}")
+
+
+if __name__ == "__main__":
+    main()
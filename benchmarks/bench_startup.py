@@ -0,0 +1,68 @@
+"""
+Tiempo de arranque de la aplicación frente a un objetivo.
+
+Lanza ``main.py --startup-phases`` varias veces (proceso nuevo cada vez, sin
+ventana de configuración ni bucle de eventos) y mide el tiempo de proceso
+completo y el de cada fase de ``main()``. Sale con código 1 si la mediana
+supera ``--target-ms`` (o STARTUP_TARGET_MS), para usarlo como control de
+regresiones.
+
+Uso:
+    python -m benchmarks.bench_startup [--runs 10] [--target-ms 1500]
+        [--json arranque.json]
+"""
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+from benchmarks.mock_transcription_server import MockTranscriptionServer
+from startup_profile import run_startup_child
+
+DEFAULT_TARGET_MS = 1500
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--target-ms", type=float,
+                        default=float(os.getenv("STARTUP_TARGET_MS", DEFAULT_TARGET_MS)),
+                        help="Mediana máxima admitida del arranque completo")
+    parser.add_argument("--json", default=None, help="Guardar los resultados en JSON")
+    args = parser.parse_args()
+
+    # Sin pantalla ni red: Qt offscreen y proveedor simulado
+    server = MockTranscriptionServer(latency_ms=0).start()
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen", GROQ_API_URL=server.url,
+               SPOOL_ENABLED="0")
+    env.setdefault("GROQ_API_KEY", "benchmark")
+    try:
+        run_startup_child(env=env)  # calentamiento (caché de disco y .pyc)
+        runs = [run_startup_child(env=env) for _ in range(args.runs)]
+    finally:
+        server.stop()
+
+    wall = np.array([run["wall_ms"] for run in runs])
+    phases = {name: np.array([run["phases"].get(name, 0.0) for run in runs])
+              for name in runs[0]["phases"]}
+    p50 = float(np.percentile(wall, 50))
+
+    print(f"Arranque ({args.runs} ejecuciones):")
+    print(f"  {'proceso':<16} p50 {p50:8.1f} ms  p95 {np.percentile(wall, 95):8.1f} ms")
+    for name, values in phases.items():
+        print(f"  {name:<16} p50 {np.percentile(values, 50):8.1f} ms  "
+              f"p95 {np.percentile(values, 95):8.1f} ms")
+    passed = p50 <= args.target_ms
+    print(f"\nObjetivo {args.target_ms:g} ms: {'OK' if passed else 'SUPERADO'}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"target_ms": args.target_ms, "passed": passed, "runs": runs}, f, indent=2)
+        print(f"Resultados guardados en {args.json}")
+    return 0 if passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
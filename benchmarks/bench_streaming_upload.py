@@ -0,0 +1,64 @@
+"""
+Compara la latencia parada→texto entre la subida completa al final y la
+subida en streaming durante la grabación, contra el servidor simulado con
+ancho de banda limitado. También comprueba que el audio recibido es idéntico.
+
+Uso:
+    python -m benchmarks.bench_streaming_upload [--seconds 10] [--bandwidth-kbps 1000]
+"""
+import argparse
+import time
+
+from transcription.services import GroqTranscriptionService
+from benchmarks.audio_fixtures import synthetic_speech
+from benchmarks.mock_transcription_server import MockTranscriptionServer
+
+BLOCK_SECONDS = 0.1
+
+
+def simulate_recording(audio, sample_rate, on_block):
+    """Entrega bloques de 100 ms al ritmo real, como el callback de PortAudio"""
+    block = int(sample_rate * BLOCK_SECONDS)
+    start = time.perf_counter()
+    for i, pos in enumerate(range(0, len(audio), block)):
+        on_block(audio[pos:pos + block])
+        delay = start + (i + 1) * BLOCK_SECONDS - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--sample-rate", type=int, default=16000)
+    parser.add_argument("--bandwidth-kbps", type=float, default=1000)
+    parser.add_argument("--latency-ms", type=float, default=200)
+    args = parser.parse_args()
+
+    server = MockTranscriptionServer(latency_ms=args.latency_ms,
+                                     bandwidth_kbps=args.bandwidth_kbps).start()
+    service = GroqTranscriptionService("test", "mock-model", api_url=server.url)
+    audio = synthetic_speech(args.seconds, args.sample_rate)
+
+    try:
+        simulate_recording(audio, args.sample_rate, lambda block: None)
+        start = time.perf_counter()
+        text = service.transcribe(audio, args.sample_rate)
+        buffered = time.perf_counter() - start
+        print(f"Subida completa:  {buffered * 1000:8.0f} ms tras parar -> {text!r}")
+
+        stream = service.open_stream(args.sample_rate)
+        simulate_recording(audio, args.sample_rate, stream.push)
+        start = time.perf_counter()
+        text = stream.finish()
+        streamed = time.perf_counter() - start
+        print(f"Subida streaming: {streamed * 1000:8.0f} ms tras parar -> {text!r}")
+
+        identical = server.last_audio[44:] == audio.tobytes()
+        print(f"Audio recibido idéntico: {'sí' if identical else 'NO'}")
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Dispositivos simulados para ejecutar el pipeline real sin hardware ni GUI.
+
+- ``FakeSoundDevice``: sustituto del módulo ``sounddevice`` cuyo
+  ``InputStream`` reproduce un fichero WAV llamando al callback al ritmo
+  real (o acelerado), reutilizando el mismo buffer como PortAudio.
+- ``RecordingAdapter``: ``OSAdapter`` que en lugar de pegar guarda el texto
+  y el instante en que se habría escrito.
+- ``write_wav_fixture`` / ``read_wav``: fixtures WAV PCM16 mono.
+"""
+import threading
+import time
+import types
+import wave
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from adapters.os_adapter import OSAdapter
+
+
+def write_wav_fixture(path: str, samples: np.ndarray, sample_rate: int) -> str:
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(np.ascontiguousarray(samples, dtype=np.int16).tobytes())
+    return path
+
+
+def read_wav(path: str) -> Tuple[np.ndarray, int]:
+    """Lee un WAV PCM16 (mono o primer canal)"""
+    with wave.open(path, "rb") as f:
+        if f.getsampwidth() != 2:
+            raise ValueError(f"{path}: solo se admiten WAV PCM de 16 bits")
+        data = np.frombuffer(f.readframes(f.getnframes()), dtype=np.int16)
+        return data[::f.getnchannels()].copy(), f.getframerate()
+
+
+class FakeInputStream:
+    """``sd.InputStream`` que lee de la fuente del ``FakeSoundDevice``."""
+
+    def __init__(self, device: "FakeSoundDevice", samplerate=None, channels=1,
+                 dtype="float32", blocksize=0, callback=None, **kwargs):
+        self.device = device
+        self.samplerate = samplerate
+        self.dtype = np.dtype(dtype)
+        self.blocksize = blocksize or int(samplerate * device.default_block_seconds)
+        self.callback = callback
+        self._stop = threading.Event()
+        self._thread = None
+        if device.open_latency:
+            time.sleep(device.open_latency)  # apertura del dispositivo (PipeWire/ALSA)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True, name="fake-portaudio")
+        self._thread.start()
+
+    def _run(self):
+        # Un único buffer reutilizado, igual que el de PortAudio
+        indata = np.zeros((self.blocksize, 1), dtype=self.dtype)
+        interval = self.blocksize / self.samplerate / self.device.speed
+        next_at = time.perf_counter()
+        while not self._stop.is_set():
+            block = self.device.next_block(self.blocksize)
+            if self.dtype == np.int16:
+                indata[:, 0] = block
+            else:
+                indata[:, 0] = block / 32768.0
+            started = time.perf_counter()
+            self.callback(indata, self.blocksize, None, None)
+            self.device.callback_times.append(time.perf_counter() - started)
+            next_at += interval
+            self._stop.wait(max(next_at - time.perf_counter(), 0))
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def close(self):
+        self.stop()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class FakeSoundDevice:
+    """Módulo ``sounddevice`` simulado.
+
+    Se instala con ``install()`` antes de importar ``audio_recorder``. La
+    fuente se cambia con ``load(samples)``; ``source_done`` se activa cuando
+    se ha entregado toda (después se entrega silencio).
+    """
+
+    def __init__(self, speed: float = 1.0, open_latency: float = 0.0,
+                 default_block_seconds: float = 0.01):
+        self.speed = speed
+        self.open_latency = open_latency
+        self.default_block_seconds = default_block_seconds
+        self.source = np.zeros(0, dtype=np.int16)
+        self.position = 0
+        self.source_done = threading.Event()
+        self.callback_times: List[float] = []
+        self._lock = threading.Lock()
+
+    def load(self, samples: np.ndarray) -> None:
+        with self._lock:
+            self.source = samples
+            self.position = 0
+            self.source_done.clear()
+
+    def next_block(self, n: int) -> np.ndarray:
+        with self._lock:
+            block = self.source[self.position:self.position + n]
+            self.position += len(block)
+            if self.position >= len(self.source):
+                self.source_done.set()
+        if len(block) < n:
+            block = np.concatenate((block, np.zeros(n - len(block), dtype=np.int16)))
+        return block
+
+    def InputStream(self, *args, **kwargs) -> FakeInputStream:
+        return FakeInputStream(self, *args, **kwargs)
+
+    def install(self) -> types.ModuleType:
+        """Registra el módulo simulado como ``sounddevice``"""
+        import sys
+        module = types.ModuleType("sounddevice")
+        module.InputStream = self.InputStream
+        module.fake = self
+        sys.modules["sounddevice"] = module
+        return module
+
+
+class RecordingAdapter(OSAdapter):
+    """Adaptador del SO que registra lo que se habría escrito."""
+
+    def __init__(self):
+        self.written: List[Tuple[float, str]] = []
+        self.last_written_at: Optional[float] = None
+
+    def save_active_window(self):
+        pass
+
+    def restore_active_window(self):
+        pass
+
+    def write_text(self, text):
+        self.last_written_at = time.perf_counter()
+        self.written.append((self.last_written_at, text))
+
+    def get_cursor_position(self):
+        return (0, 0)
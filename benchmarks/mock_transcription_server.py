@@ -0,0 +1,201 @@
+"""
+Servidor HTTP local que imita el endpoint de transcripción de Groq/OpenAI.
+
+Acepta cuerpos con ``Content-Length`` o ``Transfer-Encoding: chunked``,
+puede simular latencia de servidor, un ancho de banda de subida limitado y
+un límite de peticiones (responde 429 con ``Retry-After`` y cabeceras
+``x-ratelimit-*``), y responde con el número de bytes de audio recibidos.
+
+Uso:
+    python -m benchmarks.mock_transcription_server [--port 8765] [--latency-ms 300]
+        [--rate-limit 20 --rate-window 60]
+"""
+import argparse
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+TRANSCRIPTIONS_PATH = "/openai/v1/audio/transcriptions"
+
+
+def _parse_multipart(body: bytes, content_type: str):
+    """Devuelve (campos, bytes_del_fichero) de un cuerpo multipart/form-data"""
+    boundary = content_type.split("boundary=", 1)[1].strip().strip('"').encode()
+    fields, file_data = {}, b""
+    for part in body.split(b"--" + boundary):
+        if b"\r\n\r\n" not in part:
+            continue
+        head, _, value = part.partition(b"\r\n\r\n")
+        value = value[:-2] if value.endswith(b"\r\n") else value
+        head = head.decode(errors="replace")
+        if 'name="' not in head:
+            continue
+        name = head.split('name="', 1)[1].split('"', 1)[0]
+        if "filename=" in head:
+            file_data = value
+        else:
+            fields[name] = value.decode(errors="replace")
+    return fields, file_data
+
+
+class MockTranscriptionHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _throttle(self, n):
+        if self.server.bandwidth_bps:
+            time.sleep(n / self.server.bandwidth_bps)
+
+    def _read_body(self) -> bytes:
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().split(b";")[0].strip(), 16)
+                if size == 0:
+                    self.rfile.readline()
+                    break
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+                self._throttle(size)
+            return b"".join(chunks)
+        length = int(self.headers.get("Content-Length", 0))
+        body = bytearray()
+        while len(body) < length:
+            chunk = self.rfile.read(min(65536, length - len(body)))
+            if not chunk:
+                break
+            body += chunk
+            self._throttle(len(chunk))
+        return bytes(body)
+
+    def _send_json(self, status, payload, extra_headers=None):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (extra_headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self._send_json(200, {"object": "list", "data": []})
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_POST(self):
+        if self.path != TRANSCRIPTIONS_PATH:
+            self._send_json(404, {"error": "not found"})
+            return
+        received_at = time.perf_counter()
+        body = self._read_body()
+        server = self.server
+        limited, headers = server.check_rate_limit()
+        if limited:
+            self._send_json(429, {"error": {"message": "Rate limit reached"}}, headers)
+            return
+        fields, audio = _parse_multipart(body, self.headers.get("Content-Type", ""))
+        with server.lock:
+            server.requests += 1
+            server.last_fields = fields
+            server.last_audio = audio
+        if server.latency_s:
+            time.sleep(server.latency_s)
+        server_ms = (time.perf_counter() - received_at) * 1000
+        # Misma cabecera que la API de OpenAI con el tiempo de proceso
+        headers["openai-processing-ms"] = f"{server_ms:.0f}"
+        self._send_json(200, {
+            "text": f"{server.text} ({len(audio)} bytes)",
+            "model": fields.get("model", ""),
+            "x_server_ms": server_ms,
+        }, headers)
+
+
+class MockTranscriptionServer(ThreadingHTTPServer):
+    """Servidor de transcripción simulado que puede arrancarse en un hilo."""
+
+    daemon_threads = True
+
+    def __init__(self, port=0, latency_ms=0.0, bandwidth_kbps=0.0, text="mock",
+                 verbose=False, rate_limit=0, rate_window=60.0):
+        super().__init__(("127.0.0.1", port), MockTranscriptionHandler)
+        self.latency_s = latency_ms / 1000
+        self.bandwidth_bps = bandwidth_kbps * 1000 / 8
+        self.text = text
+        self.verbose = verbose
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.last_fields = {}
+        self.last_audio = b""
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.rejected = 0
+        self._accepted = deque()
+        self._thread = None
+
+    def check_rate_limit(self):
+        """Ventana deslizante: devuelve (rechazada, cabeceras de cuota)"""
+        if not self.rate_limit:
+            return False, {}
+        with self.lock:
+            now = time.monotonic()
+            while self._accepted and now - self._accepted[0] >= self.rate_window:
+                self._accepted.popleft()
+            reset = self.rate_window - (now - self._accepted[0]) if self._accepted else 0.0
+            if len(self._accepted) >= self.rate_limit:
+                self.rejected += 1
+                return True, {
+                    "Retry-After": f"{reset:.2f}",
+                    "x-ratelimit-limit-requests": str(self.rate_limit),
+                    "x-ratelimit-remaining-requests": "0",
+                    "x-ratelimit-reset-requests": f"{reset:.2f}s",
+                }
+            self._accepted.append(now)
+            reset = self.rate_window - (now - self._accepted[0])
+            return False, {
+                "x-ratelimit-limit-requests": str(self.rate_limit),
+                "x-ratelimit-remaining-requests": str(self.rate_limit - len(self._accepted)),
+                "x-ratelimit-reset-requests": f"{reset:.2f}s",
+            }
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}{TRANSCRIPTIONS_PATH}"
+
+    def start(self) -> "MockTranscriptionServer":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor de transcripción simulado")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--bandwidth-kbps", type=float, default=0,
+                        help="Ancho de banda de subida simulado (0 = ilimitado)")
+    parser.add_argument("--rate-limit", type=int, default=0,
+                        help="Peticiones aceptadas por ventana (0 = sin límite)")
+    parser.add_argument("--rate-window", type=float, default=60)
+    args = parser.parse_args()
+    server = MockTranscriptionServer(args.port, args.latency_ms, args.bandwidth_kbps,
+                                     verbose=True, rate_limit=args.rate_limit,
+                                     rate_window=args.rate_window)
+    print(f"Servidor simulado en {server.url}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Cliente ligero para controlar la instancia principal.
+
+Pensado para los atajos del gestor de ventanas: solo importa la capa de
+sockets (nada de Qt, numpy, requests ni del adaptador del SO), así que la
+orden tarda poco más que el viaje de ida y vuelta por el socket.
+
+Uso:
+    python client.py [toggle | start | stop | status | subscribe]
+    python client.py transcribe <fichero.wav | fichero.pcm> [sample_rate]
+
+``subscribe`` imprime un JSON por línea con cada cambio de estado y cada
+transcripción terminada, hasta Ctrl+C. ``transcribe`` envía un WAV PCM16
+(o PCM int16 crudo, indicando la frecuencia) y escribe el texto.
+
+Código de salida: 0 si la instancia aceptó la orden, 1 si no hay instancia
+o la rechazó (p. ej. aún arrancando), 2 si la orden no existe.
+"""
+import json
+import sys
+
+from socket_server import send_command, subscribe, transcribe_audio
+
+COMMANDS = ("toggle", "start", "stop", "status", "subscribe", "transcribe")
+
+
+def read_audio_file(path, sample_rate=None):
+    """Argumentos de ``transcribe_audio`` para un fichero WAV o PCM int16 crudo"""
+    with open(path, "rb") as f:
+        payload = f.read()
+    if path.lower().endswith(".wav"):
+        return {"payload": payload, "audio_format": "wav"}
+    return {"payload": payload, "sample_rate": sample_rate, "audio_format": "pcm_s16le"}
+
+
+def main(argv=None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    name = argv[0] if argv else "toggle"
+    if name not in COMMANDS:
+        print(f"Uso: client.py [{' | '.join(COMMANDS)}]", file=sys.stderr)
+        return 2
+    if name == "transcribe":
+        if len(argv) < 2:
+            print("Uso: client.py transcribe <fichero> [sample_rate]", file=sys.stderr)
+            return 2
+        try:
+            audio = read_audio_file(argv[1], int(argv[2]) if len(argv) > 2 else None)
+        except (OSError, ValueError) as e:
+            print(f"No se pudo leer {argv[1]}: {e}", file=sys.stderr)
+            return 2
+    try:
+        if name == "subscribe":
+            for event in subscribe():
+                print(json.dumps(event, ensure_ascii=False), flush=True)
+            return 0
+        if name == "transcribe":
+            response = transcribe_audio(**audio)
+        else:
+            response = send_command(name.upper())
+    except KeyboardInterrupt:
+        return 0
+    except (OSError, ValueError):
+        print("No hay ninguna instancia principal en marcha.", file=sys.stderr)
+        return 1
+    if name == "status":
+        print(response.get("state", ""))
+    elif name == "transcribe" and response.get("ok"):
+        print(response["text"])
+    else:
+        print(response.get("action") or response.get("error", ""))
+    return 0 if response.get("ok") else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,8 +2,6 @@
 Gestión de la configuración de la aplicación usando .env
 """
 import os
-import tkinter as tk
-from tkinter import ttk
 from dotenv import load_dotenv, set_key
 
 ENV_FILE = ".env"
@@ -18,6 +16,39 @@ def load_config():
         "command_key": os.getenv("COMMAND_KEY", "f8").lower()
     }
 
+def _local_engine_problems():
+    """Comprueba que el motor local elegido (LOCAL_ENGINE) se puede cargar"""
+    from importlib.util import find_spec
+    engine = os.getenv("LOCAL_ENGINE", "faster-whisper")
+    if engine == "faster-whisper" and find_spec("faster_whisper") is None:
+        return ["LOCAL_ENGINE=faster-whisper necesita el paquete faster-whisper "
+                "(pip install -r requirements-local.txt)"]
+    if engine not in ("faster-whisper", "stub"):
+        return [f"Motor local no soportado: {engine}"]
+    return []
+
+def validate_config(config):
+    """Comprueba la configuración sin interfaz; devuelve la lista de problemas"""
+    problems = []
+    if not config.get("command_key"):
+        problems.append("COMMAND_KEY está vacía")
+    providers = [p.strip() for p in os.getenv("TRANSCRIPTION_PROVIDERS", "").split(",") if p.strip()]
+    providers = providers or [config.get("provider", "groq")]
+    for provider in providers:
+        if provider == "groq" and not config.get("groq_api_key"):
+            problems.append("Falta GROQ_API_KEY para el proveedor groq")
+        elif provider == "openai" and not os.getenv("OPENAI_API_KEY"):
+            problems.append("Falta OPENAI_API_KEY para el proveedor openai")
+        elif provider not in ("groq", "openai", "local"):
+            problems.append(f"Proveedor no soportado: {provider}")
+    if "local" in providers:
+        problems.extend(_local_engine_problems())
+    for name in ("SAMPLE_RATE", "PREROLL_MS", "AUDIO_BLOCKSIZE"):
+        value = os.getenv(name)
+        if value and not value.isdigit():
+            problems.append(f"{name} debe ser un entero: {value}")
+    return problems
+
 def save_config(config):
     """Guarda la configuración en el archivo .env"""
     # Asegura que exista el archivo .env
@@ -36,6 +67,10 @@ def save_config(config):
 
 def show_configuration(config):
     """Muestra una ventana de configuración y devuelve la configuración actualizada"""
+    # Tk solo hace falta para esta ventana: no se carga en los modos sin GUI
+    import tkinter as tk
+    from tkinter import ttk
+
     result_config = config.copy()
 
     def guardar_config():
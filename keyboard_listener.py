@@ -1,47 +1,188 @@
 """
 Módulo para gestionar los eventos del teclado
 """
+import logging
+import os
 import threading
-from pynput import keyboard
 from audio_recorder import record_audio_continuous, is_recording, stop_recording
 from transcription import write_text, get_transcriber, BubbleManager, save_active_window
+from transcription.interfaces import transcription_failed
+from transcription.segments import SegmentedTranscription
+from transcription.spool import get_spool
+import socket_server
+import telemetry
+
+logger = logging.getLogger(__name__)
 
 # Variables de estado del teclado
 listener_thread = None
 stop_event = threading.Event()
+# Reentrante: TOGGLE decide y arranca/para bajo el mismo lock
+_state_lock = threading.RLock()
+# Dictado más reciente; un dictado antiguo no pisa el estado de uno nuevo
+_session_token = 0
+# STOP recibido entre start_transcription y la creación de la sesión
+_pending_stop = False
 command_key = "f8"  # Por defecto
 
-def process_audio_and_transcribe(sample_rate):
+def _keyboard():
+    # pynput conecta con X11/uinput al importarse: solo cuando se escucha el teclado
+    from pynput import keyboard
+    return keyboard
+
+def _env_flag(name):
+    return os.getenv(name, "0").lower() in ("1", "true", "yes")
+
+def open_live_transcription(transcriber, sample_rate):
+    """Crea el consumidor de audio en vivo configurado, o None.
+
+    - SEGMENTED_TRANSCRIPTION: transcribe por segmentos cortados en pausas.
+    - STREAMING_UPLOAD: abre la petición ya y la alimenta mientras se habla.
+    """
+    if _env_flag("SEGMENTED_TRANSCRIPTION"):
+        return SegmentedTranscription(
+            transcriber, sample_rate,
+            pause_ms=int(os.getenv("SEGMENT_PAUSE_MS", "700")),
+            min_segment_seconds=float(os.getenv("SEGMENT_MIN_SECONDS", "5")),
+            max_segment_seconds=float(os.getenv("SEGMENT_MAX_SECONDS", "60")),
+        )
+    if _env_flag("STREAMING_UPLOAD") and hasattr(transcriber, "open_stream"):
+        try:
+            return transcriber.open_stream(sample_rate)
+        except Exception as e:
+            logger.warning(f"No se pudo abrir la subida en streaming: {e}")
+    return None
+
+def _session_opened(session):
+    """Aplica una parada pedida antes de que existiera la sesión"""
+    global _pending_stop
+    with _state_lock:
+        if _pending_stop:
+            _pending_stop = False
+            session.stop()
+
+
+def _set_state_if_current(token, state):
+    """Cambia el estado solo si ``token`` sigue siendo el dictado en curso"""
+    with _state_lock:
+        if token is None or token == _session_token:
+            socket_server.set_server_state(state)
+
+
+def process_audio_and_transcribe(sample_rate, token=None, trace=None):
     """Procesa el audio grabado, lo transcribe y escribe el resultado"""
+    with telemetry.use_trace(trace):
+        _process_audio_and_transcribe(sample_rate, token)
+
+
+def _process_audio_and_transcribe(sample_rate, token):
     save_active_window()
-    audio = record_audio_continuous()
-    if audio is not None:
-        text = get_transcriber().transcribe(audio, sample_rate)
-        if text:
-            write_text(text)
-            print(f"Texto transcrito y escrito: {text}")
+    transcriber = get_transcriber()
+    # El handshake con el proveedor se solapa con lo que dura el dictado
+    if hasattr(transcriber, "warm_up"):
+        transcriber.warm_up()
+    stream = open_live_transcription(transcriber, sample_rate)
+
+    try:
+        audio = record_audio_continuous(on_audio=stream.push if stream else None,
+                                        on_start=_session_opened)
+        if audio is not None:
+            _set_state_if_current(token, "transcribing")
+            text = None
+            if stream:
+                with telemetry.span("stream_finish"):
+                    text = stream.finish()
+            if text is None:
+                # Sin transcripción en vivo o si falló: subida completa del audio
+                try:
+                    with telemetry.span("transcribe", seconds=round(len(audio) / sample_rate, 2)):
+                        text = transcriber.transcribe(audio, sample_rate)
+                except Exception as e:
+                    logger.error(f"Error transcribiendo el audio: {e}")
+                    text = None
+            telemetry.mark("text_ready")
+            if text:
+                write_text(text)
+                model = getattr(text, "model", "")
+                logger.info(f"Texto transcrito y escrito{f' (modelo: {model})' if model else ''}: {text}")
+                socket_server.publish_transcript(text, model=model, provider=getattr(text, "provider", ""))
+            elif transcription_failed(text):
+                logger.warning("No se pudo transcribir el audio.")
+                spool = get_spool()
+                if spool is not None:
+                    # Sin red o proveedor caído: se reintentará en segundo plano
+                    spool.add(audio, sample_rate)
+            else:
+                logger.info("La transcripción está vacía (no se detectó voz).")
+            telemetry.end_trace("failed" if transcription_failed(text) else "ok")
         else:
-            print("No se pudo transcribir el audio.")
-    else:
-        print("No se grabó audio.")
-
-
-def trigger_transcription(config):
-    """Función para activar la transcripción desde otra instancia"""
-    if not is_recording():
-        print("\nActivando transcripción por solicitud remota...")
-        processing_thread = threading.Thread(
-            target=lambda: process_audio_and_transcribe(16000), 
-            daemon=True
-        )
-        processing_thread.start()
-        return True
-    else:
-        stop_recording()
-        print("\nYa hay una transcripción en curso, parando la transcripción")
+            if stream:
+                stream.abort()
+            logger.info("No se grabó audio.")
+            telemetry.end_trace("no_audio")
+    finally:
+        # Si ya empezó otro dictado mientras se transcribía, su estado manda
+        _set_state_if_current(token, "idle")
+
+
+def recording_active():
+    """Grabando o a punto de empezar (el hilo aún no ha abierto la sesión)"""
+    return is_recording() or socket_server.server_state == "recording"
+
+
+def start_transcription(source="socket"):
+    """Empieza a grabar y transcribir en segundo plano; False si ya se graba"""
+    global _session_token, _pending_stop
+    with _state_lock:
+        if recording_active():
+            return False
+        _session_token += 1
+        token = _session_token
+        _pending_stop = False
+        # El estado cambia ya, sin esperar a que el hilo abra el stream
+        socket_server.set_server_state("recording")
+    trace = telemetry.begin_trace(source)
+    processing_thread = threading.Thread(
+        target=lambda: process_audio_and_transcribe(16000, token, trace),
+        daemon=True
+    )
+    processing_thread.start()
+    return True
+
+
+def stop_transcription():
+    """Detiene la grabación en curso; False si no se estaba grabando.
+
+    Si el dictado ya se pidió pero su hilo aún no ha creado la sesión, la
+    parada queda pendiente y se aplica en cuanto la sesión exista.
+    """
+    global _pending_stop
+    with _state_lock:
+        if is_recording():
+            stop_recording()
+            return True
+        if socket_server.server_state == "recording" and not _pending_stop:
+            _pending_stop = True
+            return True
         return False
 
 
+def handle_remote_command(command):
+    """Respuesta a las órdenes START, STOP y TOGGLE recibidas por el socket"""
+    if command == "TOGGLE":
+        with _state_lock:
+            return handle_remote_command("STOP" if recording_active() else "START")
+    if command == "START":
+        started = start_transcription("socket")
+        if started:
+            logger.info("Activando transcripción por solicitud remota...")
+        return {"ok": started, "action": "start"} if started else {"ok": False, "error": "ya se está grabando"}
+    stopped = stop_transcription()
+    if stopped:
+        logger.info("Parando la transcripción por solicitud remota")
+    return {"ok": stopped, "action": "stop"} if stopped else {"ok": False, "error": "no se está grabando"}
+
+
 def on_key_press(key):
     """Manejador de eventos de teclado"""
     global command_key
@@ -49,24 +190,20 @@ def on_key_press(key):
     
     try:
         if hasattr(key, "name") and key.name == command_key and not is_recording():
-            print(f"\n{command_key.upper()} presionado. Iniciando grabación continua...")
-            processing_thread = threading.Thread(
-                target=lambda: process_audio_and_transcribe(16000), 
-                daemon=True
-            )
-            processing_thread.start()
-        elif key == keyboard.Key.esc:
-            if is_recording():
-                print("\nEsc presionado. Deteniendo grabación...")
-                stop_recording()
+            logger.info(f"{command_key.upper()} presionado. Iniciando grabación continua...")
+            start_transcription("hotkey")
+        elif key == _keyboard().Key.esc:
+            if recording_active():
+                logger.info("Esc presionado. Deteniendo grabación...")
+                stop_transcription()
             else:
-                print("\nEsc presionado. Deteniendo el listener...")
+                logger.info("Esc presionado. Deteniendo el listener...")
                 stop_event.set()
                 return False
     except AttributeError:
         pass
     except Exception as e:
-        print(f"Error en on_key_press: {e}")
+        logger.error(f"Error en on_key_press: {e}")
 
 def start_keyboard_listener(config):
     """Inicia el listener del teclado"""
@@ -76,7 +213,7 @@ def start_keyboard_listener(config):
     command_key = config["command_key"]
     
     # Iniciar el listener del teclado
-    listener_thread = keyboard.Listener(on_press=on_key_press)
+    listener_thread = _keyboard().Listener(on_press=on_key_press)
     listener_thread.start()
     
     # Esperar a que se active el evento de parada
@@ -2,29 +2,87 @@
 Aplicación principal de transcripción de voz
 Punto de entrada que coordina los diferentes módulos
 """
-import pyautogui
-from config import load_config, show_configuration
-from audio_recorder import setup_recorder
-from transcription import setup_transcription
-from keyboard_listener import start_keyboard_listener, trigger_transcription
-from socket_server import is_server_running, start_server, send_trigger_command
+import time
+_IMPORT_START = time.perf_counter()
+
+from config import load_config, show_configuration, validate_config
+from transcription.factory import setup_transcription, get_transcriber, create_ingestor
+from transcription.spool import setup_spool, spool_enabled
+from socket_server import (is_server_running, start_server, send_trigger_command,
+                           set_server_state, notify_service_manager)
+from telemetry import setup_logging, setup_telemetry
+from startup_profile import PhaseTimer
+import json
+import logging
 import sys
-from PyQt5.QtWidgets import QApplication
-from PyQt5.QtCore import QCoreApplication
 import signal
 import os
 
 signal.signal(signal.SIGINT, signal.SIG_DFL)
 
+logger = logging.getLogger(__name__)
+
 
 
 
+def handle_spool_command(args):
+    """
+    Gestiona la cola de transcripciones fallidas:
+    --spool list | --spool copy <id> | --spool paste <id> | --spool retry
+    """
+    load_config()
+    if not spool_enabled():
+        print("La cola de reintentos está desactivada (SPOOL_ENABLED=0).")
+        return
+    command = args[0] if args else "list"
+    # Solo retry escribe; el resto no toca la cola de la instancia en marcha
+    spool = setup_spool(read_only=command != "retry")
+    if spool is None:
+        print("La cola de reintentos está en uso por la instancia principal, que ya la reintenta.")
+        return
+    if command == "list":
+        for job in spool.list_jobs():
+            print(f"{job.id}  {job.status:<8} {job.duration:6.1f} s  intentos={job.attempts}  {job.text}")
+    elif command in ("copy", "paste") and len(args) > 1:
+        job = spool.get(args[1])
+        if job is None or not job.text:
+            print(f"No hay transcripción recuperada con id {args[1]}.")
+            return
+        if command == "copy":
+            import pyperclip
+            pyperclip.copy(job.text)
+            print("Texto copiado al portapapeles.")
+        else:
+            from transcription import write_text
+            write_text(job.text)
+    elif command == "retry":
+        setup_transcription({})
+        for job in spool.pending():
+            spool.retry_job(job, get_transcriber())
+    else:
+        print("Uso: main.py --spool [list | copy <id> | paste <id> | retry]")
+    spool.stop()
+
 def handle_command_line_arguments():
     """
     Maneja los argumentos de la línea de comandos.
     Si se especifica --transcript, intenta comunicarse con la instancia principal.
     Si no se encuentra la instancia principal, continúa como instancia principal.
     """
+    if len(sys.argv) > 1 and sys.argv[1] == "transcribe":
+        # Modo por lotes: sin Tk, Qt ni teclado
+        from batch import run_batch_command
+        sys.exit(run_batch_command(sys.argv[2:]))
+
+    if len(sys.argv) > 1 and sys.argv[1] == "--profile-startup":
+        # Arranca una instancia con -X importtime y muestra imports y fases
+        from startup_profile import run_profile_command
+        sys.exit(run_profile_command(sys.argv[2:]))
+
+    if len(sys.argv) > 1 and sys.argv[1] == "--spool":
+        handle_spool_command(sys.argv[2:])
+        sys.exit(0)
+
     if len(sys.argv) > 1 and sys.argv[1] == "--transcript":
         # Modo cliente: intentar comunicarse con la instancia principal
         if is_server_running():
@@ -39,35 +97,122 @@ def handle_command_line_arguments():
             print("No se detectó ninguna instancia principal. Iniciando como instancia principal...")
             sys.exit(0)
 
+def remote_commands():
+    """Órdenes del socket que actúan sobre la grabación (START, STOP, TOGGLE)"""
+    def command(name):
+        def run():
+            # keyboard_listener arrastra Qt y el grabador: se importa al usarse
+            from keyboard_listener import handle_remote_command
+            return handle_remote_command(name)
+        return run
+    return {name: command(name) for name in ("START", "STOP", "TOGGLE")}
+
+def prepare_transcriber(config):
+    """Crea el transcriptor y deja su conexión (o su modelo local) preparada"""
+    transcriber = setup_transcription(config)
+    setup_spool(transcriber)
+    if hasattr(transcriber, "warm_up"):
+        transcriber.warm_up()
+    if hasattr(transcriber, "wait_ready"):
+        # Proveedor local: esperar a que el proceso haya cargado el modelo
+        transcriber.wait_ready(float(os.getenv("DAEMON_READY_TIMEOUT", "120")))
+    return transcriber
+
+def run_daemon():
+    """
+    Arranque sin interfaz de configuración, p. ej. como servicio de systemd.
+    Valida el .env, abre el socket antes que nada (responde STATUS "starting"),
+    prepara grabador y transcriptor en paralelo y pasa a "idle" cuando todo
+    está caliente.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    timer = PhaseTimer(start=_IMPORT_START)
+    timer.add("imports", time.perf_counter() - _IMPORT_START)
+    with timer.phase("config"):
+        config = load_config()
+        problems = validate_config(config)
+    if problems:
+        for problem in problems:
+            logger.error(f"Configuración no válida: {problem}")
+        return 2
+
+    set_server_state("starting")
+    with timer.phase("socket_server"):
+        if not start_server(remote_commands(), wait=True, ingestor=create_ingestor()):
+            logger.error("No se pudo abrir el socket; ¿hay otra instancia en marcha?")
+            return 1
+
+    with timer.phase("qt_app"):
+        from PyQt5.QtWidgets import QApplication
+        app = QApplication(sys.argv[:1])
+        import audio_recorder
+        # La burbuja es un QObject: se crea y se conecta en el hilo principal,
+        # no en los hilos de arranque (que no tienen bucle de eventos y terminan)
+        audio_recorder.connect_bubble()
+
+    with timer.phase("warm_up"), ThreadPoolExecutor(max_workers=2, thread_name_prefix="startup") as pool:
+        recorder = pool.submit(audio_recorder.setup_recorder, config, False)
+        transcriber = pool.submit(prepare_transcriber, config)
+        recorder.result()
+        transcriber.result()
+    with timer.phase("telemetry"):
+        setup_telemetry()
+
+    set_server_state("idle")
+    notify_service_manager("READY=1")
+    logger.info(f"Listo en {timer.to_dict()['total']:.0f} ms ({timer.summary()})")
+    return app.exec_()
+
 def main():
-    
+    setup_logging()
     handle_command_line_arguments()
+    if "--daemon" in sys.argv[1:]:
+        sys.exit(run_daemon())
+    # --startup-phases: arranca sin ventana de configuración ni bucle de eventos,
+    # imprime el tiempo de cada fase en JSON y sale (lo usa --profile-startup)
+    phases_only = "--startup-phases" in sys.argv[1:]
+    timer = PhaseTimer(start=_IMPORT_START)
+    timer.add("imports", time.perf_counter() - _IMPORT_START)
+
+    # La interfaz solo se importa en el modo interactivo
+    with timer.phase("import_gui"):
+        from PyQt5.QtWidgets import QApplication
+        from audio_recorder import setup_recorder
+        # Lo usan las órdenes del socket; importarlo aquí evita pagarlo en la primera
+        import keyboard_listener
+
+    with timer.phase("config"):
+        config = load_config()
+    if not phases_only:
+        # Espera al usuario: no cuenta como arranque
+        config = show_configuration(config)
+
+    with timer.phase("qt_app"):
+        app = QApplication(sys.argv[:1] if phases_only else sys.argv)
+
+    with timer.phase("recorder"):
+        setup_recorder(config)
+    with timer.phase("transcription"):
+        setup_transcription(config)
+        setup_spool(get_transcriber())
+    with timer.phase("telemetry"):
+        setup_telemetry()
 
-    config = load_config()
-    config = show_configuration(config)
-    
-    app = QApplication(sys.argv)
-
-    
-    setup_recorder(config)
-    setup_transcription(config)
-    
-    print(f"Presiona {config['command_key'].upper()} para iniciar la grabación continua")
-    print(f"(usando Groq API - {os.getenv("MODEL_NAME", "")}).")
-    print("Presiona Esc o haz clic en la burbuja de grabación para detener.")
-    print("Presiona Esc cuando no estés grabando para salir del programa.")
-    
-    
     # Iniciar el servidor socket
-    start_server(lambda: trigger_transcription(config))
-    
-    # Iniciar el listener del teclado
-    try:
-        pyautogui.PAUSE = 0.1
-        pyautogui.FAILSAFE = True
-    except Exception as e:
-        print(f"Error inicializando pyautogui: {e}")
-        
+    with timer.phase("socket_server"):
+        start_server(remote_commands(), ingestor=create_ingestor())
+
+    if phases_only:
+        print(json.dumps(timer.to_dict()), flush=True)
+        return
+
+    logger.debug(f"Arranque: {timer.summary()}")
+    logger.info(f"Presiona {config['command_key'].upper()} para iniciar la grabación continua")
+    logger.info(f"(usando Groq API - {os.getenv('MODEL_NAME', '')}).")
+    logger.info("Presiona Esc o haz clic en la burbuja de grabación para detener.")
+    logger.info("Presiona Esc cuando no estés grabando para salir del programa.")
+
     sys.exit(app.exec_())
 
 if __name__ == "__main__":
@@ -1,103 +1,478 @@
 """
 Módulo para gestionar la comunicación entre instancias mediante sockets
+
+La instancia principal escucha en un socket Unix por usuario
+(``$XDG_RUNTIME_DIR/air-type.sock``; en Windows, TCP en 127.0.0.1:65432)
+con un bucle asyncio en segundo plano que atiende a varios clientes a la vez.
+
+Protocolo: cada mensaje es un frame ``<longitud uint32 big-endian><JSON UTF-8>``.
+Las peticiones son ``{"cmd": ...}`` y cada una recibe una respuesta
+``{"ok": bool, "state": ..., ...}`` (``"error"`` si falla). Órdenes:
+
+    PING       comprobar que hay instancia
+    STATUS     estado actual: starting, idle, recording, transcribing
+    START      empezar a grabar (falla si ya se graba)
+    STOP       parar la grabación (falla si no se graba)
+    TOGGLE     START o STOP según el estado; ``action`` dice cuál
+    SUBSCRIBE  tras la respuesta, el servidor envía un frame por evento:
+               ``{"event": "state", "state": ...}`` y
+               ``{"event": "transcript", "text": ..., "model": ...}``
+    TRANSCRIBE ``{"cmd": "TRANSCRIBE", "format": "pcm_s16le" | "pcm_f32le" |
+               "wav", "sample_rate": 16000, "channels": 1}``. Se responde
+               ``accepted`` o ``busy`` (cola llena, no enviar el audio); el
+               cliente manda el audio en frames binarios terminados por uno
+               vacío y recibe ``{"ok", "text", "model", ...}``. Ver
+               ``transcription.ingest``.
+
+Este módulo lo importa también el cliente ligero: asyncio solo se importa
+al arrancar el servidor.
 """
+import json
+import logging
+import os
 import socket
-import threading
+import struct
 import sys
-import os
-import time
+import tempfile
+import threading
+
+logger = logging.getLogger(__name__)
 
 # Configuración del socket
-HOST = '127.0.0.1'  # localhost
+HOST = '127.0.0.1'  # localhost, solo sin sockets Unix (Windows)
 PORT = 65432        # Puerto arbitrario no privilegiado
 SOCKET_TIMEOUT = 2  # Tiempo de espera en segundos
+USE_UNIX_SOCKET = hasattr(socket, "AF_UNIX") and sys.platform != "win32"
 
-# Variable global para el servidor
-server_socket = None
-server_thread = None
-is_running = False
+FRAME_HEADER = struct.Struct(">I")
+MAX_FRAME = 16 * 1024 * 1024
+# Eventos pendientes por suscriptor; si no lee, se descartan los más antiguos
+SUBSCRIBER_QUEUE = 64
 
-def is_server_running():
-    """Comprueba si hay otra instancia del servidor ejecutándose"""
-    try:
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-            s.settimeout(1)
-            s.connect((HOST, PORT))
-            s.sendall(b'PING')
-            response = s.recv(1024)
-            return response == b'PONG'
-    except:
-        return False
+# Estado que se responde a STATUS: "starting" mientras el daemon calienta
+# grabador y transcriptor; después "idle", "recording" o "transcribing"
+server_state = "idle"
+_server = None
 
-def start_server(trigger_callback):
-    """Inicia el servidor socket en segundo plano"""
-    global server_socket, server_thread, is_running
-    
-    if is_running:
-        return
-    
-    def server_loop():
-        global server_socket, is_running
-        
+
+def socket_path():
+    """Ruta del socket Unix de este usuario (AIR_TYPE_SOCKET para cambiarla)"""
+    path = os.getenv("AIR_TYPE_SOCKET")
+    if path:
+        return path
+    runtime_dir = os.getenv("XDG_RUNTIME_DIR")
+    if runtime_dir and os.path.isdir(runtime_dir):
+        return os.path.join(runtime_dir, "air-type.sock")
+    return os.path.join(tempfile.gettempdir(), f"air-type-{os.getuid()}.sock")
+
+
+def encode_frame(message):
+    payload = message if isinstance(message, bytes) else json.dumps(message, ensure_ascii=False).encode()
+    return FRAME_HEADER.pack(len(payload)) + payload
+
+
+class IPCServer:
+    """Servidor asyncio en un hilo propio; el hilo principal queda para Qt."""
+
+    def __init__(self, commands, ingestor=None):
+        self.commands = commands
+        self.ingestor = ingestor
+        self.running = False
+        self.loop = None
+        self._stopped = None
+        self._subscribers = set()
+        self._clients = {}
+        self._listening = threading.Event()
+        self._thread = None
+
+    def start(self, wait=True):
+        self._thread = threading.Thread(target=self._run, daemon=True, name="ipc-server")
+        self._thread.start()
+        if wait:
+            self._listening.wait(SOCKET_TIMEOUT)
+        return self.running
+
+    def stop(self):
+        if self.loop is not None and self.running:
+            self.loop.call_soon_threadsafe(self._stopped.set)
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join(timeout=1)
+
+    def publish(self, event):
+        """Envía un evento a los suscriptores (desde cualquier hilo)"""
+        if self.running and self._subscribers:
+            self.loop.call_soon_threadsafe(self._broadcast, event)
+
+    def _broadcast(self, event):
+        for queue in self._subscribers:
+            if queue.full():
+                queue.get_nowait()  # suscriptor lento: se pierde el evento más antiguo
+            queue.put_nowait(event)
+
+    def _run(self):
+        import asyncio
         try:
-            server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-            server_socket.bind((HOST, PORT))
-            server_socket.listen()
-            server_socket.settimeout(SOCKET_TIMEOUT)
-            
-            is_running = True
-            print(f"Servidor socket iniciado en {HOST}:{PORT}")
-            
-            while is_running:
-                try:
-                    conn, addr = server_socket.accept()
-                    with conn:
-                        data = conn.recv(1024)
-                        if data == b'PING':
-                            conn.sendall(b'PONG')
-                        elif data == b'TRIGGER':
-                            print("Recibida solicitud de transcripción desde otra instancia")
-                            conn.sendall(b'OK')
-                            # Llamar al callback para iniciar la transcripción
-                            threading.Thread(target=trigger_callback, daemon=True).start()
-                except socket.timeout:
-                    # Timeout normal, continuar el ciclo
-                    continue
-                except Exception as e:
-                    if is_running:  # Solo mostrar errores si aún estamos en ejecución
-                        print(f"Error en el servidor socket: {e}")
+            asyncio.run(self._serve())
         except Exception as e:
-            print(f"Error iniciando el servidor socket: {e}")
+            logger.error(f"Error en el servidor socket: {e}")
+        finally:
+            self.running = False
+            self._listening.set()
+
+    async def _serve(self):
+        import asyncio
+        self.loop = asyncio.get_running_loop()
+        self._stopped = asyncio.Event()
+        try:
+            if USE_UNIX_SOCKET:
+                path = socket_path()
+                _remove_stale_socket(path)
+                server = await asyncio.start_unix_server(self._handle, path=path)
+                os.chmod(path, 0o600)
+                address = path
+            else:
+                server = await asyncio.start_server(self._handle, HOST, PORT)
+                address = f"{HOST}:{PORT}"
+        except OSError as e:
+            logger.error(f"Error iniciando el servidor socket: {e}")
+            return
+        self.running = True
+        self._listening.set()
+        logger.info(f"Servidor socket iniciado en {address}")
+        async with server:
+            await self._stopped.wait()
+            # Cerrar las conexiones abiertas: sus lectores ven EOF y terminan
+            for writer in self._clients.values():
+                writer.close()
+            if self._clients:
+                await asyncio.wait(list(self._clients), timeout=SOCKET_TIMEOUT)
+        if USE_UNIX_SOCKET:
+            try:
+                _remove_stale_socket(address)
+            except OSError as e:
+                logger.warning(f"No se borró el socket al salir: {e}")
+        logger.info("Servidor socket detenido")
+
+    async def _handle(self, reader, writer):
+        import asyncio
+        task = asyncio.current_task()
+        self._clients[task] = writer
+        try:
+            while True:
+                request = await _read_message(reader)
+                if request is None:
+                    break
+                command = str(request.get("cmd", "")).upper()
+                if command == "SUBSCRIBE":
+                    await self._subscribe(reader, writer)
+                    break
+                if command == "TRANSCRIBE":
+                    response = await self._transcribe(request, reader, writer)
+                else:
+                    response = await self._dispatch(command)
+                writer.write(encode_frame(response))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except ValueError as e:
+            logger.warning(f"Mensaje no válido en el socket: {e}")
+        finally:
+            self._clients.pop(task, None)
+            writer.close()
+
+    async def _dispatch(self, command):
+        if command == "PING":
+            return {"ok": True, "state": server_state}
+        if command == "STATUS":
+            status = {"ok": True, "state": server_state}
+            if self.ingestor is not None:
+                status["ingest_pending"] = self.ingestor.pending
+            return status
+        handler = self.commands.get(command)
+        if handler is None:
+            return {"ok": False, "error": f"orden desconocida: {command}", "state": server_state}
+        if server_state == "starting":
+            return {"ok": False, "error": "starting", "state": server_state}
+        # Los manejadores tocan el grabador: fuera del bucle para no bloquearlo
+        result = await self.loop.run_in_executor(None, handler)
+        return {"state": server_state, **result}
+
+    async def _transcribe(self, request, reader, writer):
+        """Recibe audio de un cliente y lo transcribe en la cola del ingestor"""
+        if self.ingestor is None:
+            return {"ok": False, "error": "esta instancia no acepta audio"}
+        if server_state == "starting":
+            return {"ok": False, "error": "starting", "state": server_state}
+        from transcription.ingest import validate_request
+        try:
+            # Antes de aceptar: una cabecera mala no debe llegar al proveedor
+            params = validate_request(request)
+        except ValueError as e:
+            return {"ok": False, "error": f"petición no válida: {e}"}
+        if not self.ingestor.reserve():
+            # Contrapresión: el cliente no envía el audio y reintenta más tarde
+            return {"ok": False, "error": "busy", "pending": self.ingestor.pending}
+        upload = self.ingestor.upload_buffer()
+        try:
+            writer.write(encode_frame({"ok": True, "state": "accepted"}))
+            await writer.drain()
+            size = 0
+            while True:
+                chunk = await _read_frame(reader)
+                if chunk is None:
+                    # Cerró sin el frame vacío final: audio incompleto, no se transcribe
+                    raise ConnectionError("el cliente cerró la conexión a mitad de la subida")
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > self.ingestor.max_bytes:
+                    raise ValueError(f"audio de más de {self.ingestor.max_bytes} bytes")
+                upload.write(chunk)
+            # El trabajo se queda el fichero y lo cierra al terminar
+            job, upload = upload, None
+            return await self.loop.run_in_executor(
+                self.ingestor.executor, self.ingestor.transcribe, job, params)
+        finally:
+            if upload is not None:
+                upload.close()
+            self.ingestor.release()
+
+    async def _subscribe(self, reader, writer):
+        import asyncio
+        queue = asyncio.Queue(SUBSCRIBER_QUEUE)
+        self._subscribers.add(queue)
+        try:
+            writer.write(encode_frame({"ok": True, "state": server_state}))
+            await writer.drain()
+            # El cliente no envía nada más: leer solo sirve para ver que cierra
+            closed = asyncio.ensure_future(reader.read(1))
+            while True:
+                event = asyncio.ensure_future(queue.get())
+                done, _ = await asyncio.wait({closed, event}, return_when=asyncio.FIRST_COMPLETED)
+                if closed in done:
+                    event.cancel()
+                    break
+                writer.write(encode_frame(event.result()))
+                await writer.drain()
         finally:
-            if server_socket:
-                server_socket.close()
-            is_running = False
-            print("Servidor socket detenido")
-    
-    server_thread = threading.Thread(target=server_loop, daemon=True)
-    server_thread.start()
+            self._subscribers.discard(queue)
+
+
+async def _read_frame(reader):
+    """Lee un frame; None si el cliente cerró la conexión"""
+    header = await reader.read(FRAME_HEADER.size)
+    if not header:
+        return None
+    if len(header) < FRAME_HEADER.size:
+        header += await reader.readexactly(FRAME_HEADER.size - len(header))
+    (length,) = FRAME_HEADER.unpack(header)
+    if length > MAX_FRAME:
+        raise ValueError(f"frame de {length} bytes")
+    return await reader.readexactly(length)
+
+
+async def _read_message(reader):
+    """Lee un frame JSON; None si el cliente cerró la conexión"""
+    payload = await _read_frame(reader)
+    if payload is None:
+        return None
+    message = json.loads(payload)
+    if not isinstance(message, dict):
+        raise ValueError("se esperaba un objeto JSON")
+    return message
+
+
+def _remove_stale_socket(path):
+    """Borra el socket de una instancia que ya no existe.
+
+    Solo se borra si nadie lo atiende (conexión rechazada). Si alguien
+    acepta la conexión o no responde a tiempo, otra instancia puede estar
+    en marcha (quizá ocupada) y se lanza ``OSError`` para no quitarle el
+    socket.
+    """
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    probe.settimeout(SOCKET_TIMEOUT)
+    try:
+        probe.connect(path)
+    except FileNotFoundError:
+        return
+    except ConnectionRefusedError:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        return
+    except OSError as e:
+        raise OSError(f"el socket {path} no responde ({e}); puede haber otra instancia en ejecución") from e
+    finally:
+        probe.close()
+    raise OSError(f"ya hay otra instancia escuchando en {path}")
+
+
+def set_server_state(state):
+    """Cambia el estado que el servidor comunica y avisa a los suscriptores"""
+    global server_state
+    if state == server_state:
+        return
+    server_state = state
+    if _server is not None:
+        _server.publish({"event": "state", "state": state})
+
+
+def publish_transcript(text, **fields):
+    """Envía una transcripción terminada a los suscriptores"""
+    if _server is not None:
+        _server.publish({"event": "transcript", "text": str(text), **fields})
+
+
+def start_server(commands, wait=False, ingestor=None):
+    """Inicia el servidor socket en segundo plano.
+
+    ``commands`` asocia START, STOP y TOGGLE a funciones que devuelven un
+    dict con al menos ``ok``; ``ingestor`` (un ``AudioIngestor``) habilita
+    TRANSCRIBE. Con ``wait`` espera a que el socket esté escuchando y
+    devuelve si lo está.
+    """
+    global _server
+    if _server is not None and _server.running:
+        return True
+    if is_server_running():
+        logger.error("Ya hay otra instancia escuchando en el socket")
+        return False
+    _server = IPCServer(commands, ingestor)
+    return _server.start(wait=wait)
+
 
 def stop_server():
     """Detiene el servidor socket"""
-    global server_socket, is_running
-    
-    is_running = False
-    if server_socket:
-        server_socket.close()
-    
-    if server_thread and server_thread.is_alive():
-        server_thread.join(timeout=1)
+    global _server
+    if _server is not None:
+        _server.stop()
+        _server = None
+
+
+def connect(timeout=SOCKET_TIMEOUT):
+    """Conecta con la instancia principal (OSError si no hay)"""
+    if USE_UNIX_SOCKET:
+        s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        address = socket_path()
+    else:
+        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        address = (HOST, PORT)
+    s.settimeout(timeout)
+    try:
+        s.connect(address)
+    except OSError:
+        s.close()
+        raise
+    return s
+
+
+def recv_message(s):
+    """Lee un frame JSON de un socket bloqueante; None si se cerró"""
+    header = _recv_exactly(s, FRAME_HEADER.size)
+    if header is None:
+        return None
+    (length,) = FRAME_HEADER.unpack(header)
+    payload = _recv_exactly(s, length) if length else b""
+    if payload is None:
+        raise ConnectionError("conexión cerrada a mitad de mensaje")
+    return json.loads(payload)
+
+
+def _recv_exactly(s, size):
+    data = bytearray()
+    while len(data) < size:
+        chunk = s.recv(size - len(data))
+        if not chunk:
+            if data:
+                raise ConnectionError("conexión cerrada a mitad de mensaje")
+            return None
+        data += chunk
+    return bytes(data)
+
+
+def send_command(command, timeout=SOCKET_TIMEOUT, **fields):
+    """Envía una orden a la instancia principal y devuelve su respuesta (dict)"""
+    with connect(timeout) as s:
+        s.sendall(encode_frame({"cmd": command, **fields}))
+        response = recv_message(s)
+    if response is None:
+        raise ConnectionError("la instancia principal cerró la conexión")
+    return response
+
+
+def transcribe_audio(payload, sample_rate=None, audio_format="pcm_s16le", channels=1,
+                     chunk_size=256 * 1024, timeout=None):
+    """Envía audio a la instancia principal y devuelve su respuesta con el texto.
+
+    ``payload`` son bytes PCM (o un WAV completo con ``audio_format="wav"``).
+    Si la cola está llena la respuesta es ``{"ok": False, "error": "busy"}``.
+    """
+    with connect(SOCKET_TIMEOUT) as s:
+        s.sendall(encode_frame({"cmd": "TRANSCRIBE", "format": audio_format,
+                                "sample_rate": sample_rate, "channels": channels}))
+        response = recv_message(s)
+        if response is None or response.get("state") != "accepted":
+            return response or {"ok": False, "error": "conexión cerrada"}
+        view = memoryview(payload).cast("B")
+        for start in range(0, len(view), chunk_size):
+            chunk = view[start:start + chunk_size]
+            s.sendall(FRAME_HEADER.pack(len(chunk)))
+            s.sendall(chunk)
+        s.sendall(FRAME_HEADER.pack(0))
+        s.settimeout(timeout)
+        return recv_message(s) or {"ok": False, "error": "conexión cerrada"}
+
+
+def subscribe(timeout=None):
+    """Genera los eventos de la instancia principal; el primero es la respuesta"""
+    with connect(SOCKET_TIMEOUT) as s:
+        s.sendall(encode_frame({"cmd": "SUBSCRIBE"}))
+        s.settimeout(timeout)
+        while True:
+            message = recv_message(s)
+            if message is None:
+                return
+            yield message
+
+
+def is_server_running():
+    """Comprueba si hay otra instancia del servidor ejecutándose"""
+    try:
+        return send_command("PING", timeout=1).get("ok", False)
+    except (OSError, ValueError):
+        return False
+
 
 def send_trigger_command():
-    """Envía un comando para activar la transcripción en la instancia principal"""
+    """Alterna grabación/parada en la instancia principal"""
+    try:
+        return send_command("TOGGLE").get("ok", False)
+    except (OSError, ValueError) as e:
+        logger.error(f"Error al comunicarse con la instancia principal: {e}")
+        return False
+
+
+def get_server_status():
+    """Estado de la instancia principal o None si no hay"""
     try:
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-            s.settimeout(3)
-            s.connect((HOST, PORT))
-            s.sendall(b'TRIGGER')
-            response = s.recv(1024)
-            return response == b'OK'
-    except Exception as e:
-        print(f"Error al comunicarse con la instancia principal: {e}")
-        return False
\ No newline at end of file
+        return send_command("STATUS", timeout=1).get("state")
+    except (OSError, ValueError):
+        return None
+
+
+def notify_service_manager(message):
+    """Envía un aviso sd_notify (p. ej. "READY=1") si corre como servicio de systemd"""
+    address = os.getenv("NOTIFY_SOCKET")
+    if not address:
+        return False
+    if address.startswith("@"):
+        address = "\0" + address[1:]  # socket abstracto
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as s:
+            s.sendto(message.encode(), address)
+        return True
+    except OSError as e:
+        logger.warning(f"No se pudo avisar a systemd: {e}")
+        return False
@@ -0,0 +1,125 @@
+"""
+Medición del arranque: tiempo por fase de ``main()`` y por import.
+
+``main.py --profile-startup`` lanza la aplicación con ``python -X importtime``
+en modo ``--startup-phases`` (arranca todo menos la ventana de configuración
+y el bucle de eventos, imprime las fases en JSON y sale) y muestra los
+imports más caros junto al tiempo de cada fase.
+
+Uso:
+    python main.py --profile-startup [--top 25] [--json perfil.json]
+"""
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+# main.py importa este módulo al arrancar: argparse y subprocess se importan
+# solo en las funciones que lanzan el perfil
+MAIN_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+
+
+class PhaseTimer:
+    """Tiempo de cada fase del arranque, en el orden en que se ejecutan."""
+
+    def __init__(self, start: Optional[float] = None):
+        self.start = start if start is not None else time.perf_counter()
+        self.phases: List[Tuple[str, float]] = []
+
+    def add(self, name: str, seconds: float) -> None:
+        self.phases.append((name, seconds))
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def to_dict(self) -> Dict[str, float]:
+        """{fase: ms}, más ``total`` desde ``start``"""
+        result = {name: round(seconds * 1000, 3) for name, seconds in self.phases}
+        result["total"] = round((time.perf_counter() - self.start) * 1000, 3)
+        return result
+
+    def summary(self) -> str:
+        return ", ".join(f"{name} {ms:.0f} ms" for name, ms in self.to_dict().items())
+
+
+def parse_importtime(stderr: str) -> List[dict]:
+    """Convierte la salida de ``-X importtime`` en [{module, self_ms, cumulative_ms, depth}]"""
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # cabecera
+        name = parts[2].rstrip()
+        module = name.lstrip()
+        imports.append({
+            "module": module,
+            "self_ms": int(parts[0]) / 1000,
+            "cumulative_ms": int(parts[1]) / 1000,
+            # La salida anida los imports con dos espacios por nivel
+            "depth": (len(name) - len(module) - 1) // 2,
+        })
+    return imports
+
+
+def run_startup_child(importtime: bool = False, env: Optional[dict] = None) -> dict:
+    """Arranca ``main.py --startup-phases`` y devuelve fases, imports y tiempo total"""
+    import subprocess
+    command = [sys.executable]
+    if importtime:
+        command += ["-X", "importtime"]
+    command += [MAIN_SCRIPT, "--startup-phases"]
+    start = time.perf_counter()
+    process = subprocess.run(command, capture_output=True, text=True, env=env)
+    wall = (time.perf_counter() - start) * 1000
+    if process.returncode != 0:
+        raise RuntimeError(f"El arranque falló ({process.returncode}): {process.stderr[-2000:]}")
+    lines = [line for line in process.stdout.splitlines() if line.startswith("{")]
+    if not lines:
+        raise RuntimeError("El arranque no informó de sus fases")
+    return {
+        "wall_ms": round(wall, 3),
+        "phases": json.loads(lines[-1]),
+        "imports": parse_importtime(process.stderr) if importtime else [],
+    }
+
+
+def run_profile_command(argv: List[str]) -> int:
+    import argparse
+    parser = argparse.ArgumentParser(prog="main.py --profile-startup",
+                                     description="Tiempo de arranque por import y por fase")
+    parser.add_argument("--top", type=int, default=25, help="Imports a mostrar")
+    parser.add_argument("--json", help="Guardar el perfil completo en este fichero")
+    args = parser.parse_args(argv)
+
+    try:
+        result = run_startup_child(importtime=True)
+    except RuntimeError as e:
+        print(e)
+        return 1
+
+    imports = result["imports"]
+    print(f"Imports más caros (de {len(imports)}):")
+    print(f"{'acumulado':>10} {'propio':>9}  módulo")
+    for item in sorted(imports, key=lambda i: i["cumulative_ms"], reverse=True)[:args.top]:
+        print(f"{item['cumulative_ms']:8.1f}ms {item['self_ms']:7.1f}ms  "
+              f"{'  ' * item['depth']}{item['module']}")
+
+    print("\nFases de main():")
+    for name, ms in result["phases"].items():
+        print(f"  {name:<16} {ms:8.1f} ms")
+    print(f"  {'proceso':<16} {result['wall_ms']:8.1f} ms (incluye -X importtime)")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print(f"Perfil guardado en {args.json}")
+    return 0
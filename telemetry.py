@@ -0,0 +1,338 @@
+"""
+Trazas por etapa de cada dictado, métricas para Prometheus y logging.
+
+Cada dictado es una traza con eventos puntuales (``hotkey``, ``first_audio``,
+``stop``...) y tramos con duración (``stream_open``, ``encode``, ``upload``,
+``paste``...). Al terminar se añade una línea a TRACE_FILE (JSONL) y las
+duraciones alimentan los histogramas que sirve METRICS_PORT en
+``http://127.0.0.1:<puerto>/metrics``.
+
+Sin TRACE_FILE ni METRICS_PORT no hay traza activa: ``mark()`` es una
+comparación con None y ``span()`` devuelve siempre el mismo objeto vacío.
+
+La traza activa es una ``ContextVar``: el hilo del dictado la fija con
+``use_trace`` y los hilos que trabajan para él (cobertura, trozos) la
+heredan con ``propagate``. El resto de hilos (reintentos de la cola,
+audio recibido por el socket) no tienen traza y no contaminan la del
+dictado que esté en curso.
+"""
+import contextvars
+import functools
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+# Límites de los buckets en segundos (de 5 ms a 1 min)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Intervalos derivados de los eventos: (nombre, desde, hasta)
+INTERVALS = (
+    ("hotkey_to_first_audio", "hotkey", "first_audio"),
+    ("stop_latency", "stop", "recording_stopped"),
+    ("stop_to_text", "stop", "text_ready"),
+    ("stop_to_done", "stop", "done"),
+)
+
+
+def setup_logging(level: Optional[str] = None) -> None:
+    """Configura el logging de la aplicación (LOG_LEVEL, INFO por defecto)"""
+    level = (level or os.getenv("LOG_LEVEL", "INFO")).upper()
+    logging.basicConfig(
+        level=getattr(logging, level, logging.INFO),
+        format="%(asctime)s %(levelname)-7s %(name)s: %(message)s",
+        datefmt="%H:%M:%S",
+    )
+
+
+class _NullSpan:
+    """Tramo que no mide nada; se usa cuando no hay traza activa."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs) -> None:
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+    """Tramo con duración dentro de una traza."""
+
+    __slots__ = ("trace", "name", "attrs", "start")
+
+    def __init__(self, trace: "Trace", name: str, attrs: dict):
+        self.trace = trace
+        self.name = name
+        self.attrs = attrs
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        self.trace.add_span(self.name, self.start, time.perf_counter(), **self.attrs)
+        return False
+
+    def set(self, **attrs) -> None:
+        self.attrs.update(attrs)
+
+
+class Trace:
+    """Eventos y tramos de un dictado, relativos a su inicio."""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, source: str):
+        self.id = f"{int(time.time())}-{next(self._ids)}"
+        self.source = source
+        self.wall_start = time.time()
+        self.start = time.perf_counter()
+        self.events: Dict[str, float] = {}
+        self.spans: List[dict] = []
+        self.status = "ok"
+        self._lock = threading.Lock()
+
+    def mark(self, name: str) -> None:
+        """Registra un evento; solo cuenta la primera vez"""
+        if name not in self.events:
+            self.events[name] = time.perf_counter() - self.start
+
+    def add_span(self, name: str, start: Optional[float], end: float, **attrs) -> None:
+        """Añade un tramo; ``start`` None indica una duración medida fuera"""
+        record = {"name": name}
+        if start is None:
+            record["duration_ms"] = round(end * 1000, 3)
+        else:
+            record["start_ms"] = round((start - self.start) * 1000, 3)
+            record["duration_ms"] = round((end - start) * 1000, 3)
+        record.update(attrs)
+        with self._lock:
+            self.spans.append(record)
+
+    def durations(self) -> Dict[str, List[float]]:
+        """Duraciones en segundos por etapa (tramos + intervalos derivados)"""
+        result: Dict[str, List[float]] = {}
+        for span in self.spans:
+            result.setdefault(span["name"], []).append(span["duration_ms"] / 1000)
+        for name, begin, end in INTERVALS:
+            if begin in self.events and end in self.events:
+                result.setdefault(name, []).append(self.events[end] - self.events[begin])
+        return result
+
+    def to_record(self) -> dict:
+        return {
+            "trace_id": self.id,
+            "source": self.source,
+            "start": self.wall_start,
+            "status": self.status,
+            "events": {name: round(offset * 1000, 3) for name, offset in self.events.items()},
+            "spans": self.spans,
+        }
+
+
+class Histogram:
+    """Histograma acumulativo al estilo Prometheus."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        for i, limit in enumerate(self.buckets):
+            if value <= limit:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    """Histogramas por etapa y contadores de dictados."""
+
+    def __init__(self):
+        self.stages: Dict[str, Histogram] = {}
+        self.dictations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def record(self, trace: Trace) -> None:
+        with self._lock:
+            self.dictations[trace.status] = self.dictations.get(trace.status, 0) + 1
+            for stage, values in trace.durations().items():
+                histogram = self.stages.setdefault(stage, Histogram())
+                for value in values:
+                    histogram.observe(value)
+
+    def render(self) -> str:
+        """Formato de exposición de texto de Prometheus"""
+        lines = [
+            "# HELP air_type_stage_seconds Duración de cada etapa del dictado.",
+            "# TYPE air_type_stage_seconds histogram",
+        ]
+        with self._lock:
+            for stage, h in sorted(self.stages.items()):
+                cumulative = 0
+                for limit, count in zip(h.buckets, h.counts):
+                    cumulative += count
+                    lines.append(f'air_type_stage_seconds_bucket{{stage="{stage}",le="{limit}"}} {cumulative}')
+                lines.append(f'air_type_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {h.count}')
+                lines.append(f'air_type_stage_seconds_sum{{stage="{stage}"}} {h.sum:.6f}')
+                lines.append(f'air_type_stage_seconds_count{{stage="{stage}"}} {h.count}')
+            lines.append("# HELP air_type_dictations_total Dictados terminados por estado.")
+            lines.append("# TYPE air_type_dictations_total counter")
+            for status, count in sorted(self.dictations.items()):
+                lines.append(f'air_type_dictations_total{{status="{status}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+
+def _create_metrics_server(port: int) -> "ThreadingHTTPServer":
+    """Servidor HTTP de ``/metrics``; http.server solo se importa si se usa"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = self.server.metrics.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            logger.debug("metrics: " + format, *args)
+
+    return ThreadingHTTPServer(("127.0.0.1", port), MetricsHandler)
+
+
+_enabled = False
+_current: "contextvars.ContextVar[Optional[Trace]]" = contextvars.ContextVar("trace", default=None)
+_trace_file = None
+_trace_lock = threading.Lock()
+metrics = Metrics()
+_metrics_server: Optional["ThreadingHTTPServer"] = None
+
+
+def setup_telemetry() -> bool:
+    """Activa las trazas (TRACE_FILE) y el endpoint de métricas (METRICS_PORT)"""
+    global _enabled, _trace_file, _metrics_server
+    path = os.getenv("TRACE_FILE")
+    port = os.getenv("METRICS_PORT")
+    if path and _trace_file is None:
+        _trace_file = open(os.path.expanduser(path), "a", encoding="utf-8")
+        logger.info(f"Trazas de dictado en {path}")
+    if port and _metrics_server is None:
+        try:
+            _metrics_server = _create_metrics_server(int(port))
+        except OSError as e:
+            logger.warning(f"No se pudo abrir el endpoint de métricas en el puerto {port}: {e}")
+        else:
+            _metrics_server.daemon_threads = True
+            _metrics_server.metrics = metrics
+            threading.Thread(target=_metrics_server.serve_forever, daemon=True,
+                             name="metrics").start()
+            logger.info(f"Métricas en http://127.0.0.1:{port}/metrics")
+    _enabled = _trace_file is not None or _metrics_server is not None
+    return _enabled
+
+
+def begin_trace(source: str = "hotkey") -> Optional[Trace]:
+    """Crea la traza de un dictado y registra el evento ``hotkey``.
+
+    No la activa: el hilo que procesa el dictado la fija con ``use_trace``.
+    """
+    if not _enabled:
+        return None
+    trace = Trace(source)
+    trace.mark("hotkey")
+    return trace
+
+
+@contextmanager
+def use_trace(trace: Optional[Trace]):
+    """Activa ``trace`` en este contexto mientras dure el bloque"""
+    token = _current.set(trace)
+    try:
+        yield trace
+    finally:
+        _current.reset(token)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current.get()
+
+
+def propagate(fn: Callable) -> Callable:
+    """Envuelve ``fn`` para ejecutarla en otro hilo con la traza de este"""
+    trace = _current.get()
+    if trace is None:
+        return fn
+
+    @functools.wraps(fn)
+    def run(*args, **kwargs):
+        with use_trace(trace):
+            return fn(*args, **kwargs)
+    return run
+
+
+def end_trace(status: str = "ok", trace: Optional[Trace] = None) -> None:
+    """Cierra la traza (la actual por defecto), la escribe en TRACE_FILE y
+    actualiza las métricas"""
+    trace = trace or _current.get()
+    if trace is None or "done" in trace.events:
+        return
+    trace.mark("done")
+    trace.status = status
+    metrics.record(trace)
+    if _trace_file is not None:
+        line = json.dumps(trace.to_record(), ensure_ascii=False)
+        with _trace_lock:
+            _trace_file.write(line + "\n")
+            _trace_file.flush()
+
+
+def mark(name: str, trace: Optional[Trace] = None) -> None:
+    """Registra un evento en ``trace`` o en la traza actual, si la hay"""
+    trace = trace or _current.get()
+    if trace is not None:
+        trace.mark(name)
+
+
+def span(name: str, **attrs):
+    """Context manager que mide un tramo de la traza actual"""
+    trace = _current.get()
+    if trace is None:
+        return _NULL_SPAN
+    return Span(trace, name, attrs)
+
+
+def record_duration(name: str, seconds: float, **attrs) -> None:
+    """Añade una duración medida por otro (p. ej. el tiempo en el servidor)"""
+    trace = _current.get()
+    if trace is not None:
+        trace.add_span(name, None, seconds, **attrs)
@@ -1,9 +1,27 @@
 """
 API pública del módulo de transcripción.
+
+Los submódulos con interfaz (burbuja Qt, adaptador del SO) se importan
+solo al usarse, para que los modos sin GUI no los carguen.
 """
 from .factory import setup_transcription, get_transcriber
-from .utils import write_text, save_active_window, get_cursor_position
-from .bubble import bubble_manager, BubbleManager
+
+_LAZY = {
+    'write_text': '.utils',
+    'save_active_window': '.utils',
+    'get_cursor_position': '.utils',
+    'bubble_manager': '.bubble',
+    'BubbleManager': '.bubble',
+}
+
+
+def __getattr__(name):
+    if name in _LAZY:
+        from importlib import import_module
+        value = getattr(import_module(_LAZY[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
-__all__ = ['setup_transcription', 'get_transcriber', 'write_text', 'bubble_manager', 'BubbleManager', save_active_window, get_cursor_position]
\ No newline at end of file
+__all__ = ['setup_transcription', 'get_transcriber', 'write_text', 'bubble_manager', 'BubbleManager', 'save_active_window', 'get_cursor_position']
@@ -1,3 +1,4 @@
+import logging
 from PyQt5.QtWidgets import QApplication, QLabel, QWidget, QVBoxLayout
 from PyQt5.QtCore import Qt, QPoint
 from PyQt5.QtGui import QMouseEvent, QCursor
@@ -5,13 +6,18 @@ from PyQt5.QtCore import QTimer
 from PyQt5.QtCore import QObject, pyqtSignal
 from .utils import get_cursor_position
 
+logger = logging.getLogger(__name__)
+
 class BubbleManager(QObject):
     show_bubble = pyqtSignal()
+    hide_bubble = pyqtSignal()
     bubble_closed = pyqtSignal()
 
     def __init__(self):
         super().__init__()
         self.show_bubble.connect(self._show_bubble_impl)
+        # Permite cerrar la burbuja desde hilos que no son el de Qt
+        self.hide_bubble.connect(self._hide_bubble)
         self.recording_bubble = None
 
     def _show_bubble_impl(self):
@@ -73,7 +79,7 @@ class BubbleManager(QObject):
         x, y = cursor_pos
 
         self.recording_bubble.move(x, y - 100)
-        print(f"Moving recording bubble to x={x}, y={y - 100}")
+        logger.debug(f"Moving recording bubble to x={x}, y={y - 100}")
 
         # Eventos
         def mousePressEvent(event: QMouseEvent):
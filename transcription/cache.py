@@ -0,0 +1,181 @@
+"""
+Caché de resultados de transcripción direccionada por contenido.
+
+La clave es un hash rápido del PCM más la configuración completa del
+servicio (modelos, rutas, proveedores, codificador) y los parámetros, así
+que el mismo audio (reintentos, repeticiones de pegado, pruebas de
+regresión) devuelve el texto sin ir a la red, y cambiar la configuración
+no devuelve textos de la anterior.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+
+from .interfaces import TranscriptionService
+
+logger = logging.getLogger(__name__)
+
+# Atributos de los servicios que cambian el texto devuelto
+_IDENTITY_ATTRS = ("model_name", "engine", "api_url", "max_chunk_seconds", "overlap_seconds")
+
+
+def service_identity(service) -> dict:
+    """Describe todo lo que determina el texto de un servicio, recorriendo
+    los envoltorios (rutas por modelo, proveedores con cobertura, trozos).
+
+    Lee ``vars()`` y no ``getattr``: los envoltorios delegan en
+    ``__getattr__`` a un servicio interno cualquiera.
+    """
+    attrs = vars(service)
+    identity = {"service": type(service).__name__}
+    for name in _IDENTITY_ATTRS:
+        if name in attrs:
+            identity[name] = attrs[name]
+    if attrs.get("encoder") is not None:
+        identity["encoder"] = getattr(attrs["encoder"], "name", type(attrs["encoder"]).__name__)
+    if "routes" in attrs:
+        identity["routes"] = [[max_seconds, model, service_identity(inner)]
+                              for max_seconds, model, inner in attrs["routes"]]
+    if "providers" in attrs:
+        identity["providers"] = [[name, service_identity(inner)] for name, inner in attrs["providers"]]
+    if "inner" in attrs:
+        identity["inner"] = service_identity(attrs["inner"])
+    return identity
+
+
+class CachedTranscriptionService:
+    """Envuelve un ``TranscriptionService`` con LRU en memoria y disco opcional."""
+
+    def __init__(self, inner: TranscriptionService, max_entries: int = 128,
+                 cache_dir: Optional[str] = None, max_disk_bytes: int = 50 * 1024 * 1024):
+        self.inner = inner
+        # La configuración no cambia en vida del servicio: se serializa una vez
+        self._identity = json.dumps(service_identity(inner), sort_keys=True, default=str)
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def __getattr__(self, name):
+        return getattr(self.inner, name)
+
+    def cache_key(self, audio_data: np.ndarray, sample_rate: int,
+                  prompt: Optional[str] = None) -> str:
+        """Hash BLAKE2b del PCM y de todo lo que cambia el resultado"""
+        h = hashlib.blake2b(digest_size=16)
+        params = {
+            "service": self._identity,
+            "sample_rate": sample_rate,
+            "dtype": str(audio_data.dtype),
+            "prompt": prompt or "",
+        }
+        h.update(json.dumps(params, sort_keys=True).encode())
+        # Hash sobre la memoria del array: sin copia si ya es contiguo
+        h.update(memoryview(np.ascontiguousarray(audio_data)).cast("B"))
+        return h.hexdigest()
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _disk_get(self, key: str) -> Optional[str]:
+        path = self._disk_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                text = json.load(f)["text"]
+            os.utime(path)  # la fecha de modificación hace de orden LRU
+            return text
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _disk_put(self, key: str, text: str) -> None:
+        path = self._disk_path(key)
+        tmp = f"{path}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"text": text}, f, ensure_ascii=False)
+            os.replace(tmp, path)
+            self._evict_disk()
+        except OSError as e:
+            logger.warning(f"No se pudo guardar en la caché de disco: {e}")
+
+    def _evict_disk(self) -> None:
+        """Borra las entradas más antiguas hasta quedar bajo el límite"""
+        entries = []
+        total = 0
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".json"):
+                st = entry.stat()
+                entries.append((st.st_mtime, st.st_size, entry.path))
+                total += st.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+    def _memory_put(self, key: str, text: str) -> None:
+        with self._lock:
+            self._memory[key] = text
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def transcribe(self, audio_data: np.ndarray, sample_rate: int,
+                   prompt: Optional[str] = None) -> str:
+        """Devuelve el texto de la caché o lo transcribe y lo guarda."""
+        if audio_data is None:
+            return ""
+        key = self.cache_key(audio_data, sample_rate, prompt)
+
+        with self._lock:
+            text = self._memory.get(key)
+            if text is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+        if text is not None:
+            logger.debug("Transcripción servida desde la caché.")
+            return text
+
+        if self.cache_dir:
+            text = self._disk_get(key)
+            if text is not None:
+                self.disk_hits += 1
+                self._memory_put(key, text)
+                logger.debug("Transcripción servida desde la caché de disco.")
+                return text
+
+        self.misses += 1
+        text = self.inner.transcribe(audio_data, sample_rate, prompt=prompt)
+        # Los fallos ("") no se guardan para poder reintentar
+        if text:
+            self._memory_put(key, text)
+            if self.cache_dir:
+                self._disk_put(key, text)
+        return text
+
+    def stats(self) -> dict:
+        """Contadores de aciertos y fallos"""
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_ratio": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            "entries": len(self._memory),
+        }
@@ -0,0 +1,168 @@
+"""
+Transcripción en paralelo de grabaciones largas.
+
+El audio se divide en trozos de longitud acotada cortando en silencios,
+los trozos se transcriben a la vez y el texto se une en orden eliminando
+las palabras repetidas en los solapes (solo en los cortes forzados, que
+son los únicos que solapan).
+"""
+import logging
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+import telemetry
+from audio_buffer import to_int16
+from vad import VoiceActivityDetector
+from .interfaces import TranscriptionResult, TranscriptionService, transcription_failed
+
+logger = logging.getLogger(__name__)
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def split_at_silence(audio: np.ndarray, sample_rate: int, max_chunk_seconds: float,
+                     search_seconds: float = 10.0, overlap_seconds: float = 1.0,
+                     detector: Optional[VoiceActivityDetector] = None) -> List[Tuple[int, int]]:
+    """Devuelve los límites (inicio, fin) en muestras de cada trozo.
+
+    Cada corte se busca en los últimos ``search_seconds`` antes del máximo,
+    en la trama de menor energía. Si en esa ventana ninguna trama baja del
+    umbral de energía del detector se corta
+    en el máximo y el siguiente trozo empieza ``overlap_seconds`` antes
+    (como mucho la mitad del trozo, para que cada corte avance).
+    """
+    if max_chunk_seconds <= 0:
+        raise ValueError(f"max_chunk_seconds debe ser positivo: {max_chunk_seconds}")
+    detector = detector or VoiceActivityDetector(sample_rate)
+    frame = detector.frame_length
+    n_frames = len(audio) // frame
+    frames = to_int16(audio)[:n_frames * frame].reshape(n_frames, frame)
+    energy_db = detector.features(frames)[0] if n_frames else np.zeros(0)
+
+    max_len = int(max_chunk_seconds * sample_rate)
+    search = min(int(search_seconds * sample_rate), max_len // 2)
+    overlap = min(int(overlap_seconds * sample_rate), max_len // 2)
+    bounds = []
+    start = 0
+    while len(audio) - start > max_len:
+        lo = (start + max_len - search) // frame
+        hi = (start + max_len) // frame
+        window = energy_db[lo:hi]
+        quietest = int(np.argmin(window)) if len(window) else 0
+        cut = (lo + quietest) * frame + frame // 2
+        if len(window) and window[quietest] < detector.energy_threshold_db and cut > start:
+            bounds.append((start, cut))
+            next_start = cut
+        else:
+            cut = start + max_len
+            bounds.append((start, cut))
+            next_start = cut - overlap
+        assert next_start > start, "split_at_silence no avanza"
+        start = next_start
+    bounds.append((start, len(audio)))
+    return bounds
+
+
+def _normalize(words: List[str]) -> List[str]:
+    return [w.lower() for w in words]
+
+
+def merge_transcripts(texts: List[str], max_overlap_words: int = 8,
+                      overlapped: Optional[List[bool]] = None) -> str:
+    """Une textos consecutivos quitando las palabras duplicadas en la unión.
+
+    ``overlapped[i]`` indica si el audio del texto ``i + 1`` solapa con el
+    del anterior; en las uniones sin solape las repeticiones son legítimas
+    y se conservan. Sin ``overlapped`` se deduplican todas las uniones.
+    """
+    merged = ""
+    for i, text in enumerate(texts):
+        text = text.strip()
+        if not text:
+            continue
+        if not merged:
+            merged = text
+            continue
+        if overlapped is not None and not overlapped[i - 1]:
+            merged = f"{merged} {text}"
+            continue
+        prev_words = _normalize(_WORD_RE.findall(merged))
+        tokens = text.split()
+        next_words = _normalize(_WORD_RE.findall(" ".join(tokens[:max_overlap_words])))
+        overlap = 0
+        for k in range(min(len(prev_words), len(next_words)), 0, -1):
+            if prev_words[-k:] == next_words[:k]:
+                overlap = k
+                break
+        # Quitar tantos tokens como palabras repetidas (los tokens pueden
+        # llevar puntuación pegada)
+        skipped, removed = 0, 0
+        while removed < overlap and skipped < len(tokens):
+            removed += len(_WORD_RE.findall(tokens[skipped]))
+            skipped += 1
+        rest = " ".join(tokens[skipped:])
+        if rest:
+            merged = f"{merged} {rest}"
+    return merged
+
+
+class ChunkedTranscriptionService:
+    """Envuelve cualquier ``TranscriptionService`` para trocear audios largos."""
+
+    def __init__(self, inner: TranscriptionService, max_chunk_seconds: float = 120.0,
+                 max_workers: int = 4, overlap_seconds: float = 1.0,
+                 search_seconds: float = 10.0):
+        self.inner = inner
+        self.max_chunk_seconds = max_chunk_seconds
+        self.max_workers = max_workers
+        if overlap_seconds > max_chunk_seconds / 2:
+            logger.warning(f"CHUNK_OVERLAP_SECONDS={overlap_seconds:g} es demasiado para trozos de "
+                           f"{max_chunk_seconds:g} s; se usará {max_chunk_seconds / 2:g} s.")
+            overlap_seconds = max_chunk_seconds / 2
+        self.overlap_seconds = overlap_seconds
+        self.search_seconds = search_seconds
+
+    def __getattr__(self, name):
+        # Capacidades opcionales (open_stream, warm_up...) del servicio interno
+        return getattr(self.inner, name)
+
+    def transcribe(self, audio_data: np.ndarray, sample_rate: int,
+                   prompt: Optional[str] = None) -> str:
+        """Transcribe en paralelo si el audio supera ``max_chunk_seconds``."""
+        if audio_data is None or len(audio_data) <= self.max_chunk_seconds * sample_rate:
+            return self.inner.transcribe(audio_data, sample_rate, prompt=prompt)
+
+        bounds = split_at_silence(audio_data, sample_rate, self.max_chunk_seconds,
+                                  self.search_seconds, self.overlap_seconds)
+        logger.info(f"Audio de {len(audio_data) / sample_rate:.0f} s dividido en {len(bounds)} trozos "
+                    f"({self.max_workers} en paralelo).")
+        start_time = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="chunks") as pool:
+            futures = [
+                pool.submit(telemetry.propagate(self.inner.transcribe), audio_data[start:end], sample_rate,
+                            prompt=prompt if i == 0 else None)
+                for i, (start, end) in enumerate(bounds)
+            ]
+            texts = []
+            for i, future in enumerate(futures):
+                try:
+                    texts.append(future.result())
+                except Exception as e:
+                    logger.error(f"Error transcribiendo el trozo {i + 1}: {e}")
+                    texts.append("")
+
+        if any(transcription_failed(text) for text in texts):
+            # Un trozo perdido deja un hueco en el texto: mejor tratarlo como fallo.
+            # Un trozo sin voz (resultado vacío) no es un fallo y se une como ""
+            logger.warning("Falló la transcripción de algún trozo.")
+            return ""
+        # Solo solapan los cortes forzados: el trozo empieza antes del fin del anterior
+        overlapped = [start < prev_end for (_, prev_end), (start, _) in zip(bounds, bounds[1:])]
+        return TranscriptionResult(merge_transcripts(texts, overlapped=overlapped),
+                                   model=getattr(texts[0], "model", ""),
+                                   provider=getattr(texts[0], "provider", ""),
+                                   latency=time.perf_counter() - start_time)
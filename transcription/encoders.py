@@ -0,0 +1,126 @@
+"""
+Codificadores de audio para la subida a los proveedores de transcripción.
+"""
+from io import BytesIO
+import logging
+import struct
+from typing import Dict, Optional, Tuple, Type
+import numpy as np
+
+from .interfaces import AudioEncoder
+
+logger = logging.getLogger(__name__)
+
+
+def wav_header(sample_rate: int, data_size: int, channels: int = 1, bits: int = 16) -> bytes:
+    """Cabecera RIFF/WAVE PCM de 44 bytes para ``data_size`` bytes de muestras."""
+    byte_rate = sample_rate * channels * bits // 8
+    block_align = channels * bits // 8
+    return (
+        b"RIFF" + struct.pack("<I", (36 + data_size) & 0xFFFFFFFF) + b"WAVE"
+        + b"fmt " + struct.pack("<IHHIIHH", 16, 1, channels, sample_rate,
+                                byte_rate, block_align, bits)
+        + b"data" + struct.pack("<I", data_size & 0xFFFFFFFF)
+    )
+
+
+class WavEncoder:
+    """WAV PCM 16 bits sin compresión: coste de codificación casi nulo."""
+
+    name = "wav"
+    filename = "audio.wav"
+    content_type = "audio/wav"
+
+    def encode(self, audio_int16: np.ndarray, sample_rate: int) -> bytes:
+        # Cabecera + muestras con una sola copia, sin scipy
+        samples = np.ascontiguousarray(audio_int16, dtype="<i2")
+        return b"".join((wav_header(sample_rate, samples.nbytes), memoryview(samples).cast("B")))
+
+
+class _SoundFileEncoder:
+    """Base para los formatos que escribe libsndfile a través de soundfile."""
+
+    format = ""
+    subtype = ""
+    # Frecuencias que admite el códec; vacío si admite cualquiera
+    sample_rates: Tuple[int, ...] = ()
+
+    def __init__(self):
+        # Falla al crear el encoder (y no en plena dictación) si falta soundfile
+        # o si la libsndfile instalada no trae el códec
+        import soundfile
+        if not soundfile.check_format(self.format, self.subtype):
+            raise ValueError(f"libsndfile {soundfile.__libsndfile_version__} no soporta "
+                             f"{self.format}/{self.subtype}")
+        self._soundfile = soundfile
+
+    def target_rate(self, sample_rate: int) -> int:
+        """Frecuencia a la que se codifica: la original o la soportada más cercana por encima"""
+        if not self.sample_rates or sample_rate in self.sample_rates:
+            return sample_rate
+        higher = [rate for rate in self.sample_rates if rate > sample_rate]
+        return min(higher) if higher else max(self.sample_rates)
+
+    def encode(self, audio_int16: np.ndarray, sample_rate: int) -> bytes:
+        target = self.target_rate(sample_rate)
+        if target != sample_rate:
+            from scipy.signal import resample_poly
+            audio_int16 = np.clip(resample_poly(audio_int16.astype(np.float32), target, sample_rate),
+                                  -32768, 32767).astype(np.int16)
+            sample_rate = target
+        out = BytesIO()
+        self._soundfile.write(out, audio_int16, sample_rate,
+                              format=self.format, subtype=self.subtype)
+        return out.getvalue()
+
+
+class FlacEncoder(_SoundFileEncoder):
+    """FLAC sin pérdidas: ~50-60 % del tamaño del WAV para voz."""
+
+    name = "flac"
+    filename = "audio.flac"
+    content_type = "audio/flac"
+    format = "FLAC"
+    subtype = "PCM_16"
+
+
+class OpusEncoder(_SoundFileEncoder):
+    """Opus en contenedor Ogg: con pérdidas, ~10-20x más pequeño que el WAV."""
+
+    name = "opus"
+    filename = "audio.ogg"
+    content_type = "audio/ogg"
+    format = "OGG"
+    subtype = "OPUS"
+    sample_rates = (8000, 12000, 16000, 24000, 48000)
+
+
+ENCODERS: Dict[str, Type] = {
+    "wav": WavEncoder,
+    "flac": FlacEncoder,
+    "opus": OpusEncoder,
+}
+
+
+def get_encoder(name: str, sample_rate: Optional[int] = None) -> AudioEncoder:
+    """Crea el encoder por nombre; si no está disponible, vuelve a WAV.
+
+    Con ``sample_rate`` se codifica un fragmento de silencio a esa frecuencia
+    para descubrir al arrancar (y no en la primera dictación) un códec o una
+    frecuencia que libsndfile rechaza.
+    """
+    name = (name or "wav").lower()
+    encoder_cls = ENCODERS.get(name)
+    if encoder_cls is None:
+        logger.warning(f"Codificación de audio no soportada: {name}, usando wav")
+        return WavEncoder()
+    try:
+        encoder = encoder_cls()
+        if sample_rate:
+            encoder.encode(np.zeros(sample_rate // 10, dtype=np.int16), sample_rate)
+    except Exception as e:
+        # ImportError/OSError si falta soundfile o libsndfile, LibsndfileError
+        # si rechaza la frecuencia o el códec
+        logger.warning(f"No se pudo usar la codificación {name} ({e}), usando wav")
+        return WavEncoder()
+    return encoder
@@ -1,28 +1,134 @@
 """
 Factory y gestor Singleton para servicios de transcripción.
 """
-from typing import Dict, Any, Optional
-from .services import GroqTranscriptionService
+from typing import Dict, Any, Optional, TYPE_CHECKING
 from .interfaces import TranscriptionService
 
+if TYPE_CHECKING:
+    from .scheduler import RequestScheduler
+    from .ingest import AudioIngestor
+
 import os 
 
 _transcription_instance: Optional[TranscriptionService] = None
 
+def create_scheduler() -> "RequestScheduler":
+    """Planificador de peticiones con los límites RATE_LIMIT_* del entorno."""
+    from .scheduler import RequestScheduler
+    burst = os.getenv("RATE_LIMIT_BURST")
+    return RequestScheduler(
+        requests_per_minute=float(os.getenv("RATE_LIMIT_RPM", "0")),
+        burst=float(burst) if burst else None,
+        max_concurrency=int(os.getenv("RATE_LIMIT_MAX_CONCURRENCY", "4")),
+        max_retries=int(os.getenv("RATE_LIMIT_MAX_RETRIES", "4")),
+    )
+
+def create_ingestor() -> Optional["AudioIngestor"]:
+    """Cola de audio recibido por el socket (INGEST_*), o None si está desactivada."""
+    if os.getenv("INGEST_ENABLED", "1").lower() not in ("1", "true", "yes"):
+        return None
+    from .ingest import AudioIngestor
+    return AudioIngestor(
+        workers=int(os.getenv("INGEST_WORKERS", "2")),
+        queue_size=int(os.getenv("INGEST_QUEUE", "4")),
+        max_bytes=int(float(os.getenv("INGEST_MAX_MB", "50")) * 1024 * 1024),
+        spill_bytes=int(float(os.getenv("INGEST_SPILL_MB", "4")) * 1024 * 1024),
+    )
+
+def create_provider(provider: str) -> TranscriptionService:
+    """Crea el servicio de un proveedor concreto a partir del entorno."""
+    # Los proveedores se importan al crearlos (requests, numpy, multiprocessing)
+    if provider == "local":
+        from .local import LocalTranscriptionService
+        # Sin red: el modelo se carga una vez en un proceso aparte
+        return LocalTranscriptionService(
+            engine=os.getenv("LOCAL_ENGINE", "faster-whisper"),
+            model_name=os.getenv("LOCAL_MODEL", "base"),
+            max_jobs=int(os.getenv("LOCAL_MAX_JOBS", "2")),
+            timeout=float(os.getenv("LOCAL_TIMEOUT", "300")),
+        )
+    from .services import (GroqTranscriptionService, OpenAITranscriptionService,
+                           GROQ_API_URL, OPENAI_API_URL, create_http_session)
+    from .encoders import get_encoder
+    common = dict(
+        encoder=get_encoder(os.getenv("AUDIO_ENCODING", "wav"),
+                            sample_rate=int(os.getenv("SAMPLE_RATE", "16000"))),
+        connect_timeout=float(os.getenv("GROQ_CONNECT_TIMEOUT", "5")),
+        read_timeout=float(os.getenv("GROQ_READ_TIMEOUT", "60")),
+        scheduler=create_scheduler(),
+    )
+    if provider == "groq" and os.getenv("MODEL_ROUTES"):
+        # MODEL_ROUTES="3:whisper-large-v3-turbo,inf:whisper-large-v3"
+        from .routing import ModelRoutingService, parse_routes
+        session = create_http_session()
+        routes = [
+            (max_seconds, model, GroqTranscriptionService(
+                api_key=os.getenv("GROQ_API_KEY", ""),
+                model_name=model,
+                api_url=os.getenv("GROQ_API_URL", GROQ_API_URL),
+                session=session,
+                **common
+            ))
+            for max_seconds, model in parse_routes(os.getenv("MODEL_ROUTES"))
+        ]
+        budget_ms = os.getenv("ROUTING_LATENCY_BUDGET_MS")
+        return ModelRoutingService(routes, latency_budget=float(budget_ms) / 1000 if budget_ms else None)
+    if provider == "groq":
+        return GroqTranscriptionService(
+            api_key=os.getenv("GROQ_API_KEY", ""),
+            model_name=os.getenv("MODEL_NAME", ""),
+            api_url=os.getenv("GROQ_API_URL", GROQ_API_URL),
+            **common
+        )
+    if provider == "openai":
+        return OpenAITranscriptionService(
+            api_key=os.getenv("OPENAI_API_KEY", ""),
+            model_name=os.getenv("OPENAI_MODEL_NAME", "whisper-1"),
+            api_url=os.getenv("OPENAI_API_URL", OPENAI_API_URL),
+            **common
+        )
+    raise ValueError(f"Proveedor no soportado: {provider}")
+
 def setup_transcription(config: Dict[str, Any]) -> TranscriptionService:
     """Crea o devuelve la instancia singleton del servicio."""
     global _transcription_instance
     
     if _transcription_instance is None:
-        provider = config.get("provider", "groq")
-        
-        if provider == "groq":
-            _transcription_instance = GroqTranscriptionService(
-                api_key=os.getenv("GROQ_API_KEY", ""),
-                model_name=os.getenv("MODEL_NAME", "")
-            )
+        # TRANSCRIPTION_PROVIDERS="groq,openai": lista ordenada con failover
+        providers = [p.strip() for p in os.getenv("TRANSCRIPTION_PROVIDERS", "").split(",") if p.strip()]
+        if not providers:
+            providers = [config.get("provider", "groq")]
+
+        if len(providers) == 1:
+            _transcription_instance = create_provider(providers[0])
         else:
-            raise ValueError(f"Proveedor no soportado: {provider}")
+            from .failover import HedgedTranscriptionService
+            hedge_ms = os.getenv("HEDGE_DELAY_MS")
+            _transcription_instance = HedgedTranscriptionService(
+                [(name, create_provider(name)) for name in providers],
+                hedge_delay=float(hedge_ms) / 1000 if hedge_ms else None,
+                default_hedge_delay=float(os.getenv("HEDGE_DEFAULT_MS", "3000")) / 1000,
+            )
+
+        # Grabaciones largas: trozos en paralelo cortados en silencios
+        if os.getenv("CHUNKED_TRANSCRIPTION", "0").lower() in ("1", "true", "yes"):
+            from .chunked import ChunkedTranscriptionService
+            _transcription_instance = ChunkedTranscriptionService(
+                _transcription_instance,
+                max_chunk_seconds=float(os.getenv("CHUNK_MAX_SECONDS", "120")),
+                max_workers=int(os.getenv("CHUNK_CONCURRENCY", "4")),
+                overlap_seconds=float(os.getenv("CHUNK_OVERLAP_SECONDS", "1")),
+            )
+
+        # Mismo audio, mismo modelo y parámetros: respuesta sin ir a la red
+        if os.getenv("TRANSCRIPTION_CACHE", "0").lower() in ("1", "true", "yes"):
+            from .cache import CachedTranscriptionService
+            _transcription_instance = CachedTranscriptionService(
+                _transcription_instance,
+                max_entries=int(os.getenv("CACHE_MAX_ENTRIES", "128")),
+                cache_dir=os.getenv("CACHE_DIR") or None,
+                max_disk_bytes=int(float(os.getenv("CACHE_MAX_MB", "50")) * 1024 * 1024),
+            )
     
     return _transcription_instance
 
@@ -0,0 +1,137 @@
+"""
+Servicio compuesto con peticiones "hedged" y failover entre proveedores.
+
+Se lanza la petición al proveedor principal y, si no responde dentro de su
+presupuesto de latencia (su p95 observado), se lanza otra al siguiente; gana
+la primera respuesta válida. Si un proveedor falla, se pasa al siguiente
+sin esperar.
+"""
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+import telemetry
+from .interfaces import TranscriptionService, transcription_failed
+from .latency import LatencyTracker
+
+logger = logging.getLogger(__name__)
+
+
+class HedgedTranscriptionService:
+    """Compone varios ``TranscriptionService`` en orden de preferencia."""
+
+    def __init__(self, providers: List[Tuple[str, TranscriptionService]],
+                 hedge_delay: Optional[float] = None, default_hedge_delay: float = 3.0,
+                 min_samples: int = 5, hedge_percentile: float = 95):
+        if not providers:
+            raise ValueError("Se necesita al menos un proveedor")
+        self.providers = providers
+        self.hedge_delay = hedge_delay
+        self.default_hedge_delay = default_hedge_delay
+        self.min_samples = min_samples
+        self.hedge_percentile = hedge_percentile
+        self.latency: Dict[str, LatencyTracker] = {name: LatencyTracker() for name, _ in providers}
+        self.hedges = 0
+        self.wins: Dict[str, int] = {name: 0 for name, _ in providers}
+        # Los perdedores siguen ocupando un hilo hasta que su petición termina
+        self._executor = ThreadPoolExecutor(max_workers=4 * len(providers),
+                                            thread_name_prefix="hedged")
+
+    def __getattr__(self, name):
+        # Capacidades opcionales del proveedor preferido
+        return getattr(self.providers[0][1], name)
+
+    def warm_up(self) -> None:
+        """Precalienta las conexiones de todos los proveedores"""
+        for _, service in self.providers:
+            if hasattr(service, "warm_up"):
+                service.warm_up()
+
+    def ordered_providers(self) -> List[Tuple[str, TranscriptionService]]:
+        """Proveedores ordenados por latencia observada (p50) y fallos.
+
+        Hasta tener ``min_samples`` muestras de todos se respeta el orden
+        configurado.
+        """
+        if any(self.latency[name].count < self.min_samples for name, _ in self.providers):
+            return list(self.providers)
+
+        def score(item):
+            tracker = self.latency[item[0]]
+            return (tracker.failure_rate > 0.5, tracker.percentile(50))
+        return sorted(self.providers, key=score)
+
+    def _budget(self, name: str) -> float:
+        if self.hedge_delay is not None:
+            return self.hedge_delay
+        tracker = self.latency[name]
+        if tracker.count < self.min_samples:
+            return self.default_hedge_delay
+        return tracker.percentile(self.hedge_percentile)
+
+    def _call(self, name, service, audio_data, sample_rate, prompt):
+        start = time.perf_counter()
+        try:
+            text = service.transcribe(audio_data, sample_rate, prompt=prompt)
+        except Exception as e:
+            logger.error(f"Error en el proveedor {name}: {e}")
+            text = ""
+        self.latency[name].record(time.perf_counter() - start, success=not transcription_failed(text))
+        return text
+
+    def transcribe(self, audio_data: np.ndarray, sample_rate: int,
+                   prompt: Optional[str] = None) -> str:
+        """Devuelve la primera transcripción válida de los proveedores."""
+        order = self.ordered_providers()
+        pending = {}
+        next_index = 0
+
+        def launch():
+            nonlocal next_index
+            name, service = order[next_index]
+            next_index += 1
+            # Los tramos de la petición van a la traza de quien llama
+            future = self._executor.submit(telemetry.propagate(self._call), name, service,
+                                           audio_data, sample_rate, prompt)
+            pending[future] = name
+            return name
+
+        last_launched = launch()
+        while pending:
+            timeout = self._budget(last_launched) if next_index < len(order) else None
+            done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                # El proveedor no respondió a tiempo: petición de cobertura
+                self.hedges += 1
+                logger.warning(f"{last_launched} no respondió en {timeout:.2f} s, "
+                               f"lanzando petición a {order[next_index][0]}...")
+                last_launched = launch()
+                continue
+            for future in done:
+                name = pending.pop(future)
+                text = future.result()
+                # Un resultado vacío (audio sin voz) también es una respuesta válida
+                if not transcription_failed(text):
+                    for loser in pending:
+                        # Solo se cancela lo que no ha empezado; el resto se ignora
+                        loser.cancel()
+                    self.wins[name] += 1
+                    logger.debug(f"Transcripción obtenida de {name}.")
+                    return text
+            if next_index < len(order):
+                # Fallo: pasar al siguiente proveedor sin esperar
+                last_launched = launch()
+        return ""
+
+    def stats(self) -> dict:
+        """Latencias, victorias y peticiones de cobertura por proveedor"""
+        return {
+            "hedges": self.hedges,
+            "providers": {
+                name: dict(self.latency[name].summary(), wins=self.wins[name])
+                for name, _ in self.providers
+            },
+        }
@@ -0,0 +1,147 @@
+"""
+Transcripción de audio enviado por otros programas a través del socket.
+
+Un cliente manda la orden TRANSCRIBE con el formato y la frecuencia de
+muestreo, recibe ``accepted`` (o ``busy`` si la cola está llena) y envía el
+audio en frames. El audio pasa por el mismo transcriptor que los dictados
+(conexión ya abierta, caché, failover...) sin tocar el micrófono, la
+burbuja ni la ventana activa, y el texto vuelve por la misma conexión.
+
+El audio de los trabajos en cola se guarda en un ``SpooledTemporaryFile``:
+en memoria hasta ``spill_bytes`` y en disco a partir de ahí, de modo que
+la memoria no crece con la longitud de la cola.
+"""
+import io
+import logging
+import tempfile
+import threading
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Callable, Optional
+
+import numpy as np
+
+from audio_buffer import to_int16
+from .factory import get_transcriber
+from .interfaces import TranscriptionService, transcription_failed
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ("pcm_s16le", "pcm_f32le", "wav")
+MAX_CHANNELS = 8
+
+
+def validate_request(request: dict) -> dict:
+    """Comprueba la cabecera de TRANSCRIBE y devuelve sus campos normalizados"""
+    audio_format = request.get("format", "pcm_s16le")
+    if not isinstance(audio_format, str) or audio_format.lower() not in FORMATS:
+        raise ValueError(f"formato no soportado: {audio_format!r}")
+    audio_format = audio_format.lower()
+    sample_rate = request.get("sample_rate")
+    if sample_rate is not None and (type(sample_rate) is not int or sample_rate <= 0):
+        raise ValueError(f"sample_rate debe ser un entero positivo, no {sample_rate!r}")
+    if sample_rate is None and audio_format != "wav":
+        raise ValueError("falta sample_rate")
+    channels = request.get("channels", 1)
+    if type(channels) is not int or not 1 <= channels <= MAX_CHANNELS:
+        raise ValueError(f"channels debe ser un entero entre 1 y {MAX_CHANNELS}, no {channels!r}")
+    return {"format": audio_format, "sample_rate": sample_rate, "channels": channels}
+
+
+def decode_payload(payload: bytes, audio_format: str, sample_rate: Optional[int],
+                   channels: int = 1):
+    """Convierte el audio recibido en int16 mono; devuelve (muestras, frecuencia)"""
+    if audio_format == "wav":
+        with wave.open(io.BytesIO(payload), "rb") as f:
+            if f.getsampwidth() != 2:
+                raise ValueError("solo se admiten WAV PCM de 16 bits")
+            channels, sample_rate = f.getnchannels(), f.getframerate()
+            payload = f.readframes(f.getnframes())
+        audio_format = "pcm_s16le"
+    if audio_format not in FORMATS:
+        raise ValueError(f"formato no soportado: {audio_format}")
+    if not sample_rate or sample_rate <= 0:
+        raise ValueError("falta sample_rate")
+    dtype = "<i2" if audio_format == "pcm_s16le" else "<f4"
+    usable = len(payload) - len(payload) % (np.dtype(dtype).itemsize * channels)
+    samples = np.frombuffer(payload, dtype=dtype, count=usable // np.dtype(dtype).itemsize)
+    samples = samples.reshape(-1, channels) if channels > 1 else samples
+    return to_int16(samples), int(sample_rate)
+
+
+class AudioIngestor:
+    """Cola acotada de transcripciones pedidas por el socket.
+
+    ``workers`` trabajos se transcriben a la vez y hasta ``queue_size`` más
+    esperan; con todo ocupado ``reserve()`` devuelve False y el cliente
+    recibe ``busy`` antes de enviar el audio. Cada subida se limita a
+    ``max_bytes`` y pasa a disco a partir de ``spill_bytes``.
+    """
+
+    def __init__(self, workers: int = 2, queue_size: int = 4, max_bytes: int = 50 * 1024 * 1024,
+                 spill_bytes: int = 4 * 1024 * 1024,
+                 transcriber: Callable[[], TranscriptionService] = get_transcriber):
+        self.max_jobs = workers + queue_size
+        self.max_bytes = max_bytes
+        self.spill_bytes = spill_bytes
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ingest")
+        self._transcriber = transcriber
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def reserve(self) -> bool:
+        """Reserva un hueco en la cola; False si está llena"""
+        with self._lock:
+            if self._pending >= self.max_jobs:
+                return False
+            self._pending += 1
+            return True
+
+    def release(self) -> None:
+        with self._lock:
+            self._pending -= 1
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def upload_buffer(self) -> BinaryIO:
+        """Fichero donde el servidor va escribiendo el audio recibido"""
+        return tempfile.SpooledTemporaryFile(max_size=self.spill_bytes, prefix="air-type-ingest-")
+
+    def transcribe(self, upload: BinaryIO, request: dict) -> dict:
+        """Decodifica y transcribe un trabajo; se ejecuta en ``executor``.
+
+        ``request`` son los campos de ``validate_request``; ``upload`` se cierra.
+        """
+        with upload:
+            upload.seek(0)
+            payload = upload.read()
+        try:
+            audio, sample_rate = decode_payload(
+                payload, request["format"], request["sample_rate"], request["channels"])
+        except (ValueError, wave.Error, EOFError) as e:
+            return {"ok": False, "error": f"audio no válido: {e}"}
+        if not len(audio):
+            return {"ok": False, "error": "audio vacío"}
+        seconds = len(audio) / sample_rate
+        start = time.perf_counter()
+        try:
+            text = self._transcriber().transcribe(audio, sample_rate)
+        except Exception as e:
+            logger.error(f"Error transcribiendo audio del socket: {e}")
+            return {"ok": False, "error": str(e)}
+        latency = time.perf_counter() - start
+        logger.info(f"Audio del socket transcrito ({seconds:.1f} s en {latency:.2f} s)")
+        # Un resultado vacío (audio sin voz) es una respuesta válida: ok con ""
+        if transcription_failed(text):
+            return {"ok": False, "error": "no se pudo transcribir el audio", "seconds": round(seconds, 3)}
+        return {
+            "ok": True,
+            "text": str(text),
+            "model": getattr(text, "model", ""),
+            "provider": getattr(text, "provider", ""),
+            "seconds": round(seconds, 3),
+            "latency": round(latency, 3),
+        }
@@ -1,13 +1,52 @@
 """
 Definición de interfaces para servicios de transcripción.
 """
-from typing import Protocol, runtime_checkable
+from typing import Optional, Protocol, runtime_checkable
 import numpy as np
 
+class TranscriptionResult(str):
+    """Texto transcrito con metadatos; se comporta como un ``str`` normal."""
+
+    def __new__(cls, text: str, model: str = "", provider: str = "",
+                latency: Optional[float] = None):
+        result = super().__new__(cls, text)
+        result.model = model
+        result.provider = provider
+        result.latency = latency
+        return result
+
+
+def transcription_failed(text: Optional[str]) -> bool:
+    """True si el servicio falló: None o ``""`` plano.
+
+    Una respuesta del proveedor llega siempre como ``TranscriptionResult``,
+    aunque esté vacía (audio sin voz); esa no es un fallo y no se reintenta.
+    """
+    return text is None or (not text and not isinstance(text, TranscriptionResult))
+
+
 @runtime_checkable
 class TranscriptionService(Protocol):
     """Interfaz base para servicios de transcripción."""
 
-    def transcribe(self, audio_data: np.ndarray, sample_rate: int) -> str:
-        """Transcribe audio a texto."""
-        ...
\ No newline at end of file
+    def transcribe(self, audio_data: np.ndarray, sample_rate: int,
+                   prompt: Optional[str] = None) -> str:
+        """Transcribe audio a texto.
+
+        ``audio_data`` es mono, en int16 o en float32 normalizado a [-1, 1].
+        ``prompt`` es texto de contexto opcional (p. ej. la transcripción del
+        segmento anterior) para mantener la continuidad entre segmentos.
+        """
+        ...
+
+@runtime_checkable
+class AudioEncoder(Protocol):
+    """Interfaz para codificar audio antes de subirlo al proveedor."""
+
+    name: str
+    filename: str
+    content_type: str
+
+    def encode(self, audio_int16: np.ndarray, sample_rate: int) -> bytes:
+        """Codifica audio mono int16 y devuelve los bytes del fichero."""
+        ...
@@ -0,0 +1,49 @@
+"""
+Estadísticas de latencia móviles por proveedor o modelo.
+"""
+import threading
+from collections import deque
+from typing import Optional
+
+import numpy as np
+
+
+class LatencyTracker:
+    """Ventana deslizante de latencias con percentiles y tasa de fallos."""
+
+    def __init__(self, window: int = 50):
+        self._samples = deque(maxlen=window)
+        self._outcomes = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float, success: bool = True) -> None:
+        with self._lock:
+            if success:
+                self._samples.append(seconds)
+            self._outcomes.append(success)
+
+    @property
+    def count(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, p: float) -> Optional[float]:
+        """Percentil ``p`` (0-100) de las latencias con éxito, o None"""
+        with self._lock:
+            if not self._samples:
+                return None
+            return float(np.percentile(np.fromiter(self._samples, dtype=float), p))
+
+    @property
+    def failure_rate(self) -> float:
+        with self._lock:
+            if not self._outcomes:
+                return 0.0
+            return 1.0 - sum(self._outcomes) / len(self._outcomes)
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "failure_rate": self.failure_rate,
+        }
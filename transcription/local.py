@@ -0,0 +1,285 @@
+"""
+Transcripción local en CPU con un proceso trabajador que mantiene el modelo
+cargado.
+
+El modelo se carga una sola vez al arrancar el demonio. El audio viaja al
+trabajador por memoria compartida (sin serializar arrays) y solo se envían
+por la cola el nombre del bloque, la longitud y los parámetros. Funciona
+sin conexión; el motor ``stub`` sirve para pruebas sin modelo.
+
+El motor ``faster-whisper`` es una dependencia opcional:
+``pip install -r requirements-local.txt``.
+"""
+import inspect
+import itertools
+import logging
+import multiprocessing as mp
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, Optional
+
+import numpy as np
+
+from .interfaces import TranscriptionResult
+
+logger = logging.getLogger(__name__)
+
+MODEL_SAMPLE_RATE = 16000
+
+# Cada cuánto comprueba el repartidor si el trabajador sigue vivo
+_WORKER_POLL_SECONDS = 0.5
+
+# Python 3.13+: abrir un bloque sin registrarlo en el resource tracker
+_SHM_TRACK_PARAM = "track" in inspect.signature(shared_memory.SharedMemory).parameters
+
+
+class StubEngine:
+    """Motor de prueba: no carga nada y describe el audio recibido."""
+
+    def __init__(self, model_name: str, max_jobs: int):
+        self.model_name = model_name
+
+    def transcribe(self, audio: np.ndarray, prompt: Optional[str] = None) -> str:
+        rms = float(np.sqrt(np.mean(audio * audio))) if len(audio) else 0.0
+        return f"[stub {len(audio) / MODEL_SAMPLE_RATE:.2f} s rms={rms:.3f}]"
+
+
+class FasterWhisperEngine:
+    """Whisper en CPU con CTranslate2 (paquete ``faster-whisper``)."""
+
+    def __init__(self, model_name: str, max_jobs: int):
+        from faster_whisper import WhisperModel
+        self.model = WhisperModel(model_name, device="cpu", compute_type="int8",
+                                  num_workers=max_jobs)
+
+    def transcribe(self, audio: np.ndarray, prompt: Optional[str] = None) -> str:
+        segments, _ = self.model.transcribe(audio, initial_prompt=prompt, beam_size=1)
+        return " ".join(segment.text.strip() for segment in segments).strip()
+
+
+ENGINES = {
+    "stub": StubEngine,
+    "faster-whisper": FasterWhisperEngine,
+}
+
+
+def _to_model_input(samples: np.ndarray, sample_rate: int) -> np.ndarray:
+    """int16 a float32 en [-1, 1] y remuestreo a 16 kHz si hace falta"""
+    audio = samples.astype(np.float32) / 32768.0
+    if sample_rate != MODEL_SAMPLE_RATE:
+        from scipy.signal import resample_poly
+        audio = resample_poly(audio, MODEL_SAMPLE_RATE, sample_rate).astype(np.float32)
+    return audio
+
+
+def _untrack_shared_memory() -> None:
+    """En el trabajador, no registrar los bloques que abre.
+
+    Los bloques los crea y los borra el padre. Antes de Python 3.13, abrir
+    uno existente también lo registra en el resource tracker, que avisa
+    de fugas o lo borra antes de tiempo; quitar el registro después
+    tampoco sirve, porque el tracker es compartido y el ``unlink`` del
+    padre fallaría. El trabajador nunca crea bloques, así que basta con
+    no registrar ninguno.
+    """
+    if _SHM_TRACK_PARAM:
+        return
+    from multiprocessing import resource_tracker
+    register = resource_tracker.register
+
+    def register_except_shared_memory(name, rtype):
+        if rtype != "shared_memory":
+            register(name, rtype)
+
+    resource_tracker.register = register_except_shared_memory
+
+
+def _attach_shared_memory(name: str) -> shared_memory.SharedMemory:
+    if _SHM_TRACK_PARAM:
+        return shared_memory.SharedMemory(name=name, track=False)
+    return shared_memory.SharedMemory(name=name)
+
+
+def _worker_main(engine_name, model_name, max_jobs, requests, results):
+    """Bucle del proceso trabajador: carga el modelo y atiende trabajos"""
+    _untrack_shared_memory()
+    try:
+        engine = ENGINES[engine_name](model_name, max_jobs)
+    except Exception as e:
+        results.put(("ready", None, f"{type(e).__name__}: {e}"))
+        return
+    results.put(("ready", None, None))
+
+    def run(job_id, shm_name, n_samples, sample_rate, prompt):
+        try:
+            shm = _attach_shared_memory(shm_name)
+            try:
+                samples = np.ndarray((n_samples,), dtype=np.int16, buffer=shm.buf)
+                # La conversión a float copia: después ya se puede soltar el bloque
+                audio = _to_model_input(samples, sample_rate)
+                del samples
+            finally:
+                shm.close()
+            results.put((job_id, engine.transcribe(audio, prompt), None))
+        except Exception as e:
+            results.put((job_id, None, f"{type(e).__name__}: {e}"))
+
+    with ThreadPoolExecutor(max_workers=max_jobs) as pool:
+        while True:
+            message = requests.get()
+            if message is None:
+                break
+            pool.submit(run, *message)
+
+
+class LocalTranscriptionService:
+    """``TranscriptionService`` que delega en un proceso con el modelo residente."""
+
+    provider_name = "Local"
+
+    def __init__(self, engine: str = "faster-whisper", model_name: str = "base",
+                 max_jobs: int = 2, timeout: float = 300.0):
+        if engine not in ENGINES:
+            raise ValueError(f"Motor local no soportado: {engine}")
+        self.engine = engine
+        self.model_name = model_name
+        self.timeout = timeout
+        self.max_jobs = max_jobs
+        # Trabajos simultáneos acotados: el resto espera aquí, no en el trabajador
+        self._slots = threading.BoundedSemaphore(max_jobs)
+        self._pending: Dict[int, Future] = {}
+        self._pending_lock = threading.Lock()
+        self._worker_lock = threading.Lock()
+        self._ids = itertools.count()
+        self._closing = False
+        self._start_worker()
+        logger.info(f"Cargando modelo local {engine}/{model_name} en segundo plano...")
+
+    def _start_worker(self) -> None:
+        """Lanza el proceso trabajador con colas nuevas y su repartidor.
+
+        Las colas no se reutilizan: un proceso que muere a mitad de un
+        ``put`` puede dejarlas bloqueadas.
+        """
+        ctx = mp.get_context("spawn")
+        ready = threading.Event()
+        self._ready = ready
+        self._load_error: Optional[str] = None
+        self._worker_error: Optional[str] = None
+        self._requests = ctx.Queue()
+        results = ctx.Queue()
+        self._process = ctx.Process(
+            target=_worker_main,
+            args=(self.engine, self.model_name, self.max_jobs, self._requests, results),
+            daemon=True,
+            name="local-transcription",
+        )
+        self._process.start()
+        self._dispatcher = threading.Thread(target=self._dispatch, args=(self._process, results, ready),
+                                            daemon=True)
+        self._dispatcher.start()
+
+    def _dispatch(self, process, results, ready: threading.Event) -> None:
+        """Reparte los resultados del trabajador a quien los espera"""
+        while True:
+            try:
+                job_id, text, error = results.get(timeout=_WORKER_POLL_SECONDS)
+            except queue.Empty:
+                if process.is_alive():
+                    continue
+                self._worker_died(process, ready)
+                break
+            except (EOFError, OSError):
+                break
+            if job_id == "ready":
+                self._load_error = error
+                ready.set()
+                if error:
+                    logger.warning(f"No se pudo cargar el modelo local: {error}")
+                else:
+                    logger.info(f"Modelo local {self.model_name} cargado.")
+                continue
+            with self._pending_lock:
+                future = self._pending.pop(job_id, None)
+            if future is None:
+                continue
+            if error:
+                future.set_exception(RuntimeError(error))
+            else:
+                future.set_result(text)
+
+    def _worker_died(self, process, ready: threading.Event) -> None:
+        """El trabajador terminó: falla lo pendiente en vez de esperar al timeout"""
+        error = f"el proceso trabajador terminó (código {process.exitcode})"
+        if not self._closing:
+            logger.error(f"Transcripción local: {error}.")
+        if not ready.is_set():
+            # Murió cargando el modelo: quien espera en wait_ready sale ya
+            self._load_error = error
+            ready.set()
+        with self._pending_lock:
+            pending = list(self._pending.values())
+            self._pending.clear()
+            self._worker_error = error
+        for future in pending:
+            future.set_exception(RuntimeError(error))
+
+    def _ensure_worker(self) -> None:
+        """Relanza el trabajador si murió después de cargar el modelo.
+
+        Si murió durante la carga no se relanza (volvería a fallar) y el
+        servicio queda marcado como no disponible.
+        """
+        with self._worker_lock:
+            if self._worker_error is None or self._load_error is not None or self._closing:
+                return
+            logger.warning(f"Relanzando el trabajador local ({self._worker_error})...")
+            self._start_worker()
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        """Espera a que el modelo esté cargado; False si falló, no llegó o el trabajador murió"""
+        return self._ready.wait(timeout) and self._load_error is None and self._worker_error is None
+
+    def transcribe(self, audio_data: np.ndarray, sample_rate: int,
+                   prompt: Optional[str] = None) -> str:
+        """Transcribe en el proceso trabajador pasando el audio por memoria compartida."""
+        if audio_data is None or len(audio_data) == 0:
+            return ""
+        self._ensure_worker()
+        if not self.wait_ready(self.timeout):
+            logger.warning("El modelo local no está disponible.")
+            return ""
+        if audio_data.dtype != np.int16:
+            audio_data = (np.clip(audio_data, -1.0, 1.0) * 32767).astype(np.int16)
+
+        with self._slots:
+            shm = shared_memory.SharedMemory(create=True, size=audio_data.nbytes)
+            job_id = next(self._ids)
+            try:
+                np.ndarray(audio_data.shape, dtype=np.int16, buffer=shm.buf)[:] = audio_data
+                future: Future = Future()
+                with self._pending_lock:
+                    if self._worker_error is not None:
+                        raise RuntimeError(self._worker_error)
+                    self._pending[job_id] = future
+                self._requests.put((job_id, shm.name, len(audio_data), sample_rate, prompt))
+                text = future.result(timeout=self.timeout)
+            except Exception as e:
+                with self._pending_lock:
+                    self._pending.pop(job_id, None)
+                logger.error(f"Error en la transcripción local: {e}")
+                return ""
+            finally:
+                shm.close()
+                shm.unlink()
+        return TranscriptionResult(text, model=self.model_name, provider=self.provider_name)
+
+    def close(self) -> None:
+        """Detiene el proceso trabajador"""
+        self._closing = True
+        self._requests.put(None)
+        self._process.join(timeout=5)
+        if self._process.is_alive():
+            self._process.terminate()
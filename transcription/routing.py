@@ -0,0 +1,101 @@
+"""
+Enrutado de modelos según la duración del clip y la latencia observada.
+
+Los comandos cortos van a un modelo pequeño/turbo que responde antes y los
+dictados largos al modelo grande, que transcribe mejor.
+"""
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .interfaces import TranscriptionResult, TranscriptionService
+from .latency import LatencyTracker
+
+logger = logging.getLogger(__name__)
+
+
+def parse_routes(spec: str) -> List[Tuple[float, str]]:
+    """Convierte "3:whisper-large-v3-turbo,inf:whisper-large-v3" en rutas.
+
+    Cada ruta es (duración máxima en segundos, modelo), ordenadas por duración.
+    """
+    routes = []
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        max_seconds, _, model = item.partition(":")
+        if not model:
+            raise ValueError(f"Ruta de modelo inválida: {item!r} (formato segundos:modelo)")
+        routes.append((float(max_seconds), model.strip()))
+    return sorted(routes, key=lambda route: route[0])
+
+
+class ModelRoutingService:
+    """Elige el modelo de cada petición entre varios servicios."""
+
+    def __init__(self, routes: List[Tuple[float, str, TranscriptionService]],
+                 latency_budget: Optional[float] = None, min_samples: int = 5):
+        if not routes:
+            raise ValueError("Se necesita al menos una ruta de modelo")
+        self.routes = sorted(routes, key=lambda route: route[0])
+        self.latency_budget = latency_budget
+        self.min_samples = min_samples
+        self.latency: Dict[str, LatencyTracker] = {model: LatencyTracker() for _, model, _ in self.routes}
+        self.last_model: Optional[str] = None
+
+    def __getattr__(self, name):
+        return getattr(self.routes[-1][2], name)
+
+    def warm_up(self) -> None:
+        # Los servicios comparten sesión HTTP: basta con uno
+        service = self.routes[0][2]
+        if hasattr(service, "warm_up"):
+            service.warm_up()
+
+    def choose(self, duration: float) -> Tuple[str, TranscriptionService]:
+        """Modelo para un clip de ``duration`` segundos.
+
+        Se usa la ruta cuya duración máxima cubre el clip; si con un
+        presupuesto de latencia configurado su p95 lo supera, se cambia al
+        modelo observado más rápido que sí lo cumpla.
+        """
+        chosen = next((r for r in self.routes if duration <= r[0]), self.routes[-1])
+        _, model, service = chosen
+        if self.latency_budget is None:
+            return model, service
+        tracker = self.latency[model]
+        if tracker.count < self.min_samples or tracker.percentile(95) <= self.latency_budget:
+            return model, service
+        candidates = [
+            (self.latency[m].percentile(95), m, s) for _, m, s in self.routes
+            if self.latency[m].count >= self.min_samples
+            and self.latency[m].percentile(95) <= self.latency_budget
+        ]
+        if candidates:
+            _, model, service = min(candidates, key=lambda c: c[0])
+        return model, service
+
+    def transcribe(self, audio_data: np.ndarray, sample_rate: int,
+                   prompt: Optional[str] = None) -> str:
+        """Transcribe con el modelo elegido y lo devuelve en el resultado."""
+        if audio_data is None:
+            return ""
+        duration = len(audio_data) / sample_rate
+        model, service = self.choose(duration)
+        self.last_model = model
+        logger.debug(f"Clip de {duration:.1f} s -> modelo {model}")
+        start = time.perf_counter()
+        text = service.transcribe(audio_data, sample_rate, prompt=prompt)
+        elapsed = time.perf_counter() - start
+        self.latency[model].record(elapsed, success=bool(text))
+        if not text:
+            return text
+        return TranscriptionResult(text, model=model,
+                                   provider=getattr(text, "provider", ""), latency=elapsed)
+
+    def stats(self) -> dict:
+        return {model: tracker.summary() for model, tracker in self.latency.items()}
+
@@ -0,0 +1,231 @@
+"""
+Planificador de peticiones a los proveedores con control de cuota.
+
+Todas las llamadas salientes pasan por aquí: un token bucket dimensionado
+con los límites del proveedor, concurrencia adaptativa AIMD y reintentos
+con backoff exponencial con jitter que respetan ``Retry-After`` y las
+cabeceras ``x-ratelimit-*``. Así las ráfagas de los modos por trozos o en
+paralelo se suavizan en lugar de acabar en 429.
+"""
+import logging
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from typing import Callable, Iterator, Mapping, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+
+
+class RetryableError(Exception):
+    """Error transitorio del proveedor (429, 503) que merece reintento."""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class RateLimitError(RetryableError):
+    """El proveedor ha rechazado la petición por cuota (HTTP 429)."""
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """Convierte "7.66s", "2m59.56s", "1h2m" o "120" a segundos"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_RE.findall(value)
+    if not parts:
+        return None
+    factors = {"h": 3600, "m": 60, "s": 1, "ms": 0.001}
+    return sum(float(number) * factors[unit] for number, unit in parts)
+
+
+def parse_retry_after(headers: Mapping[str, str]) -> Optional[float]:
+    """Segundos de espera indicados por ``Retry-After`` o ``x-ratelimit-reset-*``"""
+    retry_after = headers.get("Retry-After")
+    if retry_after:
+        seconds = parse_duration(retry_after)
+        if seconds is not None:
+            return seconds
+        try:
+            return max(parsedate_to_datetime(retry_after).timestamp() - time.time(), 0.0)
+        except (TypeError, ValueError):
+            pass
+    return parse_duration(headers.get("x-ratelimit-reset-requests"))
+
+
+class TokenBucket:
+    """Token bucket bloqueante; ``rate`` = 0 significa sin límite."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def pause_until(self, deadline: float) -> None:
+        """Bloquea las peticiones hasta ``deadline`` (time.monotonic)"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, deadline)
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                wait = self._paused_until - now
+                if wait <= 0:
+                    if self.rate <= 0:
+                        return
+                    self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                    self._updated = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class RequestScheduler:
+    """Controla ritmo, concurrencia y reintentos de las llamadas a un proveedor."""
+
+    def __init__(self, requests_per_minute: float = 0, burst: Optional[float] = None,
+                 max_concurrency: int = 4, min_concurrency: int = 1, max_retries: int = 4,
+                 base_backoff: float = 0.5, max_backoff: float = 30.0):
+        self.bucket = TokenBucket(requests_per_minute / 60.0, burst)
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self._limit = float(max_concurrency)
+        self._in_flight = 0
+        self._cond = threading.Condition()
+        self.requests = 0
+        self.rate_limited = 0
+        self.retries = 0
+
+    @property
+    def concurrency_limit(self) -> int:
+        return max(self.min_concurrency, int(self._limit))
+
+    def _acquire_slot(self) -> None:
+        with self._cond:
+            while self._in_flight >= self.concurrency_limit:
+                self._cond.wait()
+            self._in_flight += 1
+
+    def _release_slot(self) -> None:
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify_all()
+
+    def _on_success(self) -> None:
+        # Aumento aditivo: +1 al límite por cada "ventana" de éxitos
+        with self._cond:
+            self._limit = min(self.max_concurrency, self._limit + 1.0 / self._limit)
+            self._cond.notify_all()
+
+    def _on_rate_limited(self) -> None:
+        # Disminución multiplicativa
+        with self._cond:
+            self._limit = max(self.min_concurrency, self._limit / 2)
+
+    def _backoff(self, attempt: int) -> float:
+        """Backoff exponencial con "full jitter" """
+        return random.uniform(0, min(self.max_backoff, self.base_backoff * 2 ** attempt))
+
+    def _pause(self, seconds: float) -> None:
+        """Pausa todas las peticiones, como mucho ``max_backoff`` segundos:
+        un ``Retry-After`` enorme o erróneo no debe bloquear el dictado"""
+        self.bucket.pause_until(time.monotonic() + min(seconds, self.max_backoff))
+
+    def observe_headers(self, headers: Mapping[str, str]) -> None:
+        """Si la cuota restante es 0, pausa hasta que se renueve"""
+        remaining = headers.get("x-ratelimit-remaining-requests")
+        if remaining is not None and remaining.strip() == "0":
+            reset = parse_duration(headers.get("x-ratelimit-reset-requests"))
+            if reset:
+                self._pause(reset)
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        """Cuota y hueco de concurrencia para una petición que no se reintenta.
+
+        Para cuerpos que no se pueden repetir (la subida en streaming); la
+        respuesta se notifica después con ``observe_response``.
+        """
+        self.bucket.acquire()
+        self._acquire_slot()
+        try:
+            self.requests += 1
+            yield
+        finally:
+            self._release_slot()
+
+    def observe_response(self, response) -> None:
+        """Ajusta cuota y concurrencia con una respuesta obtenida en ``slot``"""
+        if response.status_code == 429:
+            self.rate_limited += 1
+            self._on_rate_limited()
+            retry_after = parse_retry_after(response.headers)
+            if retry_after is not None:
+                self._pause(retry_after)
+        elif response.ok:
+            self._on_success()
+            self.observe_headers(response.headers)
+
+    def call(self, fn: Callable[[], T]) -> T:
+        """Ejecuta ``fn`` respetando la cuota y reintenta los errores transitorios"""
+        attempt = 0
+        while True:
+            self.bucket.acquire()
+            self._acquire_slot()
+            try:
+                self.requests += 1
+                result = fn()
+            except RetryableError as e:
+                if isinstance(e, RateLimitError):
+                    self.rate_limited += 1
+                    self._on_rate_limited()
+                if e.retry_after is not None:
+                    # Todas las peticiones esperan, no solo esta
+                    self._pause(e.retry_after)
+                if attempt >= self.max_retries:
+                    raise
+                if e.retry_after is not None and e.retry_after > self.max_backoff:
+                    logger.warning(f"{e}; Retry-After de {e.retry_after:.0f} s supera el máximo "
+                                   f"({self.max_backoff:.0f} s), no se reintenta")
+                    raise
+                delay = self._backoff(attempt)
+                if e.retry_after is not None:
+                    delay = max(delay, e.retry_after)
+                attempt += 1
+                self.retries += 1
+                logger.warning(f"{e}; reintento {attempt}/{self.max_retries} en {delay:.2f} s")
+            else:
+                self._on_success()
+                return result
+            finally:
+                self._release_slot()
+            time.sleep(delay)
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "rate_limited": self.rate_limited,
+            "retries": self.retries,
+            "concurrency_limit": self.concurrency_limit,
+        }
@@ -0,0 +1,126 @@
+"""
+Transcripción por segmentos mientras se sigue grabando.
+
+El audio se corta en las pausas detectadas y cada segmento terminado se
+transcribe en un hilo de fondo; al parar solo queda pendiente el último.
+
+``push`` se llama desde el callback de PortAudio, así que solo copia el
+bloque y lo encola: el VAD, los cortes y los buffers de cada segmento se
+hacen en el hilo de fondo, en orden con las transcripciones.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+import numpy as np
+
+import telemetry
+from audio_buffer import AudioBuffer
+from vad import VoiceActivityDetector
+from .interfaces import TranscriptionService
+
+logger = logging.getLogger(__name__)
+
+# Whisper solo usa los últimos ~224 tokens del prompt
+PROMPT_MAX_CHARS = 800
+
+
+class SegmentedTranscription:
+    """Corta el audio en pausas y transcribe los segmentos en orden."""
+
+    def __init__(self, transcriber: TranscriptionService, sample_rate: int,
+                 pause_ms: int = 700, min_segment_seconds: float = 5.0,
+                 max_segment_seconds: float = 60.0, detector: Optional[VoiceActivityDetector] = None):
+        self.transcriber = transcriber
+        self.sample_rate = sample_rate
+        self.detector = detector or VoiceActivityDetector(sample_rate)
+        frame_ms = self.detector.frame_length * 1000 / sample_rate
+        self.pause_frames = max(int(pause_ms / frame_ms), 1)
+        self.min_segment_seconds = min_segment_seconds
+        self.max_segment_seconds = max_segment_seconds
+        self._segment = None  # se crea en el hilo de fondo con el primer bloque
+        self._segment_has_speech = False
+        self._silence_frames = 0
+        # Un único hilo para bloques y segmentos: salen en orden y cada
+        # segmento conoce el texto del anterior para usarlo como prompt
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="segments")
+        self._texts: List[str] = []
+        self._failed = False
+        self.segments_sent = 0
+        # Se crea en el hilo del dictado; el hilo de fondo sube en su traza
+        self._trace = telemetry.current_trace()
+
+    def push(self, samples: np.ndarray) -> None:
+        """Encola un bloque int16 del grabador (se llama desde el callback de audio)"""
+        if len(samples) == 0 or self._failed:
+            return
+        # Copia: PortAudio reutiliza el buffer del bloque
+        self._executor.submit(self._process, samples.copy())
+
+    def _process(self, samples: np.ndarray) -> None:
+        """Añade el bloque al segmento y corta si hay una pausa"""
+        if self._failed:
+            return
+        if self._segment is None:
+            self._segment = AudioBuffer(self.sample_rate, initial_seconds=self.max_segment_seconds)
+        self._segment.append(samples)
+        _, speech = self.detector.classify(samples)
+        if speech.any():
+            self._segment_has_speech = True
+            # Silencio tras la última trama con voz del bloque
+            self._silence_frames = len(speech) - 1 - int(np.flatnonzero(speech)[-1])
+        else:
+            self._silence_frames += len(speech)
+
+        duration = self._segment.duration
+        at_pause = self._silence_frames >= self.pause_frames and duration >= self.min_segment_seconds
+        if at_pause or duration >= self.max_segment_seconds:
+            self._cut()
+
+    def _cut(self) -> None:
+        if self._segment is not None and len(self._segment) and self._segment_has_speech:
+            # Ya en el hilo de fondo: el segmento se transcribe antes de seguir
+            # con los bloques encolados (la vista es segura, el buffer no se reutiliza)
+            self.segments_sent += 1
+            self._transcribe_segment(self._segment.get_audio())
+        self._segment = None
+        self._segment_has_speech = False
+        self._silence_frames = 0
+
+    def _transcribe_segment(self, audio: np.ndarray) -> None:
+        if self._failed:
+            return
+        prompt = " ".join(self._texts)[-PROMPT_MAX_CHARS:] or None
+        try:
+            with telemetry.use_trace(self._trace):
+                text = self.transcriber.transcribe(audio, self.sample_rate, prompt=prompt)
+        except Exception as e:
+            logger.error(f"Error transcribiendo el segmento {len(self._texts) + 1}: {e}")
+            text = ""
+        if not text:
+            self._failed = True
+            return
+        self._texts.append(text.strip())
+        logger.debug(f"Segmento {len(self._texts)} transcrito.")
+
+    def finish(self) -> Optional[str]:
+        """Envía el último segmento, espera y devuelve el texto unido.
+
+        Devuelve None si algún segmento falló o si no se envió ninguno (todo
+        clasificado como silencio, p. ej. con un micrófono bajo), para que
+        el llamador transcriba el audio completo.
+        """
+        self._executor.submit(self._cut)
+        self._executor.shutdown(wait=True)
+        if self._failed:
+            logger.warning("Falló algún segmento; se transcribirá el audio completo.")
+            return None
+        if not self.segments_sent:
+            logger.info("Ningún segmento con voz; se transcribirá el audio completo.")
+            return None
+        return " ".join(t for t in self._texts if t)
+
+    def abort(self) -> None:
+        """Descarta los segmentos pendientes"""
+        self._failed = True
+        self._executor.shutdown(wait=False, cancel_futures=True)
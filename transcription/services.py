@@ -1,55 +1,205 @@
+import logging
 import numpy as np
-from io import BytesIO
-from scipy.io.wavfile import write as write_wav
 import requests
+from requests.adapters import HTTPAdapter
 import json
+import threading
+import time
+from typing import Optional
 
+from .encoders import WavEncoder
+from .interfaces import TranscriptionResult
+from .scheduler import RequestScheduler, RateLimitError, RetryableError, parse_retry_after
+from .streaming import StreamingUpload, StreamingTranscription
+import telemetry
+
+logger = logging.getLogger(__name__)
+
+GROQ_API_URL = "https://api.groq.com/openai/v1/audio/transcriptions"
+OPENAI_API_URL = "https://api.openai.com/v1/audio/transcriptions"
+# Si hubo tráfico hace menos de esto, la conexión sigue viva y no se precalienta
+WARM_UP_INTERVAL = 30.0
+
+
+def create_http_session(pool_size: int = 8) -> requests.Session:
+    """Crea una sesión HTTP con pool de conexiones keep-alive"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
 
 
 class GroqTranscriptionService:
     """Implementación de transcripción usando la API de Groq."""
 
-    def __init__(self, api_key: str, model_name: str):
+    provider_name = "Groq"
+
+    def __init__(self, api_key: str, model_name: str, encoder=None,
+                 api_url: str = GROQ_API_URL, session: Optional[requests.Session] = None,
+                 connect_timeout: float = 5.0, read_timeout: float = 60.0,
+                 scheduler: Optional[RequestScheduler] = None):
         self.api_key = api_key
         self.model_name = model_name
+        self.encoder = encoder or WavEncoder()
+        self.api_url = api_url
+        # Sesión propia con keep-alive: DNS, TCP y TLS solo en la primera petición
+        self.session = session or create_http_session()
+        self.timeout = (connect_timeout, read_timeout)
+        self._last_request_at = 0.0
+        # Compartido entre los servicios del mismo proveedor (misma cuota)
+        self.scheduler = scheduler or RequestScheduler()
+
+    def connection_stats(self) -> dict:
+        """Peticiones hechas y conexiones abiertas por la sesión HTTP"""
+        pools = self.session.get_adapter(self.api_url).poolmanager.pools
+        requests_count = connections = 0
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is not None:
+                requests_count += pool.num_requests
+                connections += pool.num_connections
+        return {
+            "requests": requests_count,
+            "new_connections": connections,
+            "reused": max(requests_count - connections, 0),
+        }
+
+    def warm_up(self) -> None:
+        """Abre la conexión en segundo plano mientras el usuario habla.
+
+        Lanza un HEAD barato contra el endpoint: la respuesta da igual, lo que
+        importa es que el handshake TCP/TLS quede hecho y la conexión en el pool.
+        """
+        if time.monotonic() - self._last_request_at < WARM_UP_INTERVAL:
+            return
+        self._last_request_at = time.monotonic()
+
+        def _warm():
+            try:
+                self.session.head(self.api_url, timeout=self.timeout,
+                                  headers={"Authorization": f"Bearer {self.api_key}"})
+            except requests.exceptions.RequestException as e:
+                logger.warning(f"No se pudo precalentar la conexión: {e}")
 
-    def transcribe(self, audio_data: np.ndarray, sample_rate: int) -> str:
+        threading.Thread(target=_warm, daemon=True).start()
+
+    def open_stream(self, sample_rate: int) -> StreamingTranscription:
+        """Abre una subida en streaming que se alimenta durante la grabación.
+
+        El audio siempre se envía como WAV: la cabecera se escribe al inicio
+        con longitud máxima y el resto son bloques PCM según llegan.
+        """
+        logger.debug(f"Abriendo subida en streaming a {self.provider_name} API (modelo: {self.model_name})...")
+        upload = StreamingUpload(
+            self.api_url,
+            headers={"Authorization": f"Bearer {self.api_key}"},
+            fields={"model": self.model_name},
+            sample_rate=sample_rate,
+            session=self.session,
+            timeout=self.timeout,
+            scheduler=self.scheduler,
+        )
+        self._last_request_at = time.monotonic()
+        return StreamingTranscription(upload.start(), model=self.model_name, provider=self.provider_name)
+
+    def _post(self, headers, files, data) -> requests.Response:
+        """Una petición; los 429/503 se convierten en errores reintentables"""
+        response = self.session.post(
+            self.api_url,
+            headers=headers,
+            files=files,
+            data=data,
+            timeout=self.timeout
+        )
+        self._last_request_at = time.monotonic()
+        # Tiempo de proceso en el servidor, si el proveedor lo indica
+        processing_ms = response.headers.get("openai-processing-ms")
+        if processing_ms:
+            try:
+                telemetry.record_duration("server", float(processing_ms) / 1000,
+                                          provider=self.provider_name)
+            except ValueError:
+                pass
+        if response.status_code == 429:
+            raise RateLimitError(f"{self.provider_name}: límite de peticiones (429)",
+                                 parse_retry_after(response.headers))
+        if response.status_code == 503:
+            raise RetryableError(f"{self.provider_name}: servicio no disponible (503)",
+                                 parse_retry_after(response.headers))
+        self.scheduler.observe_headers(response.headers)
+        return response
+
+    def transcribe(self, audio_data: np.ndarray, sample_rate: int,
+                   prompt: Optional[str] = None) -> str:
         """Transcribe el audio utilizando la API de Groq."""
         if audio_data is None:
             return ""
 
-        print("Convirtiendo audio a formato WAV...")
-        wav_io = BytesIO()
-        audio_int16 = np.int16(audio_data * 32767)
-        write_wav(wav_io, sample_rate, audio_int16)
-        wav_io.seek(0)
-        print("Audio convertido.")
+        encoder = self.encoder
+        logger.debug(f"Convirtiendo audio a formato {encoder.name.upper()}...")
+        # El grabador entrega int16 nativo; solo convertimos si llega en float
+        if audio_data.dtype == np.int16:
+            audio_int16 = audio_data
+        else:
+            audio_int16 = np.int16(audio_data * 32767)
+        start = time.perf_counter()
+        with telemetry.span("encode", format=encoder.name) as span:
+            try:
+                payload = encoder.encode(audio_int16, sample_rate)
+            except Exception as e:
+                if isinstance(encoder, WavEncoder):
+                    raise
+                # Mejor subir WAV que perder la dictación; el cambio es definitivo
+                logger.warning(f"Falló la codificación {encoder.name} ({e}); se usará wav.")
+                encoder = self.encoder = WavEncoder()
+                payload = encoder.encode(audio_int16, sample_rate)
+                span.set(format=encoder.name)
+            span.set(bytes=len(payload))
+        logger.debug(f"Audio convertido ({len(payload) / 1024:.0f} KiB en "
+                     f"{(time.perf_counter() - start) * 1000:.0f} ms).")
 
         headers = {"Authorization": f"Bearer {self.api_key}"}
-        files = {'file': ('audio.wav', wav_io, 'audio/wav')}
+        files = {'file': (encoder.filename, payload, encoder.content_type)}
         data = {'model': self.model_name}
+        if prompt:
+            data['prompt'] = prompt
 
-        print(f"Enviando audio a Groq API (modelo: {self.model_name})...")
+        logger.debug(f"Enviando audio a {self.provider_name} API (modelo: {self.model_name})...")
+        request_start = time.perf_counter()
         try:
-            response = requests.post(
-                "https://api.groq.com/openai/v1/audio/transcriptions",
-                headers=headers,
-                files=files,
-                data=data
-            )
+            with telemetry.span("upload", provider=self.provider_name, model=self.model_name):
+                response = self.scheduler.call(lambda: self._post(headers, files, data))
             response.raise_for_status()
             result = response.json()
             transcribed_text = result.get("text", "")
-            print("Transcripción recibida.")
-            return transcribed_text
+            stats = self.connection_stats()
+            logger.debug(f"Transcripción recibida (conexiones: {stats['new_connections']} nuevas, "
+                         f"{stats['reused']} reutilizadas).")
+            return TranscriptionResult(transcribed_text, model=self.model_name,
+                                       provider=self.provider_name,
+                                       latency=time.perf_counter() - request_start)
+        except RetryableError as e:
+            logger.warning(f"{e}; se agotaron los reintentos.")
+            return ""
         except requests.exceptions.RequestException as e:
-            print(f"Error de red o HTTP al contactar la API Groq: {e}")
+            logger.error(f"Error de red o HTTP al contactar la API {self.provider_name}: {e}")
             if hasattr(e, 'response') and e.response is not None:
                 try:
-                    print(f"Respuesta de la API: {e.response.status_code} - {e.response.text}")
+                    logger.warning(f"Respuesta de la API: {e.response.status_code} - {e.response.text}")
                 except json.JSONDecodeError:
-                    print(f"Respuesta de la API (no JSON): {e.response.status_code} - {e.response.text}")
+                    logger.warning(f"Respuesta de la API (no JSON): {e.response.status_code} - {e.response.text}")
             return ""
         except Exception as e:
-            print(f"Error inesperado durante la transcripción con Groq: {e}")
+            logger.error(f"Error inesperado durante la transcripción con {self.provider_name}: {e}")
             return ""
+
+
+class OpenAITranscriptionService(GroqTranscriptionService):
+    """Transcripción con la API de OpenAI (mismo protocolo que Groq)."""
+
+    provider_name = "OpenAI"
+
+    def __init__(self, api_key: str, model_name: str = "whisper-1", encoder=None,
+                 api_url: str = OPENAI_API_URL, **kwargs):
+        super().__init__(api_key, model_name, encoder=encoder, api_url=api_url, **kwargs)
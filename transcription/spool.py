@@ -0,0 +1,371 @@
+"""
+Cola persistente en disco para transcripciones fallidas o sin conexión.
+
+Cada trabajo se guarda como PCM int16 crudo (``<id>.pcm``) y su estado en
+un diario ``journal.jsonl`` de solo anexado. Los ``fsync`` se agrupan: se
+hacen cada ``sync_batch`` registros o en la siguiente vuelta del hilo de
+reintentos. Un hilo de fondo reintenta los pendientes con backoff y guarda
+el texto recuperado, que luego puede listarse, copiarse o pegarse.
+
+Solo un proceso escribe en la cola: el que consigue el ``flock`` de
+``.lock`` en el directorio. Los demás (p. ej. ``main.py --spool list`` con
+la instancia principal en marcha) la abren en solo lectura, sin compactar
+el diario ni borrar PCM que el propietario aún va a reintentar.
+"""
+import json
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from .interfaces import TranscriptionService, transcription_failed
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"
+EVICTED = "evicted"
+
+
+class SpoolLockedError(RuntimeError):
+    """La cola pertenece a otro proceso."""
+
+
+def default_spool_dir() -> str:
+    base = os.getenv("XDG_DATA_HOME") or os.path.join(os.path.expanduser("~"), ".local", "share")
+    return os.path.join(base, "air-type", "spool")
+
+
+class SpoolJob:
+    """Un audio pendiente de transcribir (o ya recuperado)."""
+
+    def __init__(self, job_id: str, sample_rate: int, samples: int, created: float,
+                 status: str = PENDING, text: str = "", attempts: int = 0):
+        self.id = job_id
+        self.sample_rate = sample_rate
+        self.samples = samples
+        self.created = created
+        self.status = status
+        self.text = text
+        self.attempts = attempts
+        self.next_attempt = 0.0
+
+    @property
+    def duration(self) -> float:
+        return self.samples / self.sample_rate
+
+    @property
+    def size(self) -> int:
+        return self.samples * 2
+
+
+class TranscriptionSpool:
+    """Guarda audios fallidos y los reintenta en segundo plano.
+
+    Con ``read_only`` solo se lee el diario; si no, se toma el lock del
+    directorio y se lanza ``SpoolLockedError`` si ya lo tiene otro proceso.
+    """
+
+    JOURNAL = "journal.jsonl"
+    LOCK = ".lock"
+
+    def __init__(self, directory: str, max_bytes: int = 200 * 1024 * 1024,
+                 max_attempts: int = 20, base_backoff: float = 5.0,
+                 max_backoff: float = 600.0, sync_batch: int = 8, max_done: int = 50,
+                 read_only: bool = False):
+        self.directory = directory
+        self.read_only = read_only
+        self.max_bytes = max_bytes
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.sync_batch = sync_batch
+        self.max_done = max_done
+        self.jobs: Dict[str, SpoolJob] = {}
+        self._lock = threading.RLock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._unsynced = 0
+        self._unsynced_files: List[str] = []
+        self._thread = None
+        self.on_recovered: Optional[Callable[[SpoolJob], None]] = None
+        os.makedirs(directory, exist_ok=True)
+        self._lock_file = None if read_only else self._acquire_lock()
+        self._load()
+        self._journal = None if read_only else open(self._journal_path, "a", encoding="utf-8")
+
+    def _acquire_lock(self):
+        """Lock exclusivo del directorio, que se mantiene mientras viva el proceso"""
+        lock_file = open(os.path.join(self.directory, self.LOCK), "a")
+        try:
+            import fcntl
+        except ImportError:
+            return lock_file  # sin flock (Windows): un único proceso, como antes
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            raise SpoolLockedError(f"La cola {self.directory} está en uso por otro proceso")
+        return lock_file
+
+    def _check_writable(self) -> None:
+        if self.read_only:
+            raise SpoolLockedError("La cola se abrió en solo lectura")
+
+    @property
+    def _journal_path(self) -> str:
+        return os.path.join(self.directory, self.JOURNAL)
+
+    def _pcm_path(self, job_id: str) -> str:
+        return os.path.join(self.directory, f"{job_id}.pcm")
+
+    def _load(self) -> None:
+        """Reconstruye el estado leyendo el diario y, si es el propietario, lo compacta"""
+        if not os.path.exists(self._journal_path):
+            return
+        with open(self._journal_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # última línea a medio escribir tras un corte
+                op, job_id = record.get("op"), record.get("id")
+                if op == "add":
+                    self.jobs[job_id] = SpoolJob(job_id, record["sample_rate"], record["samples"],
+                                                 record["created"])
+                elif job_id in self.jobs:
+                    job = self.jobs[job_id]
+                    if op == "done":
+                        job.status, job.text = DONE, record.get("text", "")
+                    elif op == "attempt":
+                        job.attempts = record.get("attempts", job.attempts + 1)
+                    elif op == "failed":
+                        job.status = FAILED
+                    elif op == "evict":
+                        job.status = EVICTED
+        # Los trabajos pendientes sin su PCM (borrado a mano) no se pueden reintentar
+        for job in self.jobs.values():
+            if job.status in (PENDING, FAILED) and not os.path.exists(self._pcm_path(job.id)):
+                job.status = EVICTED
+        if not self.read_only:
+            self._compact()
+
+    def _compact(self) -> None:
+        """Reescribe el diario solo con los trabajos vivos.
+
+        De los ya recuperados se conservan los ``max_done`` más recientes.
+        """
+        done = sorted((j for j in self.jobs.values() if j.status == DONE), key=lambda j: j.created)
+        for job in done[:max(len(done) - self.max_done, 0)]:
+            job.status = EVICTED
+        tmp = f"{self._journal_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for job in self.jobs.values():
+                if job.status == EVICTED:
+                    continue
+                f.write(json.dumps({"op": "add", "id": job.id, "sample_rate": job.sample_rate,
+                                    "samples": job.samples, "created": job.created}) + "\n")
+                if job.attempts:
+                    f.write(json.dumps({"op": "attempt", "id": job.id, "attempts": job.attempts}) + "\n")
+                if job.status == DONE:
+                    f.write(json.dumps({"op": "done", "id": job.id, "text": job.text},
+                                       ensure_ascii=False) + "\n")
+                elif job.status == FAILED:
+                    f.write(json.dumps({"op": "failed", "id": job.id}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self._journal_path)
+        self.jobs = {k: v for k, v in self.jobs.items() if v.status != EVICTED}
+
+    def _append(self, record: dict) -> None:
+        with self._lock:
+            self._journal.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._journal.flush()
+            self._unsynced += 1
+            if self._unsynced >= self.sync_batch:
+                self.sync()
+
+    def sync(self) -> None:
+        """fsync agrupado del diario y de los PCM escritos desde el último"""
+        with self._lock:
+            if not self._unsynced and not self._unsynced_files:
+                return
+            for path in self._unsynced_files:
+                try:
+                    fd = os.open(path, os.O_RDONLY)
+                    try:
+                        os.fsync(fd)
+                    finally:
+                        os.close(fd)
+                except OSError:
+                    pass
+            os.fsync(self._journal.fileno())
+            self._unsynced = 0
+            self._unsynced_files = []
+
+    def add(self, audio: np.ndarray, sample_rate: int) -> SpoolJob:
+        """Guarda un audio que no se pudo transcribir"""
+        self._check_writable()
+        if audio.dtype != np.int16:
+            audio = (np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16)
+        job_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        job = SpoolJob(job_id, sample_rate, len(audio), time.time())
+        path = self._pcm_path(job_id)
+        with open(path, "wb") as f:
+            f.write(memoryview(np.ascontiguousarray(audio)).cast("B"))
+        with self._lock:
+            self._unsynced_files.append(path)
+            self.jobs[job_id] = job
+            self._append({"op": "add", "id": job_id, "sample_rate": sample_rate,
+                          "samples": job.samples, "created": job.created})
+            self._enforce_limit()
+        logger.info(f"Audio guardado en la cola de reintentos ({job_id}, {job.duration:.1f} s).")
+        self._wakeup.set()
+        return job
+
+    def _enforce_limit(self) -> None:
+        """Expulsa los PCM más antiguos hasta quedar bajo ``max_bytes``"""
+        stored = sorted((j for j in self.jobs.values() if j.status in (PENDING, FAILED)),
+                        key=lambda j: j.created)
+        total = sum(j.size for j in stored)
+        for job in stored:
+            if total <= self.max_bytes:
+                break
+            self._remove_pcm(job.id)
+            job.status = EVICTED
+            total -= job.size
+            self._append({"op": "evict", "id": job.id})
+            logger.warning(f"Cola de reintentos llena: descartado {job.id}.")
+
+    def _remove_pcm(self, job_id: str) -> None:
+        try:
+            os.remove(self._pcm_path(job_id))
+        except OSError:
+            pass
+
+    def load_audio(self, job: SpoolJob) -> np.ndarray:
+        return np.fromfile(self._pcm_path(job.id), dtype=np.int16)
+
+    def pending(self) -> List[SpoolJob]:
+        with self._lock:
+            return [j for j in self.jobs.values() if j.status == PENDING]
+
+    def list_jobs(self) -> List[SpoolJob]:
+        with self._lock:
+            return sorted((j for j in self.jobs.values() if j.status != EVICTED),
+                          key=lambda j: j.created)
+
+    def get(self, job_id: str) -> Optional[SpoolJob]:
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                # Permitir prefijos únicos del identificador
+                matches = [j for k, j in self.jobs.items() if k.startswith(job_id)]
+                job = matches[0] if len(matches) == 1 else None
+            return job
+
+    def _backoff(self, attempts: int) -> float:
+        delay = min(self.max_backoff, self.base_backoff * 2 ** max(attempts - 1, 0))
+        return delay * random.uniform(0.5, 1.0)
+
+    def retry_job(self, job: SpoolJob, transcriber: TranscriptionService) -> bool:
+        """Reintenta un trabajo; devuelve True si se recuperó el texto"""
+        self._check_writable()
+        try:
+            text = transcriber.transcribe(self.load_audio(job), job.sample_rate)
+        except Exception as e:
+            logger.error(f"Error reintentando {job.id}: {e}")
+            text = None
+        recovered = not transcription_failed(text)
+        with self._lock:
+            if recovered:
+                job.status, job.text = DONE, str(text)
+                self._append({"op": "done", "id": job.id, "text": job.text})
+                self.sync()  # un texto recuperado no debe perderse
+                self._remove_pcm(job.id)
+            else:
+                job.attempts += 1
+                job.next_attempt = time.monotonic() + self._backoff(job.attempts)
+                self._append({"op": "attempt", "id": job.id, "attempts": job.attempts})
+                if job.attempts >= self.max_attempts:
+                    job.status = FAILED
+                    self._append({"op": "failed", "id": job.id})
+        if recovered:
+            logger.info(f"Transcripción recuperada ({job.id}): {text}")
+            if self.on_recovered:
+                self.on_recovered(job)
+        return recovered
+
+    def start(self, transcriber: TranscriptionService) -> None:
+        """Arranca el hilo que vacía la cola con backoff"""
+        self._check_writable()
+        if self._thread is not None:
+            return
+
+        def drain():
+            while not self._stop.is_set():
+                now = time.monotonic()
+                due = [j for j in self.pending() if j.next_attempt <= now]
+                for job in sorted(due, key=lambda j: j.created):
+                    if self._stop.is_set():
+                        break
+                    if not self.retry_job(job, transcriber):
+                        # Probablemente sigue sin conexión: no insistir con el resto
+                        for other in due:
+                            other.next_attempt = max(other.next_attempt, job.next_attempt)
+                        break
+                self.sync()
+                waits = [j.next_attempt - time.monotonic() for j in self.pending()]
+                self._wakeup.wait(min(waits) if waits else None)
+                self._wakeup.clear()
+
+        self._thread = threading.Thread(target=drain, daemon=True, name="spool-drainer")
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wakeup.set()
+        self.sync()
+
+
+_spool: Optional[TranscriptionSpool] = None
+
+
+def spool_enabled() -> bool:
+    # Opcional: guarda audio del micrófono en disco, así que hay que pedirlo
+    return os.getenv("SPOOL_ENABLED", "0").lower() in ("1", "true", "yes")
+
+
+def setup_spool(transcriber: Optional[TranscriptionService] = None,
+                read_only: bool = False) -> Optional[TranscriptionSpool]:
+    """Crea la cola (SPOOL_ENABLED=1, SPOOL_DIR, SPOOL_MAX_MB) y arranca el reintento.
+
+    Devuelve None si está desactivada o si otro proceso ya es su propietario.
+    """
+    global _spool
+    if _spool is None:
+        if not spool_enabled():
+            return None
+        try:
+            _spool = TranscriptionSpool(
+                os.getenv("SPOOL_DIR") or default_spool_dir(),
+                max_bytes=int(float(os.getenv("SPOOL_MAX_MB", "200")) * 1024 * 1024),
+                read_only=read_only,
+            )
+        except SpoolLockedError as e:
+            logger.warning(f"{e}; no se guardarán audios fallidos en este proceso.")
+            return None
+    if transcriber is not None:
+        _spool.start(transcriber)
+    return _spool
+
+
+def get_spool() -> Optional[TranscriptionSpool]:
+    """Devuelve la cola si está configurada"""
+    return _spool
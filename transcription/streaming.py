@@ -0,0 +1,163 @@
+"""
+Subida en streaming del audio mientras el usuario sigue hablando.
+
+La petición HTTP se abre al empezar a grabar con un cuerpo multipart
+``chunked``: los bloques del callback se van enviando según llegan y al
+pulsar Esc solo quedan por enviar los últimos.
+"""
+import logging
+import queue
+import threading
+import time
+import uuid
+from contextlib import nullcontext
+from typing import Dict, Optional
+
+import numpy as np
+import requests
+
+from .encoders import wav_header
+from .interfaces import TranscriptionResult
+
+logger = logging.getLogger(__name__)
+
+# Longitud "infinita" en la cabecera WAV: no se conoce al empezar a subir
+_STREAMING_WAV_SIZE = 0xFFFFFFFF
+_END = object()
+
+
+def streaming_wav_header(sample_rate: int, channels: int = 1, bits: int = 16) -> bytes:
+    """Cabecera WAV PCM con tamaños máximos, válida para flujos sin longitud."""
+    return wav_header(sample_rate, _STREAMING_WAV_SIZE - 36, channels, bits)
+
+
+class StreamingUploadAborted(Exception):
+    """Se lanza dentro del generador para cortar la conexión."""
+
+
+class StreamingUpload:
+    """Petición multipart/form-data cuyo fichero se alimenta bloque a bloque."""
+
+    def __init__(self, url: str, headers: Dict[str, str], fields: Dict[str, str],
+                 sample_rate: int, filename: str = "audio.wav",
+                 session=None, timeout: Optional[float] = None, scheduler=None):
+        self.url = url
+        self.headers = dict(headers)
+        self.fields = fields
+        self.sample_rate = sample_rate
+        self.filename = filename
+        self.session = session or requests
+        self.timeout = timeout
+        # El cuerpo se consume al enviarlo: la petición ocupa un hueco del
+        # planificador pero no se reintenta
+        self.scheduler = scheduler
+        self.bytes_sent = 0
+        self._boundary = uuid.uuid4().hex
+        self._queue: "queue.Queue" = queue.Queue()
+        self._aborted = False
+        self._thread = None
+        self._response = None
+        self._error = None
+
+    def _body(self):
+        boundary = self._boundary.encode()
+        for name, value in self.fields.items():
+            yield (b"--" + boundary + b"\r\n"
+                   + f'Content-Disposition: form-data; name="{name}"\r\n\r\n'.encode()
+                   + str(value).encode() + b"\r\n")
+        yield (b"--" + boundary + b"\r\n"
+               + f'Content-Disposition: form-data; name="file"; filename="{self.filename}"\r\n'.encode()
+               + b"Content-Type: audio/wav\r\n\r\n"
+               + streaming_wav_header(self.sample_rate))
+        while True:
+            chunk = self._queue.get()
+            if self._aborted:
+                raise StreamingUploadAborted()
+            if chunk is _END:
+                break
+            self.bytes_sent += len(chunk)
+            yield chunk
+        yield b"\r\n--" + boundary + b"--\r\n"
+
+    def _run(self):
+        headers = dict(self.headers)
+        headers["Content-Type"] = f"multipart/form-data; boundary={self._boundary}"
+        try:
+            with self.scheduler.slot() if self.scheduler is not None else nullcontext():
+                self._response = self.session.post(self.url, headers=headers,
+                                                   data=self._body(), timeout=self.timeout)
+            if self.scheduler is not None:
+                self.scheduler.observe_response(self._response)
+        except Exception as e:
+            self._error = e
+
+    def start(self) -> "StreamingUpload":
+        """Abre la conexión en segundo plano"""
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def push(self, samples: np.ndarray) -> None:
+        """Encola un bloque int16 (se copia: el callback reutiliza su buffer)"""
+        if len(samples):
+            self._queue.put(samples.tobytes())
+
+    @property
+    def read_timeout(self) -> Optional[float]:
+        """Timeout de lectura de la petición (``timeout`` puede ser (conexión, lectura))"""
+        return self.timeout[1] if isinstance(self.timeout, tuple) else self.timeout
+
+    def finish(self, timeout: Optional[float] = None):
+        """Cierra el cuerpo y espera la respuesta. Devuelve el JSON o None.
+
+        Sin ``timeout`` se espera como mucho el timeout de lectura de la
+        petición: una subida atascada no debe bloquear el dictado.
+        """
+        self._queue.put(_END)
+        self._thread.join(timeout if timeout is not None else self.read_timeout)
+        if self._thread.is_alive():
+            logger.warning("La subida en streaming no terminó a tiempo; se descarta.")
+            self._aborted = True
+            return None
+        if self._error is not None:
+            logger.error(f"Error en la subida en streaming: {self._error}")
+            return None
+        try:
+            self._response.raise_for_status()
+            return self._response.json()
+        except Exception as e:
+            logger.warning(f"Respuesta inválida en la subida en streaming: {e}")
+            return None
+
+    def abort(self) -> None:
+        """Cancela la subida cortando la conexión"""
+        self._aborted = True
+        self._queue.put(_END)
+
+
+class StreamingTranscription:
+    """Adaptador que devuelve solo el texto de una ``StreamingUpload``."""
+
+    def __init__(self, upload: StreamingUpload, model: str = "", provider: str = ""):
+        self.upload = upload
+        self.model = model
+        self.provider = provider
+
+    def push(self, samples: np.ndarray) -> None:
+        self.upload.push(samples)
+
+    def finish(self, timeout: Optional[float] = None) -> Optional[str]:
+        """Devuelve el texto, o None si hay que recurrir a la subida normal.
+
+        ``timeout`` por defecto es el timeout de lectura del servicio. La
+        latencia es la espera desde el final de la grabación.
+        """
+        start = time.perf_counter()
+        result = self.upload.finish(timeout)
+        if result is None:
+            return None
+        return TranscriptionResult(result.get("text", ""), model=self.model, provider=self.provider,
+                                   latency=time.perf_counter() - start)
+
+    def abort(self) -> None:
+        self.upload.abort()
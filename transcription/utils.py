@@ -1,19 +1,49 @@
-from adapters import OSAdapterFactory
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional, Tuple
 
-# Inicializar el adaptador adecuado al importar el módulo
-_os_adapter = OSAdapterFactory.create_adapter()
+import telemetry
+
+# El adaptador se crea en el primer uso: abre las conexiones con el compositor
+_os_adapter = None
+
+# Posición del cursor pedida junto con la ventana activa: (instante, futuro)
+CURSOR_PREFETCH_TTL = 1.0
+_cursor_prefetch: Optional[Tuple[float, Future]] = None
+_prefetch_pool: Optional[ThreadPoolExecutor] = None
+
+def get_os_adapter():
+    """Devuelve el adaptador del SO, creándolo la primera vez"""
+    global _os_adapter
+    if _os_adapter is None:
+        from adapters import OSAdapterFactory
+        _os_adapter = OSAdapterFactory.create_adapter()
+    return _os_adapter
 
 def save_active_window() -> None:
-    """Guarda la ventana activa en el adaptador del SO"""
-    _os_adapter.save_active_window()
+    """Guarda la ventana activa en el adaptador del SO.
+
+    La burbuja pide la posición del cursor justo después: esa consulta se
+    lanza a la vez en otro hilo y ``get_cursor_position`` recoge el resultado.
+    """
+    global _cursor_prefetch, _prefetch_pool
+    adapter = get_os_adapter()
+    with telemetry.span("focus_save"):
+        if hasattr(adapter, "get_cursor_position"):
+            if _prefetch_pool is None:
+                _prefetch_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cursor")
+            _cursor_prefetch = (time.monotonic(), _prefetch_pool.submit(adapter.get_cursor_position))
+        adapter.save_active_window()
 
 def restore_active_window() -> None:
     """Restaura el foco a la ventana previamente guardada"""
-    _os_adapter.restore_active_window()
+    with telemetry.span("focus_restore"):
+        get_os_adapter().restore_active_window()
 
 def write_text(text: str) -> None:
     """Escribe el texto en la ventana activa"""
-    _os_adapter.write_text(text)
+    with telemetry.span("paste"):
+        get_os_adapter().write_text(text)
 
 
 def get_cursor_position() -> tuple[int, int]:
@@ -22,4 +52,8 @@ def get_cursor_position() -> tuple[int, int]:
     Returns:
         tuple[int, int]: Coordenadas (x, y) de la posición del cursor
     """
-    return _os_adapter.get_cursor_position()
\ No newline at end of file
+    global _cursor_prefetch
+    prefetch, _cursor_prefetch = _cursor_prefetch, None
+    if prefetch is not None and time.monotonic() - prefetch[0] < CURSOR_PREFETCH_TTL:
+        return prefetch[1].result()
+    return get_os_adapter().get_cursor_position()
\ No newline at end of file
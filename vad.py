@@ -0,0 +1,137 @@
+"""
+Detección de actividad de voz (VAD) por energía y cruces por cero
+"""
+from collections import deque
+import numpy as np
+
+
+class VoiceActivityDetector:
+    """Clasifica tramas de audio int16 como voz o silencio.
+
+    Las características se calculan vectorizadas sobre todas las tramas
+    completas de un bloque; las muestras sobrantes se guardan para el
+    siguiente bloque, así que puede alimentarse con bloques de cualquier
+    tamaño según llegan del callback.
+    """
+
+    def __init__(self, sample_rate: int, frame_ms: int = 30,
+                 energy_threshold_db: float = -45.0, zcr_threshold: float = 0.25,
+                 weak_margin_db: float = 10.0):
+        self.sample_rate = sample_rate
+        self.frame_length = max(int(sample_rate * frame_ms / 1000), 1)
+        self.energy_threshold_db = energy_threshold_db
+        self.zcr_threshold = zcr_threshold
+        self.weak_margin_db = weak_margin_db
+        self._carry = np.empty(self.frame_length, dtype=np.int16)
+        self._carry_len = 0
+
+    def split_frames(self, samples: np.ndarray) -> np.ndarray:
+        """Devuelve las tramas completas (n, frame_length) y guarda el resto"""
+        if self._carry_len:
+            samples = np.concatenate((self._carry[:self._carry_len], samples))
+        n_frames = len(samples) // self.frame_length
+        used = n_frames * self.frame_length
+        rest = len(samples) - used
+        self._carry[:rest] = samples[used:]
+        self._carry_len = rest
+        return samples[:used].reshape(n_frames, self.frame_length)
+
+    def take_remainder(self) -> np.ndarray:
+        """Devuelve y vacía las muestras que no llegaron a formar una trama"""
+        rest = self._carry[:self._carry_len].copy()
+        self._carry_len = 0
+        return rest
+
+    @staticmethod
+    def features(frames: np.ndarray):
+        """Devuelve (energía en dBFS, tasa de cruces por cero) por trama"""
+        x = frames.astype(np.float32) / 32768.0
+        energy_db = 10.0 * np.log10(np.mean(x * x, axis=1) + 1e-10)
+        signs = np.signbit(x)
+        zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (frames.shape[1] - 1 or 1)
+        return energy_db, zcr
+
+    def classify_frames(self, frames: np.ndarray) -> np.ndarray:
+        """Clasifica tramas (n, frame_length) y devuelve un array booleano"""
+        if len(frames) == 0:
+            return np.zeros(0, dtype=bool)
+        energy_db, zcr = self.features(frames)
+        # Voz sonora: energía alta. Fricativas (s, f, z): energía algo menor
+        # pero muchos cruces por cero
+        strong = energy_db > self.energy_threshold_db
+        weak = (energy_db > self.energy_threshold_db - self.weak_margin_db) & (zcr > self.zcr_threshold)
+        return strong | weak
+
+    def classify(self, samples: np.ndarray):
+        """Divide en tramas y clasifica. Devuelve (tramas, es_voz)"""
+        frames = self.split_frames(samples)
+        return frames, self.classify_frames(frames)
+
+
+class SilenceTrimmer:
+    """Recorta el silencio inicial y comprime las pausas de forma incremental.
+
+    Tras cada tramo de voz se conservan ``hangover_ms`` de silencio; el resto
+    se descarta salvo los últimos ``padding_ms``, que se anteponen cuando
+    vuelve la voz para no cortar el inicio de las palabras.
+    """
+
+    def __init__(self, detector: VoiceActivityDetector, hangover_ms: int = 400,
+                 padding_ms: int = 200):
+        self.detector = detector
+        frame_ms = detector.frame_length * 1000 / detector.sample_rate
+        self.hangover_frames = int(hangover_ms / frame_ms)
+        self._padding = deque(maxlen=max(int(padding_ms / frame_ms), 1))
+        self._use_padding = padding_ms > 0
+        self._in_speech = False
+        self._silence_run = 0
+        self.input_samples = 0
+        self.kept_samples = 0
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        """Procesa un bloque int16 y devuelve las muestras que se conservan"""
+        self.input_samples += len(samples)
+        frames, speech = self.detector.classify(samples)
+        out = []
+        for frame, is_speech in zip(frames, speech):
+            if is_speech:
+                if self._padding:
+                    out.extend(self._padding)
+                    self._padding.clear()
+                out.append(frame)
+                self._in_speech = True
+                self._silence_run = 0
+            else:
+                self._silence_run += 1
+                if self._in_speech and self._silence_run <= self.hangover_frames:
+                    out.append(frame)
+                elif self._use_padding:
+                    # Copia: el bloque pertenece a PortAudio y se reutiliza
+                    self._padding.append(frame.copy())
+        if not out:
+            return samples[:0]
+        kept = np.concatenate(out)
+        self.kept_samples += len(kept)
+        return kept
+
+    def flush(self) -> np.ndarray:
+        """Devuelve la última trama incompleta si cae dentro de la voz"""
+        rest = self.detector.take_remainder()
+        if self._in_speech and self._silence_run <= self.hangover_frames:
+            self.kept_samples += len(rest)
+            return rest
+        return rest[:0]
+
+    @property
+    def dropped_samples(self) -> int:
+        return self.input_samples - self.kept_samples
+
+    def stats(self) -> dict:
+        """Estadísticas de audio descartado"""
+        sr = self.detector.sample_rate
+        return {
+            "input_seconds": self.input_samples / sr,
+            "kept_seconds": self.kept_samples / sr,
+            "dropped_seconds": self.dropped_samples / sr,
+            "dropped_ratio": self.dropped_samples / self.input_samples if self.input_samples else 0.0,
+        }